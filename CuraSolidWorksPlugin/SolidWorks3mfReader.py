@@ -0,0 +1,128 @@
+# Copyright (c) 2018 Thomas Karl Pietrowski
+
+# Build-ins
+import array
+import posixpath
+import xml.etree.ElementTree as ElementTree
+import zipfile
+
+# 3rd-party
+import numpy
+
+model_relationship_type = "http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"
+default_model_path = "3D/3dmodel.model"
+
+# Unit of the model -> factor to millimeters
+unit_scales = {"micron": 0.001,
+               "millimeter": 1.0,
+               "centimeter": 10.0,
+               "inch": 25.4,
+               "foot": 304.8,
+               "meter": 1000.0,
+               }
+
+def _getLocalName(tag):
+    return tag.rsplit("}", 1)[-1]
+
+def getModelPath(archive):
+    # The root model is referenced by the package relationships. Most writers use the default path.
+    try:
+        with archive.open("_rels/.rels") as relationships_file:
+            for _, element in ElementTree.iterparse(relationships_file):
+                if _getLocalName(element.tag) == "Relationship" and element.get("Type") == model_relationship_type:
+                    return posixpath.normpath(element.get("Target").lstrip("/"))
+    except KeyError:
+        pass
+    return default_model_path
+
+def parseTransform(transform):
+    # 3MF uses row vectors: [x y z 1] * M with M given as 4x3 matrix. Returned as 4x4 matrix for column vectors.
+    transformation = numpy.identity(4, dtype = numpy.float64)
+    if not transform:
+        return transformation
+    values = numpy.array(transform.split(), dtype = numpy.float64).reshape(4, 3)
+    transformation[:3, :3] = values[:3].T
+    transformation[:3, 3] = values[3]
+    return transformation
+
+def _getScaledTransformation(transformation, scale):
+    transformation = transformation.copy()
+    transformation[:3, 3] *= scale
+    return transformation
+
+def read3mf(file_path):
+    """
+    Reads the model of a 3MF file without building an element tree of it
+
+    - Vertices and triangles are collected into compact arrays while parsing. Processed elements are cleared right away.
+    - Returns the meshes by object id as (vertices, indices) in millimeters and the build items as (object id, name, transformation).
+    - Components are resolved, so every build item references a mesh. Their meshes are shared, not copied.
+    """
+
+    meshes = {}
+    names = {}
+    components = {}
+    build_items = []
+    scale = 1.0
+
+    with zipfile.ZipFile(file_path, "r") as archive:
+        with archive.open(getModelPath(archive)) as model_file:
+            parents = []
+            object_id = None
+            vertices = None
+            triangles = None
+            for event, element in ElementTree.iterparse(model_file, events = ("start", "end")):
+                name = _getLocalName(element.tag)
+                if event == "start":
+                    if name == "model":
+                        scale = unit_scales.get(element.get("unit", "millimeter"), 1.0)
+                    elif name == "object":
+                        object_id = element.get("id")
+                        names[object_id] = element.get("name")
+                    elif name == "vertices":
+                        vertices = array.array("f")
+                    elif name == "triangles":
+                        triangles = array.array("i")
+                    elif name == "components":
+                        components[object_id] = []
+                    parents.append(element)
+                    continue
+
+                parents.pop()
+                if name == "vertex":
+                    vertices.extend((float(element.get("x")), float(element.get("y")), float(element.get("z"))))
+                    parents[-1].clear()
+                elif name == "triangle":
+                    triangles.extend((int(element.get("v1")), int(element.get("v2")), int(element.get("v3"))))
+                    parents[-1].clear()
+                elif name == "component":
+                    components[object_id].append((element.get("objectid"), parseTransform(element.get("transform"))))
+                elif name == "mesh":
+                    mesh_vertices = numpy.frombuffer(vertices, dtype = numpy.float32).reshape(-1, 3)
+                    if scale != 1.0:
+                        mesh_vertices = mesh_vertices * numpy.float32(scale)
+                    meshes[object_id] = (mesh_vertices,
+                                         numpy.frombuffer(triangles, dtype = numpy.int32).reshape(-1, 3),
+                                         )
+                    vertices = triangles = None
+                    element.clear()
+                elif name == "object":
+                    object_id = None
+                    parents[-1].clear()
+                elif name == "item":
+                    build_items.append((element.get("objectid"), parseTransform(element.get("transform"))))
+
+    # Resolving components into meshes with their accumulated transformations
+    items = []
+    for item_object_id, item_transformation in build_items:
+        pending = [(item_object_id, item_transformation, 0)]
+        while pending:
+            current_id, transformation, depth = pending.pop()
+            if current_id in meshes.keys():
+                items.append((current_id, names.get(item_object_id) or names.get(current_id),
+                              _getScaledTransformation(transformation, scale),
+                              ))
+            elif current_id in components.keys() and depth < 32:
+                for component_id, component_transformation in components[current_id]:
+                    pending.append((component_id, transformation.dot(component_transformation), depth + 1))
+    return meshes, items
@@ -0,0 +1,475 @@
+# Copyright (c) 2018 Thomas Karl Pietrowski
+
+"""
+Converts SolidWorks files into meshes without Cura
+
+- Takes a directory, which is searched for parts, assemblies and drawings, or a manifest listing the files.
+  Manifests are text files with one path per line or JSON files with a list of paths. Relative paths start at the manifest.
+- Opens and exports the files by SolidWorksDocumentExporter, just like SolidWorksReader does.
+  This includes the open strategy of assemblies, instanced assemblies, the fallback from 3MF to STL and the mesh cache.
+- SolidWorks is driven by a SolidWorksSession, while the exported files are read and written by a pool of threads.
+- Writes a binary STL per part and assembly and one per model of a drawing. The directory structure is kept.
+  "parts/bracket.SLDPRT" becomes "parts/bracket.SLDPRT.stl", the models of a drawing "drawing.SLDDRW_<model>.stl".
+  The meshes are placed like Cura places them on import, including the auto-rotation.
+- Writes a JSON report with the duration of each phase per file.
+- With --fake the stand-in of the tests is driven instead of SolidWorks, so the converter runs on any system.
+
+Usage: python3 SolidWorksBatchConverter.py <directory or manifest> --output <directory> [--quality 30] [--fake]
+"""
+
+# Build-ins
+import argparse
+import json
+import os
+import sys
+import time
+
+# 3rd-party
+import numpy
+
+plugin_directory = os.path.split(os.path.abspath(__file__))[0]
+sys.path.insert(0, plugin_directory)
+
+from SolidWorks3mfReader import read3mf # @UnresolvedImport
+from SolidWorksDocumentExporter import SolidWorksDocumentExporter # @UnresolvedImport
+from SolidWorksExportProfile import getCacheQuality, getQualityName # @UnresolvedImport
+from SolidWorksLogger import PythonLogger # @UnresolvedImport
+from SolidWorksMeshCache import SolidWorksMeshCache # @UnresolvedImport
+from SolidWorksMeshUtils import getInstancePlacement, map3mfMeshes, postProcessMesh, transformVertices # @UnresolvedImport
+from SolidWorksPipeline import SolidWorksImportPipeline # @UnresolvedImport
+from SolidWorksSession import SolidWorksSession # @UnresolvedImport
+from SolidWorksStlReader import isBinaryStl, readBinaryStl, stl_header_size, stl_mapping, stl_triangle_dtype # @UnresolvedImport
+from SolidWorksTrace import SolidWorksTrace, traceSpan # @UnresolvedImport
+
+def isSolidWorksFile(file_path):
+    # Lock files of open documents start with "~$"
+    return os.path.splitext(file_path)[1].upper() in SolidWorksDocumentExporter.document_types.keys() and not os.path.basename(file_path).startswith("~$")
+
+def collectFiles(source):
+    # Returns [(file path, path relative to the source), ...]
+    if os.path.isdir(source):
+        files = []
+        for directory, _, file_names in os.walk(source):
+            for file_name in sorted(file_names):
+                file_path = os.path.join(directory, file_name)
+                if isSolidWorksFile(file_path):
+                    files.append((file_path, os.path.relpath(file_path, source)))
+        return sorted(files)
+
+    with open(source, "r") as manifest_file:
+        if os.path.splitext(source)[1].lower() == ".json":
+            entries = json.load(manifest_file)
+            if isinstance(entries, dict):
+                entries = entries["files"]
+        else:
+            entries = [line.strip() for line in manifest_file]
+            entries = [entry for entry in entries if entry and not entry.startswith("#")]
+
+    manifest_directory = os.path.dirname(os.path.abspath(source))
+    files = []
+    for entry in entries:
+        file_path = entry if os.path.isabs(entry) else os.path.join(manifest_directory, entry)
+        relative_path = os.path.relpath(file_path, manifest_directory) if not os.path.isabs(entry) else os.path.basename(entry)
+        files.append((file_path, relative_path))
+    return files
+
+def writeBinaryStl(file_path, vertices, indices):
+    # The vertices are in Cura's frame. Mapped back like Uranium's STLReader would read them: (x, y, z) -> (x, -z, y)
+    faces = vertices[indices].dot(stl_mapping[:3, :3].astype(vertices.dtype))
+    normals = numpy.cross(faces[:, 1] - faces[:, 0], faces[:, 2] - faces[:, 0])
+    lengths = numpy.linalg.norm(normals, axis = 1)
+    lengths[lengths == 0] = 1.0
+    data = numpy.zeros(len(indices), dtype = stl_triangle_dtype)
+    data["normal"] = normals / lengths[:, numpy.newaxis]
+    data["vertices"] = faces
+    with open(file_path, "wb") as stl_file:
+        stl_file.write(b"\0" * stl_header_size)
+        stl_file.write(numpy.array([len(data)], dtype = "<u4").tobytes())
+        data.tofile(stl_file)
+
+class ComBackend():
+    """
+    SolidWorks through CadIntegrationUtils, like SolidWorksReader
+    """
+
+    def __init__(self, app_name):
+        from CadIntegrationUtils.ComFactory import ComConnector # @UnresolvedImport
+        self.com_connector = ComConnector
+        self.name = app_name
+
+    def createApp(self, app_name):
+        return self.com_connector.CreateClassObject(app_name)
+
+class FakeComBackend():
+    """
+    FakeSldWorksApplication of the tests. Every document is a sphere with the given number of triangles.
+    """
+
+    def __init__(self, latency = 0.0, triangles = 10000):
+        sys.path.insert(0, os.path.join(plugin_directory, "tests"))
+        import FakeSolidWorks # @UnresolvedImport
+        self.name = "FakeSldWorksApplication"
+        self.com_connector = FakeSolidWorks.FakeComConnector()
+        self.app_instance = FakeSolidWorks.FakeSldWorksApplication(default_latency = latency,
+                                                                   default_triangles = triangles,
+                                                                   com_connector = self.com_connector,
+                                                                   )
+
+    def createApp(self, app_name):
+        return self.app_instance
+
+class SolidWorksBatchConverter():
+    # Assemblies with "auto" are opened lightweight from this number of referenced documents or file size on. Same as SolidWorksReader.
+    open_lightweight_components = 200
+    open_lightweight_file_size = 50 * 1024 * 1024
+
+    def __init__(self, backend, output_directory, quality = 30, weld_epsilon = 0.001, triangle_budget = 0, decimation_max_error = 0,
+                 workers = 2, max_pending = 2, trace_directory = None, open_strategy = "auto", auto_rotate = True,
+                 instanced_assemblies = False, cache_directory = None, cache_size_limit = 2048 * 1024 * 1024, logger = None):
+        self.backend = backend
+        self.output_directory = output_directory
+        self.quality = quality
+        self.weld_epsilon = weld_epsilon
+        self.triangle_budget = triangle_budget
+        self.decimation_max_error = decimation_max_error
+        self.workers = workers
+        self.max_pending = max_pending
+        self.trace_directory = trace_directory
+        self.open_strategy = open_strategy
+        self.auto_rotate = auto_rotate
+        self.instanced_assemblies = instanced_assemblies
+        self.logger = logger or PythonLogger()
+
+        self.mesh_cache = None
+        if cache_directory:
+            self.mesh_cache = SolidWorksMeshCache(cache_directory, cache_size_limit)
+        self.exporter = SolidWorksDocumentExporter(backend.com_connector, logger = self.logger, mesh_cache = self.mesh_cache)
+        self.session = None
+
+    def getJobOptions(self, file_path, relative_path, trace = None):
+        # Same settings as SolidWorksReader.preStartApp() reads from Cura's preferences
+        return {"foreignFile": file_path,
+                "foreignFormat": os.path.splitext(file_path)[1],
+                "relative_path": relative_path,
+                "tempFileKeep": False,
+                "trace": trace or SolidWorksTrace(file_path),
+                "app_export_quality": self.quality,
+                "app_auto_rotate": self.auto_rotate,
+                "app_weld_vertices": bool(self.weld_epsilon),
+                "app_weld_epsilon": self.weld_epsilon,
+                "app_triangle_budget": self.triangle_budget,
+                "app_decimation_max_error": self.decimation_max_error,
+                "app_open_strategy": self.open_strategy,
+                "app_open_lightweight_components": self.open_lightweight_components,
+                "app_open_lightweight_file_size": self.open_lightweight_file_size,
+                "app_instanced_assemblies": self.instanced_assemblies,
+                "app_cache_enabled": self.mesh_cache is not None,
+                }
+
+    # Called by SolidWorksSession, like the methods of SolidWorksReader
+
+    def startApp(self, options):
+        options["app_instance"] = self.backend.createApp(options["app_name"])
+        options["app_was_active"] = False
+        self.exporter.hideApp(options)
+        revision = self.exporter.getRevisionNumber(options)
+        options["fileFormats"] = self.exporter.getFileFormats(revision[0])
+        return options
+
+    def onSessionStarted(self, session_options):
+        self.exporter.onSessionStarted(session_options)
+
+    def onSessionClosing(self, session_options):
+        self.exporter.onSessionClosing(session_options)
+
+    def closeApp(self, options):
+        self.exporter.restoreApp(options)
+
+    def postCloseApp(self, options):
+        pass
+
+    def getOpenDocuments(self, options):
+        return self.exporter.getOpenDocuments(options)
+
+    # Session
+
+    def getCacheEntry(self, options):
+        # Only merged meshes are cached
+        if self.mesh_cache is None or self.exporter.isInstancedImport(options):
+            return None
+        with traceSpan(options, "cacheLookup"):
+            return self.mesh_cache.lookup(options["foreignFile"],
+                                          getCacheQuality(self.quality, self.triangle_budget),
+                                          options.get("version_major"),
+                                          self.auto_rotate,
+                                          )
+
+    def exportFile(self, session_options, options, file_formats = None):
+        # Runs inside the session. Without file_formats the mesh cache is looked up first.
+        options = self.exporter.joinSession(session_options, options)
+        cache_entry = self.getCacheEntry(options) if file_formats is None else None
+        if cache_entry:
+            self.logger.log("i", "Found <{}> in the mesh cache. Skipping the conversion by SolidWorks!".format(options["foreignFile"]))
+            options["tempType"] = cache_entry["type"]
+            options["tempFile"] = cache_entry["file"]
+            options["tempFileCached"] = True
+            # Converted again, when the cached mesh can't be read
+            options["fileFormatsRemaining"] = options["fileFormats"]
+            return options
+        with traceSpan(options, "exportForeignFile"):
+            options = self.exporter.exportForeignFile(options, file_formats)
+        if options.get("sw_drawing_without_models", False):
+            raise RuntimeError("Found no models in <{}>!".format(options["foreignFile"]))
+        if "tempFile" not in options.keys() and not options.get("drawing_exports") and not options.get("instance_exports"):
+            raise RuntimeError("SolidWorks didn't export <{}>!".format(options["foreignFile"]))
+        return options
+
+    # Reading threads
+
+    def removeTempFile(self, export):
+        if "tempFile" in export.keys() and not export.get("tempFileCached", False) and os.path.isfile(export["tempFile"]):
+            os.remove(export["tempFile"])
+
+    def readMesh(self, options, export):
+        """
+        Reads an exported file into vertices and indices, placed like SolidWorksReader places its scene nodes
+
+        - Binary STLs are triangle soups, so indices is None for them.
+        - Returns None, if the file can't be read.
+        """
+
+        if export["tempType"] == "stl" and isBinaryStl(export["tempFile"]):
+            vertices, _ = readBinaryStl(export["tempFile"])
+            if not len(vertices):
+                return None
+            return vertices, None
+        if export["tempType"] != "3mf":
+            return None
+
+        meshes, items = read3mf(export["tempFile"])
+        if not items:
+            return None
+        meshes, items = map3mfMeshes(meshes, items, options["app_auto_rotate"])
+        all_vertices = []
+        all_indices = []
+        vertex_count = 0
+        for object_id, _, transformation in items:
+            vertices, indices = meshes[object_id]
+            all_vertices.append(transformVertices(vertices, transformation))
+            all_indices.append(indices + vertex_count)
+            vertex_count += len(vertices)
+        return numpy.concatenate(all_vertices), numpy.concatenate(all_indices)
+
+    def readInstances(self, options):
+        # Places the mesh of each unique part once per instance. Returns None, if no part could be read.
+        parts = {}
+        for instance_key, temp_file in options["instance_exports"].items():
+            export = {"tempType": "stl", "tempFile": temp_file}
+            try:
+                with traceSpan(options, "readExportedFile"):
+                    mesh = self.readMesh(options, export)
+            finally:
+                self.removeTempFile(export)
+            if mesh is None:
+                self.logger.log("w", "Could not read the exported mesh of <{}> ({}).".format(*instance_key))
+                continue
+            parts[instance_key] = mesh[0]
+        if not parts:
+            return None
+
+        all_vertices = []
+        for instance_key, array_data in options["instances"]:
+            if instance_key not in parts.keys():
+                continue
+            all_vertices.append(transformVertices(parts[instance_key], getInstancePlacement(array_data, options["app_auto_rotate"])))
+        return numpy.concatenate(all_vertices), None
+
+    def readExport(self, options, export):
+        # Reads an export. Whenever that fails, the file is exported into the next format, like SolidWorksReader.readOnSession() does.
+        # Returns the mesh and the export it has been read from.
+        while True:
+            mesh = None
+            if "tempFile" in export.keys():
+                try:
+                    with traceSpan(options, "readExportedFile"):
+                        mesh = self.readMesh(options, export)
+                except:
+                    self.logger.logException("e", "Failed to read the exported mesh <{}>!".format(export["tempFile"]))
+                finally:
+                    self.removeTempFile(export)
+            if mesh is not None:
+                return mesh, export
+            file_formats = export.get("fileFormatsRemaining")
+            if not file_formats:
+                raise RuntimeError("Could not read the exported mesh of <{}>!".format(export["foreignFile"]))
+            self.logger.log("w", "Exporting <{}> into '{}' again..".format(export["foreignFile"], file_formats[0]))
+            export = self.session.run(self.exportFile,
+                                      self.getJobOptions(export["foreignFile"], options["relative_path"], options["trace"]),
+                                      file_formats,
+                                      )
+
+    def getOutputPath(self, options, model_path):
+        # The extension is kept, so parts and assemblies with the same name don't overwrite each other
+        output_path = os.path.join(self.output_directory, options["relative_path"])
+        if model_path:
+            # Windows paths are split on any system, since they come from SolidWorks
+            output_path += "_{}".format(os.path.splitext(model_path.replace("\\", "/").split("/")[-1])[0])
+        return output_path + ".stl"
+
+    def getExports(self, options):
+        # (model of the drawing, export) for each mesh to write
+        if "drawing_exports" in options.keys():
+            return [(export["foreignFile"], export) for export in options["drawing_exports"]]
+        if options.get("drawing_models"):
+            return [(options["drawing_models"][0], options)]
+        return [(None, options)]
+
+    def writeMeshes(self, options):
+        meshes = []
+        if options.get("instanced_assembly", False):
+            exports = [(None, None)]
+        else:
+            exports = self.getExports(options)
+        try:
+            for model_path, export in exports:
+                # Merged like SolidWorksReader.readDrawingModels() does
+                export_options = dict(options)
+                if export is None:
+                    mesh = self.readInstances(options)
+                    if mesh is None:
+                        raise RuntimeError("Could not read any part of <{}>!".format(options["foreignFile"]))
+                else:
+                    mesh, read_export = self.readExport(options, export)
+                    export_options.update(read_export)
+
+                with traceSpan(options, "nodePostProcessing"):
+                    vertices, indices = postProcessMesh(export_options, *mesh)
+                if indices is None:
+                    indices = numpy.arange(len(vertices), dtype = numpy.int32).reshape(-1, 3)
+
+                output_path = self.getOutputPath(options, model_path)
+                with traceSpan(options, "writeMesh"):
+                    os.makedirs(os.path.dirname(output_path), exist_ok = True)
+                    writeBinaryStl(output_path, vertices, indices)
+                meshes.append({"file": output_path,
+                               "model": model_path,
+                               "triangles": int(len(indices)),
+                               })
+        finally:
+            for _, export in exports:
+                if export is not None:
+                    self.removeTempFile(export)
+            for temp_file in options.get("instance_exports", {}).values():
+                self.removeTempFile({"tempFile": temp_file})
+        return meshes
+
+    def run(self, files):
+        jobs = [self.getJobOptions(file_path, relative_path) for file_path, relative_path in files]
+
+        start_time = time.perf_counter()
+        # The session drives SolidWorks from a thread of its own, which lives in a COM apartment
+        self.session = SolidWorksSession(self,
+                                         [self.backend.name],
+                                         com_connector = self.backend.com_connector,
+                                         logger = self.logger,
+                                         )
+        try:
+            pipeline = SolidWorksImportPipeline(lambda options: self.session.run(self.exportFile, options),
+                                                self.writeMeshes,
+                                                max_pending = self.max_pending,
+                                                workers = self.workers,
+                                                )
+            results = pipeline.run(jobs)
+        finally:
+            self.session.shutdown()
+            self.session = None
+        total_time = time.perf_counter() - start_time
+
+        report_files = []
+        for (file_path, _), options, (meshes, error) in zip(files, jobs, results):
+            durations = options["trace"].getDurations()
+            report_files.append({"file": file_path,
+                                 "status": "failed" if error else "converted",
+                                 "error": repr(error) if error else None,
+                                 "meshes": meshes or [],
+                                 "open_strategy": options.get("sw_open_strategy"),
+                                 "open_fallback": options.get("sw_open_fallback", False),
+                                 "resolved_components": options.get("sw_resolved_components", 0),
+                                 "cached": options.get("tempFileCached", False),
+                                 "durations": durations,
+                                 })
+            if self.trace_directory:
+                options["trace"].export(self.trace_directory)
+
+        return {"app": self.backend.name,
+                "quality": self.quality,
+                "quality_name": getQualityName(self.quality),
+                "open_strategy": self.open_strategy,
+                "auto_rotate": self.auto_rotate,
+                "instanced_assemblies": self.instanced_assemblies,
+                "converted": len([entry for entry in report_files if entry["status"] == "converted"]),
+                "failed": len([entry for entry in report_files if entry["status"] == "failed"]),
+                "total_time": total_time,
+                "files": report_files,
+                }
+
+def main(arguments = None):
+    parser = argparse.ArgumentParser(description = "Converts SolidWorks files into meshes without Cura")
+    parser.add_argument("source", help = "Directory with SolidWorks files or manifest (text or JSON) listing them")
+    parser.add_argument("--output", required = True, help = "Directory for the meshes")
+    parser.add_argument("--report", help = "Path of the JSON report. Defaults to report.json in the output directory.")
+    parser.add_argument("--quality", type = int, default = 30,
+                        help = "Quality class: 30 fine (3D-printing), 20 coarse (3D-printing), 10 fine (SolidWorks), 0 coarse (SolidWorks), -1 keep settings, -2 adapted to the model size")
+    parser.add_argument("--weld-epsilon", type = float, default = 0.001, help = "Distance in mm for merging vertices. 0 disables it.")
+    parser.add_argument("--triangle-budget", type = int, default = 0, help = "Maximum triangles per mesh. 0 disables the decimation.")
+    parser.add_argument("--decimation-max-error", type = float, default = 0.0,
+                        help = "Maximum deviation in mm of decimated meshes. Meshes are decimated, if either this or the triangle budget is set. 0 means unlimited.")
+    parser.add_argument("--workers", type = int, default = 2, help = "Threads reading and writing meshes")
+    parser.add_argument("--open-strategy", choices = ["auto", "resolved", "lightweight"], default = "auto",
+                        help = "How assemblies are opened. \"auto\" opens large ones lightweight.")
+    parser.add_argument("--no-auto-rotate", action = "store_true", help = "Keeps the coordinates of SolidWorks instead of rotating the meshes like Cura does")
+    parser.add_argument("--instanced-assemblies", action = "store_true", help = "Exports each unique part of an assembly once and places it per instance")
+    parser.add_argument("--cache-directory", help = "Mesh cache, so unchanged files don't need to be converted by SolidWorks again")
+    parser.add_argument("--cache-size-limit", type = int, default = 2048, help = "Size of the mesh cache in MB")
+    parser.add_argument("--trace-directory", help = "Writes Chrome traces of each file into this directory")
+    parser.add_argument("--app", default = "SldWorks.Application", help = "COM service of SolidWorks, e.g. SldWorks.Application.26")
+    parser.add_argument("--fake", action = "store_true", help = "Uses the fake SolidWorks of the tests")
+    parser.add_argument("--fake-latency", type = float, default = 0.0, help = "Latency per COM call of the fake in seconds")
+    parser.add_argument("--fake-triangles", type = int, default = 10000, help = "Triangles per document of the fake")
+    arguments = parser.parse_args(arguments)
+
+    files = collectFiles(arguments.source)
+    if arguments.fake:
+        backend = FakeComBackend(arguments.fake_latency, arguments.fake_triangles)
+    else:
+        backend = ComBackend(arguments.app)
+
+    converter = SolidWorksBatchConverter(backend,
+                                         arguments.output,
+                                         quality = arguments.quality,
+                                         weld_epsilon = arguments.weld_epsilon,
+                                         triangle_budget = arguments.triangle_budget,
+                                         decimation_max_error = arguments.decimation_max_error,
+                                         workers = arguments.workers,
+                                         trace_directory = arguments.trace_directory,
+                                         open_strategy = arguments.open_strategy,
+                                         auto_rotate = not arguments.no_auto_rotate,
+                                         instanced_assemblies = arguments.instanced_assemblies,
+                                         cache_directory = arguments.cache_directory,
+                                         cache_size_limit = arguments.cache_size_limit * 1024 * 1024,
+                                         )
+    report = converter.run(files)
+
+    report_path = arguments.report or os.path.join(arguments.output, "report.json")
+    os.makedirs(os.path.dirname(os.path.abspath(report_path)), exist_ok = True)
+    with open(report_path, "w") as report_file:
+        json.dump(report, report_file, indent = 2)
+
+    print("Converted {} of {} files in {:.1f}s. Report: {}".format(report["converted"], len(files), report["total_time"], report_path))
+    for entry in report["files"]:
+        if entry["error"]:
+            print("Failed: {} - {}".format(entry["file"], entry["error"]))
+    return 0 if not report["failed"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -14,7 +14,7 @@ UM.Dialog
     minimumWidth: width;
     maximumWidth: width;
 
-    height: Math.floor(screenScaleFactor * 250);
+    height: Math.floor(screenScaleFactor * 330);
     minimumHeight: height;
     maximumHeight: height;
 
@@ -25,9 +25,26 @@ UM.Dialog
         if (visible)
         {
             conversionTab.qualityDropdown.updateCurrentIndex();
+            conversionTab.triangleBudgetDropdown.updateCurrentIndex();
+            conversionTab.maxErrorDropdown.updateCurrentIndex();
             conversionTab.installations.updateCurrentIndex();
             conversionTab.showWizard.checked = UM.Preferences.getValue("cura_solidworks/show_export_settings_always");
             conversionTab.autoRotate.checked = UM.Preferences.getValue("cura_solidworks/auto_rotate");
+            conversionTab.instancedAssemblies.checked = UM.Preferences.getValue("cura_solidworks/instanced_assemblies");
+        }
+    }
+
+    Connections
+    {
+        target: manager
+        onInstallationsChanged:
+        {
+            // Installations are checked in the background, so update the lists whenever a check finished
+            conversionTab.installations.ensureListWithEntries();
+            if (installationsTab.versionDropdown)
+            {
+                installationsTab.versionDropdown.ensureListWithEntries();
+            }
         }
     }
 
@@ -41,8 +58,11 @@ UM.Dialog
 
             property Item showWizard: item.showWizard
             property Item autoRotate: item.autoRotateCheckBox
+            property Item instancedAssemblies: item.instancedAssembliesCheckBox
             property Item qualityDropdown: item.qualityDropdown
             property Item qualityModel: item.choiceModel
+            property Item triangleBudgetDropdown: item.triangleBudgetDropdown
+            property Item maxErrorDropdown: item.maxErrorDropdown
             property Item installations: item.installationsDropdown
 
             GridLayout
@@ -55,8 +75,11 @@ UM.Dialog
 
                 property Item showWizard: showWizardCheckBox
                 property Item autoRotateCheckBox: autoRotateCheckBox
+                property Item instancedAssembliesCheckBox: instancedAssembliesCheckBox
                 property Item qualityDropdown: qualityDropdown
                 property Item choiceModel: choiceModel
+                property Item triangleBudgetDropdown: triangleBudgetDropdown
+                property Item maxErrorDropdown: maxErrorDropdown
                 property Item installationsDropdown: installationsDropdown
 
                 Row {
@@ -181,6 +204,114 @@ UM.Dialog
                                 append({ text: catalog.i18nc("@option:curaSolidworksStlQuality", "Fine (SolidWorks)"), code: 10 });
                                 append({ text: catalog.i18nc("@option:curaSolidworksStlQuality", "Coarse (SolidWorks)"), code: 0 });
                                 append({ text: catalog.i18nc("@option:curaSolidworksStlQuality", "Keep settings unchanged"), code: -1 });
+                                append({ text: catalog.i18nc("@option:curaSolidworksStlQuality", "Custom (adapted to the model size)"), code: -2 });
+                            }
+                        }
+                    }
+                }
+                Row
+                {
+                    width: parent.width
+
+                    Label {
+                        text: catalog.i18nc("@action:label", "Triangle limit:")
+                        width: 100 * screenScaleFactor
+                        anchors.verticalCenter: parent.verticalCenter
+                    }
+
+                    ComboBox
+                    {
+                        id: triangleBudgetDropdown
+
+                        currentIndex: updateCurrentIndex()
+                        width: 240 * screenScaleFactor
+
+                        function updateCurrentIndex()
+                        {
+                            var index = 0; // Top element in the list below by default
+                            var currentChoice = UM.Preferences.getValue("cura_solidworks/triangle_budget");
+                            for (var i = 0; i < model.count; ++i)
+                            {
+                                if (model.get(i).code == currentChoice)
+                                {
+                                    index = i;
+                                    break;
+                                }
+                            }
+                            currentIndex = index;
+                        }
+
+                        function saveTriangleBudget()
+                        {
+                            var code = model.get(currentIndex).code;
+                            UM.Preferences.setValue("cura_solidworks/triangle_budget", code);
+                        }
+
+                        model: ListModel
+                        {
+                            id: triangleBudgetModel
+
+                            Component.onCompleted:
+                            {
+                                append({ text: catalog.i18nc("@option:curaSolidworksTriangleBudget", "Unlimited"), code: 0 });
+                                append({ text: catalog.i18nc("@option:curaSolidworksTriangleBudget", "100,000 triangles"), code: 100000 });
+                                append({ text: catalog.i18nc("@option:curaSolidworksTriangleBudget", "250,000 triangles"), code: 250000 });
+                                append({ text: catalog.i18nc("@option:curaSolidworksTriangleBudget", "500,000 triangles"), code: 500000 });
+                                append({ text: catalog.i18nc("@option:curaSolidworksTriangleBudget", "1,000,000 triangles"), code: 1000000 });
+                                append({ text: catalog.i18nc("@option:curaSolidworksTriangleBudget", "2,000,000 triangles"), code: 2000000 });
+                            }
+                        }
+                    }
+                }
+                Row
+                {
+                    width: parent.width
+
+                    Label {
+                        text: catalog.i18nc("@action:label", "Max. deviation:")
+                        width: 100 * screenScaleFactor
+                        anchors.verticalCenter: parent.verticalCenter
+                    }
+
+                    ComboBox
+                    {
+                        id: maxErrorDropdown
+
+                        currentIndex: updateCurrentIndex()
+                        width: 240 * screenScaleFactor
+
+                        function updateCurrentIndex()
+                        {
+                            var index = 0; // Top element in the list below by default
+                            var currentChoice = UM.Preferences.getValue("cura_solidworks/decimation_max_error");
+                            for (var i = 0; i < model.count; ++i)
+                            {
+                                if (model.get(i).code == currentChoice)
+                                {
+                                    index = i;
+                                    break;
+                                }
+                            }
+                            currentIndex = index;
+                        }
+
+                        function saveMaxError()
+                        {
+                            var code = model.get(currentIndex).code;
+                            UM.Preferences.setValue("cura_solidworks/decimation_max_error", code);
+                        }
+
+                        model: ListModel
+                        {
+                            id: maxErrorModel
+
+                            Component.onCompleted:
+                            {
+                                append({ text: catalog.i18nc("@option:curaSolidworksMaxError", "Unlimited"), code: 0 });
+                                append({ text: catalog.i18nc("@option:curaSolidworksMaxError", "0.01 mm"), code: 0.01 });
+                                append({ text: catalog.i18nc("@option:curaSolidworksMaxError", "0.02 mm"), code: 0.02 });
+                                append({ text: catalog.i18nc("@option:curaSolidworksMaxError", "0.05 mm"), code: 0.05 });
+                                append({ text: catalog.i18nc("@option:curaSolidworksMaxError", "0.1 mm"), code: 0.1 });
                             }
                         }
                     }
@@ -205,6 +336,16 @@ UM.Dialog
                         checked: UM.Preferences.getValue("cura_solidworks/auto_rotate");
                     }
                 }
+                Row
+                {
+                    width: parent.width
+                    CheckBox
+                    {
+                        id: instancedAssembliesCheckBox
+                        text: catalog.i18nc("@label", "Export each part of an assembly only once");
+                        checked: UM.Preferences.getValue("cura_solidworks/instanced_assemblies");
+                    }
+                }
             }
         }
         Tab {
@@ -244,7 +385,10 @@ UM.Dialog
                                 model.append({ text: manager.getFriendlyName(version), code: version });
                             }
                             currentIndex = 0;
-                            updateCheckBoxes(model.get(currentIndex).code);
+                            if (model.count > 0)
+                            {
+                                updateCheckBoxes(model.get(currentIndex).code);
+                            }
                         }
 
                         function updateCheckBoxes(rev_code)
@@ -331,6 +475,28 @@ UM.Dialog
                         checked: false;
                     }
                 }
+                Row
+                {
+                    width: parent.width
+                    spacing: 10 * screenScaleFactor
+
+                    Button
+                    {
+                        text: catalog.i18nc("@action:button", "Check again");
+                        enabled: !manager.installationChecksPending;
+                        onClicked:
+                        {
+                            manager.checkInstallationsAgain();
+                        }
+                    }
+
+                    Label
+                    {
+                        text: catalog.i18nc("@label", "Checking installations..");
+                        visible: manager.installationChecksPending;
+                        anchors.verticalCenter: parent.verticalCenter
+                    }
+                }
             }
         }
     }
@@ -343,9 +509,12 @@ UM.Dialog
             onClicked:
             {
                 conversionTab.qualityDropdown.saveQualityCode();
+                conversionTab.triangleBudgetDropdown.saveTriangleBudget();
+                conversionTab.maxErrorDropdown.saveMaxError();
                 conversionTab.installations.saveInstallationCode();
                 UM.Preferences.setValue("cura_solidworks/show_export_settings_always", conversionTab.showWizard.checked);
                 UM.Preferences.setValue("cura_solidworks/auto_rotate", conversionTab.autoRotate.checked);
+                UM.Preferences.setValue("cura_solidworks/instanced_assemblies", conversionTab.instancedAssemblies.checked);
                 close();
             }
             enabled: true
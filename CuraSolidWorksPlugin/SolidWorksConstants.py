@@ -12,6 +12,13 @@ class SolidWorksEnums:
         swDontRebuildActiveDoc = 1
         swRebuildActiveDoc = 2
     
+    class swComponentSuppressionState_e:
+        swComponentSuppressed = 0
+        swComponentLightweight = 1
+        swComponentFullyResolved = 2
+        swComponentResolved = 3
+        swComponentFullyLightweight = 4
+    
     class swUserPreferenceToggle_e:
         swSTLBinaryFormat = 69
 
@@ -3,6 +3,7 @@
 
 import os
 import threading
+from concurrent.futures import Future
 
 # Uranium
 from UM.i18n import i18nCatalog # @UnresolvedImport
@@ -14,7 +15,7 @@ from UM.PluginRegistry import PluginRegistry # @UnresolvedImport
 from UM.Preferences import Preferences # @UnresolvedImport
 
 # PyQt5
-from PyQt5.QtCore import pyqtSignal, pyqtSlot # @UnresolvedImport
+from PyQt5.QtCore import pyqtProperty, pyqtSignal, pyqtSlot # @UnresolvedImport
 from PyQt5.QtCore import QUrl, QObject # @UnresolvedImport
 from PyQt5.QtQml import QQmlComponent, QQmlContext # @UnresolvedImport
 
@@ -45,7 +46,8 @@ class SolidWorksUiCommons():
 
     @pyqtSlot(int, str, result = bool)
     def getTechnicalInfoPerVersion(self, revision, name):
-        return bool(self.reader.technical_infos_per_version[revision][name])
+        # Versions might still be checked in the background
+        return bool(self.reader.technical_infos_per_version.get(revision, {}).get(name, False))
 
     @pyqtSlot(result = list)
     def getVersionsList(self):
@@ -63,6 +65,8 @@ class SolidWorksUiCommons():
         return self.reader.getFriendlyName(major_revision)
 
 class SolidWorksDialogHandler(QObject, Extension, SolidWorksUiCommons):
+    installationsChanged = pyqtSignal()
+
     def __init__(self, reader, parent = None):
         super().__init__(parent)
         self.reader = reader
@@ -73,6 +77,19 @@ class SolidWorksDialogHandler(QObject, Extension, SolidWorksUiCommons):
         self.addMenuItem(i18n_catalog.i18n("Installation guide for SolidWorks macro"),
                          self._openTutorialDialog)
 
+        self.reader.installationChecksUpdated.connect(self._onInstallationChecksUpdated)
+
+    def _onInstallationChecksUpdated(self):
+        self.installationsChanged.emit()
+
+    @pyqtProperty(bool, notify = installationsChanged)
+    def installationChecksPending(self):
+        return self.reader.isInstallationCheckPending()
+
+    @pyqtSlot()
+    def checkInstallationsAgain(self):
+        self.reader.startInstallationChecks(use_stored_checks = False)
+
     def _openConfigDialog(self):
         if not self._config_dialog:
             self._config_dialog, self._config_context, self._config_component = self._createDialog("SolidWorksConfiguration.qml")
@@ -99,6 +116,7 @@ class SolidWorksReaderWizard(QObject, SolidWorksUiCommons):
 
         self._cancelled = False
         self._ui_view = None
+        self._ui_future = None
         self.show_config_ui_trigger.connect(self._onShowConfigUI)
 
         self._ui_lock = threading.Lock()
@@ -114,35 +132,45 @@ class SolidWorksReaderWizard(QObject, SolidWorksUiCommons):
         Logger.log("d", "Lock released!")
 
     def showConfigUI(self, blocking = False):
+        # Returns a future, which resolves to True, when the user accepted the export settings, and to False on cancel.
+        future = Future()
         self._ui_lock.acquire()
         preference = Deprecations.getPreferences().getValue("cura_solidworks/show_export_settings_always")
         Logger.log("d", "Showing wizard {} needed.. (preference = {})".format(["is", "is not"][preference],
                                                                               repr(preference)))
         if not preference:
             self._ui_lock.release()
-            return
+            future.set_result(True)
+            return future
         self._cancelled = False
+        self._ui_future = future
         self.show_config_ui_trigger.emit()
 
         if blocking:
             Logger.log("d", "Waiting for UI to close..")
             self.waitForUIToClose()
+        return future
 
     def _onShowConfigUI(self):
         if self._ui_view is None:
             self._ui_view, self._ui_context, self._ui_component = self._createDialog("SolidWorksWizard.qml", directory = os.path.split(__file__)[0])
         self._ui_view.show()
 
+    def _closeUI(self, accepted):
+        self._cancelled = not accepted
+        self._ui_view.close()
+        future = self._ui_future
+        self._ui_future = None
+        self._ui_lock.release()
+        if future:
+            future.set_result(accepted)
+
     @pyqtSlot()
     def onOkButtonClicked(self):
         Logger.log("d", "Clicked on OkButton")
-        self._cancelled = False
-        self._ui_view.close()
-        self._ui_lock.release()
+        self._closeUI(True)
 
     @pyqtSlot()
     def onCancelButtonClicked(self):
         Logger.log("d", "Clicked on CancelButton")
-        self._cancelled = True
-        self._ui_view.close()
-        self._ui_lock.release()
+        self._closeUI(False)
@@ -0,0 +1,726 @@
+# Copyright (c) 2018 Thomas Karl Pietrowski
+
+# Build-ins
+import os
+import tempfile
+import time
+import uuid
+
+# This plugin
+try:
+    from .SolidWorksConstants import SolidWorksEnums # @UnresolvedImport
+    from .SolidWorksDocumentIndex import SolidWorksDocumentIndex # @UnresolvedImport
+    from .SolidWorksExportProfile import export_preferences, getCacheQuality, getDocumentBoundingBox, getExportPreferenceProfile, getQualityName # @UnresolvedImport
+    from .SolidWorksLogger import PythonLogger # @UnresolvedImport
+    from .SolidWorksOpenStrategy import chooseOpenStrategy, isExportIncomplete # @UnresolvedImport
+    from .SolidWorksPreferenceState import SolidWorksPreferenceState # @UnresolvedImport
+    from .SolidWorksTessellation import getAdaptiveTolerances # @UnresolvedImport
+    from .SolidWorksTrace import traceSpan # @UnresolvedImport
+except ImportError:
+    from SolidWorksConstants import SolidWorksEnums # @UnresolvedImport
+    from SolidWorksDocumentIndex import SolidWorksDocumentIndex # @UnresolvedImport
+    from SolidWorksExportProfile import export_preferences, getCacheQuality, getDocumentBoundingBox, getExportPreferenceProfile, getQualityName # @UnresolvedImport
+    from SolidWorksLogger import PythonLogger # @UnresolvedImport
+    from SolidWorksOpenStrategy import chooseOpenStrategy, isExportIncomplete # @UnresolvedImport
+    from SolidWorksPreferenceState import SolidWorksPreferenceState # @UnresolvedImport
+    from SolidWorksTessellation import getAdaptiveTolerances # @UnresolvedImport
+    from SolidWorksTrace import traceSpan # @UnresolvedImport
+
+class SolidWorksDocumentExporter():
+    """
+    Opens, exports and closes SolidWorks documents through COM
+
+    - Used by SolidWorksReader and the batch converter, so it doesn't depend on Uranium or Cura.
+    - All methods are called by the thread, which owns the COM objects in options. See SolidWorksSession.
+    - options carry the settings ("app_*"), the running app ("app_instance") and the state of the document ("sw_*").
+    - com_connector provides GetComObject() and getByVarInt(): ComConnector of CadIntegrationUtils or a fake of the tests.
+    - Exports are handed to mesh_cache, when one is given and options["app_cache_enabled"] isn't False.
+    - Problems, which the user should know about, are flagged in options and shown by the caller:
+      "sw_open_errors" and "sw_drawing_without_models"
+    """
+
+    # Preferences of SolidWorks, which are changed for exporting
+    export_preferences = export_preferences
+
+    extension_part = ".SLDPRT"
+    extension_assembly = ".SLDASM"
+    extension_drawing = ".SLDDRW"
+    document_types = {extension_part: SolidWorksEnums.swDocumentTypes_e.swDocPART,
+                      extension_assembly: SolidWorksEnums.swDocumentTypes_e.swDocASSEMBLY,
+                      extension_drawing: SolidWorksEnums.swDocumentTypes_e.swDocDRAWING,
+                      }
+
+    def __init__(self, com_connector, logger = None, mesh_cache = None, debug = False):
+        self.com_connector = com_connector
+        self.logger = logger or PythonLogger()
+        self.mesh_cache = mesh_cache
+        # Skips SolidWorks and "exports" the example files of the tests instead
+        self.debug = debug
+
+    def isInstancedImport(self, options):
+        # Each unique part of an assembly is exported once and placed as instances. Otherwise the assembly is exported as one mesh.
+        return options["foreignFormat"].upper() == self.extension_assembly and options.get("app_instanced_assemblies", False)
+
+    # App
+
+    def hideApp(self, options):
+        # Tell SolidWorks we operating in the background
+        # SolidWorks API: 2006 SP2 (Rev 14.2)
+        options["app_operate_in_background"] = options["app_instance"].CommandInProgress # SolidWorks API: 2006 SP2 (Rev 14.2)
+        options["app_instance"].CommandInProgress = True
+
+        # Allow SolidWorks to run in the background and be invisible
+        # SolidWorks API: ?
+        options["app_instance_user_control"] = options["app_instance"].UserControl
+        options["app_instance"].UserControl = False
+
+        # If the following property is true, then the SolidWorks frame will be visible on a call to ISldWorks::ActivateDoc2; so set it to false
+        # SolidWorks API: ?
+        options["app_instance_visible"] = options["app_instance"].Visible
+        options["app_instance"].Visible = False
+
+        # Keep SolidWorks frame invisible when ISldWorks::ActivateDoc2 is called
+        # SolidWorks API: ?
+        options["app_frame"] = options["app_instance"].Frame
+        options["app_frame_invisible"] = options["app_frame"].KeepInvisible
+        options["app_frame"].KeepInvisible = True
+
+    def restoreApp(self, options):
+        if "app_frame" in options.keys():
+            # Normally, we want to do that, but this confuses SolidWorks more than needed, it seems.
+            self.logger.log("d", "Rolling back changes on app_frame.")
+            if "app_frame_invisible" in options.keys():
+                options["app_frame"].KeepInvisible = options["app_frame_invisible"]
+
+        if "app_instance" in options.keys():
+            # Same here. By logic I would assume that we need to undo it, but when processing multiple parts, SolidWorks gets confused again..
+            # Or there is another sense..
+            self.logger.log("d", "Rolling back changes on app_instance.")
+            if "app_instance_visible" in options.keys():
+                # SolidWorks API: ?
+                options["app_instance"].Visible = options["app_instance_visible"]
+            if "app_instance_user_control" in options.keys():
+                # SolidWorks API: ?
+                options["app_instance"].UserControl = options["app_instance_user_control"]
+            if "app_operate_in_background" in options.keys():
+                # SolidWorks API: 2006 SP2 (Rev 14.2)
+                options["app_instance"].CommandInProgress = options["app_operate_in_background"]
+
+    def getRevisionNumber(self, options):
+        # Getting revision after starting
+        # SolidWorks API: ?
+        revision_number = options["app_instance"].RevisionNumber
+        if isinstance(revision_number, str):
+            revision_number = [int(x) for x in revision_number.split(".")]
+            try:
+                options["version_major"] = revision_number[0]
+                self.logger.log("d", "Major version is: {}".format(options["version_major"]))
+                options["version_minor"] = revision_number[1]
+                self.logger.log("d", "Minor version is: {}".format(options["version_minor"]))
+                options["version_patch"] = revision_number[2]
+                self.logger.log("d", "Patch version is: {}".format(options["version_patch"]))
+            except IndexError:
+                self.logger.logException("w", "Unable to parse revision number from SolidWorks.RevisionNumber. revision_number is: {revision_number}.".format(revision_number = revision_number))
+            except:
+                self.logger.logException("c", "Unexpected error: revision_number = {revision_number}".format(revision_number = revision_number))
+        else:
+            self.logger.log("c", "revision_number has a wrong type: {}".format(type(revision_number)))
+
+        return revision_number
+
+    def getFileFormats(self, revision_major):
+        # Ordered list of preferred formats. 3MF files are read by our own streaming reader, so no check for Cura's readers is needed.
+        file_formats = []
+        if revision_major >= 25:
+            file_formats.append("3mf")
+        file_formats.append("stl")
+        return file_formats
+
+    # Sessions
+
+    def onSessionStarted(self, session_options, journal_path = None):
+        # Called by the session after SolidWorks has been started
+        if journal_path:
+            try:
+                if SolidWorksPreferenceState.restoreJournal(session_options["app_instance"], journal_path):
+                    self.logger.log("w", "Restored export settings of SolidWorks, which have been left modified last time!")
+            except:
+                self.logger.logException("e", "Could not restore the export settings from <{}>!".format(journal_path))
+        # Open documents are listed once and kept track of afterwards
+        session_options["document_index"] = SolidWorksDocumentIndex(session_options["app_instance"])
+        # Files opened by openPreparedFile() and the strategy they have been opened with
+        session_options["prepared_files"] = {}
+        # Reading the user's export settings once for the whole session
+        session_options["export_preference_state"] = SolidWorksPreferenceState(session_options["app_instance"],
+                                                                               self.export_preferences,
+                                                                               journal_path,
+                                                                               )
+
+    def onSessionClosing(self, session_options):
+        # Called by the session before SolidWorks gets closed
+        for file_path in list(session_options.get("prepared_files", ())):
+            self.closePreparedFile(session_options, file_path)
+        if "export_preference_state" in session_options.keys():
+            count = session_options["export_preference_state"].restore()
+            self.logger.log("d", "Restored {} export settings of SolidWorks.".format(count))
+            del session_options["export_preference_state"]
+
+    def joinSession(self, session_options, options):
+        # Hands the running app to options. The start of the app is added to the trace of the first job.
+        app_start_span = session_options.pop("app_start_span", None)
+        if app_start_span and "trace" in options.keys():
+            options["trace"].addSpan("startApp", "phase", *app_start_span)
+        options.update(session_options)
+        return options
+
+    # Open documents
+
+    def getDocumentIndex(self, options):
+        # Within a session the index is kept up to date. Otherwise the open documents are walked once per call.
+        if "document_index" in options.keys():
+            return options["document_index"]
+        return SolidWorksDocumentIndex(options["app_instance"])
+
+    def getOpenDocuments(self, options):
+        with traceSpan(options, "GetFirstDocument/GetNext", "com"):
+            open_files = self.getDocumentIndex(options).getDocuments()
+        self.logger.log("i", "Found {} open files..".format(len(open_files)))
+        return open_files
+
+    def getOpenDocumentPaths(self, options):
+        with traceSpan(options, "GetFirstDocument/GetNext", "com"):
+            return self.getDocumentIndex(options).getPaths()
+
+    def getOpenDocumentFilepathDict(self, options):
+        """
+        Returns a dictionary of filepaths and document objects
+
+        - Apparently we can't get .GetDocuments working
+        """
+
+        with traceSpan(options, "GetFirstDocument/GetNext", "com"):
+            return self.getDocumentIndex(options).getDocumentsByPath()
+
+    def getDocumentTitleByFilepath(self, options, filepath):
+        with traceSpan(options, "GetFirstDocument/GetNext", "com"):
+            title = self.getDocumentIndex(options).getTitle(filepath)
+        if title is not None:
+            self.logger.log("i", "Found title '{}' for file <{}>".format(title, os.path.normpath(filepath)))
+        return title
+
+    def getDocumentDependencies(self, options, filepath):
+        # Returns the file paths of all referenced documents. Looked up once per conversion.
+        known_dependencies = options.setdefault("sw_dependencies", {})
+        if filepath not in known_dependencies.keys():
+            with traceSpan(options, "GetDocumentDependencies2", "com"):
+                # SolidWorks API: 2007 FCS (Rev 15.0)
+                dependencies = options["app_instance"].GetDocumentDependencies2(filepath, True, True, False)
+            known_dependencies[filepath] = [os.path.normpath(dependency) for dependency in (dependencies or ())[1::2] if dependency]
+        return known_dependencies[filepath]
+
+    def getDocumentsInDrawing(self, options):
+        referenceModelNames = []
+        with traceSpan(options, "GetFirstView/GetNextView", "com"):
+            # SolidWorks API: ?
+            swView = options["sw_model"].GetFirstView
+            while not swView is None:
+                if swView.GetReferencedModelName not in referenceModelNames and swView.GetReferencedModelName != "":
+                    referenceModelNames.append(swView.GetReferencedModelName)
+                swView = swView.GetNextView
+        return referenceModelNames
+
+    def activatePreviousFile(self, options):
+        if "sw_previous_active_file" in options.keys():
+            if options["sw_previous_active_file"] and "GetTitle" in dir(options["sw_previous_active_file"]):
+                error = self.com_connector.getByVarInt()
+                # SolidWorks API: >= 20.0.x
+                options["app_instance"].ActivateDoc3(options["sw_previous_active_file"].GetTitle,
+                                                     True,
+                                                     SolidWorksEnums.swRebuildOnActivation_e.swDontRebuildActiveDoc,
+                                                     error
+                                                     )
+        return options
+
+    def openForeignFile(self, options):
+        if self.debug:
+            return options
+        document_index = self.getDocumentIndex(options)
+        with traceSpan(options, "GetFirstDocument/GetNext", "com"):
+            open_document = document_index.getDocument(options["foreignFile"])
+
+        # SolidWorks API: X
+        options["sw_previous_active_file"] = options["app_instance"].ActiveDoc
+        options["sw_model_path"] = options["foreignFile"]
+        # If the file has not been loaded open it!
+        if open_document is None:
+            self.logger.log("d", "Opening the foreign file!")
+            filetype = self.document_types.get(options["foreignFormat"].upper())
+            if filetype is None:
+                raise NotImplementedError("Unknown extension. Something went terribly wrong!")
+
+            # SolidWorks API: 2008 FCS (Rev 16.0)
+            documentSpecification = options["app_instance"].GetOpenDocSpec(options["foreignFile"])
+
+            ## NOTE: SPEC: FileName
+            #documentSpecification.FileName
+
+            ## NOTE: SPEC: DocumentType
+            ## TODO: Really needed here?!
+            documentSpecification.DocumentType = filetype
+
+            # Large assemblies are opened with the tessellation of their components only. See getOpenStrategy()
+            options["sw_open_strategy"] = self.getOpenStrategy(options)
+            documentSpecification.LightWeight = options["sw_open_strategy"] == "lightweight"
+            documentSpecification.Silent = True
+
+            ## TODO: Double check, whether file was really opened read-only..
+            documentSpecification.ReadOnly = True
+
+            documentSpecificationObject = self.com_connector.GetComObject(documentSpecification)
+            open_start_time = time.perf_counter()
+            with traceSpan(options, "OpenDoc7", "com", strategy = options["sw_open_strategy"]):
+                # SolidWorks API: 2008 FCS (Rev 16.0)
+                options["sw_model"] = options["app_instance"].OpenDoc7(documentSpecificationObject)
+            options["sw_open_time"] = time.perf_counter() - open_start_time
+            self.logger.log("i", "Opened <{}> {} within {:.2f}s.".format(options["foreignFile"], options["sw_open_strategy"], options["sw_open_time"]))
+            if options["sw_model"]:
+                document_index.add(options["foreignFile"], options["sw_model"])
+
+            if documentSpecification.Warning:
+                self.logger.log("w", "Warnings happened while opening your SolidWorks file!")
+            if documentSpecification.Error:
+                self.logger.log("e", "Errors happened while opening your SolidWorks file!")
+                options["sw_open_errors"] = True
+            options["sw_opened_file"] = True
+        else:
+            self.logger.log("d", "Foreign file has already been opened!")
+            options["sw_model"] = open_document
+            # Files opened by openPreparedFile() are closed like the ones opened here
+            open_strategy = options.get("prepared_files", {}).pop(os.path.normpath(options["foreignFile"]), None)
+            options["sw_opened_file"] = open_strategy is not None
+            if open_strategy is not None:
+                # Lightweight components are resolved or the export is repeated, like after opening the file here
+                options["sw_open_strategy"] = open_strategy
+
+        if options["foreignFormat"].upper() == self.extension_drawing:
+            drawing_models = self.getDocumentsInDrawing(options)
+            if not drawing_models:
+                self.logger.log("e", "Found no models inside <{}>!".format(options["foreignFile"]))
+                options["sw_drawing_without_models"] = True
+            else:
+                options["sw_drawing"] = options["sw_model"]
+                options["sw_drawing_path"] = options["sw_model_path"]
+                options["sw_drawing_opened"] = options["sw_opened_file"]
+                options["drawing_models"] = drawing_models
+                if len(drawing_models) == 1:
+                    options["cache_source_file"] = options["foreignFile"]
+                    options["foreignFile"] = drawing_models[0]
+                    options["foreignFormat"] = os.path.splitext(options["foreignFile"])[1]
+                    self.activatePreviousFile(options)
+                    options = self.openForeignFile(options)
+                else:
+                    # The models are opened one after another by exportDrawingModels(). The drawing is closed via sw_drawing_opened.
+                    options["sw_opened_file"] = False
+
+        error = self.com_connector.getByVarInt()
+        with traceSpan(options, "ActivateDoc3", "com"):
+            # SolidWorks API: >= 20.0.x
+            # SolidWorks API: 2001Plus FCS (Rev. 10.0) - GetTitle
+            options["app_instance"].ActivateDoc3(options["sw_model"].GetTitle,
+                                                 True,
+                                                 SolidWorksEnums.swRebuildOnActivation_e.swDontRebuildActiveDoc,
+                                                 error,
+                                                 )
+
+        return options
+
+    def openPreparedFile(self, session_options, options):
+        # Opens a file in advance, so the export doesn't need to wait for it. Closed by the export or closePreparedFile().
+        # options are the ones of the later import, so the file is opened the same way.
+        if self.debug:
+            return
+        file_path = options["foreignFile"]
+        options = dict(options)
+        options.update(session_options)
+        options = self.openForeignFile(options)
+        if options["sw_opened_file"]:
+            session_options["prepared_files"][os.path.normpath(file_path)] = options.get("sw_open_strategy", "resolved")
+        self.activatePreviousFile(options)
+
+    def closePreparedFile(self, session_options, file_path):
+        # Closes a file, which has been opened in advance, but won't be exported.
+        prepared_files = session_options.get("prepared_files", {})
+        file_path = os.path.normpath(file_path)
+        if file_path not in prepared_files.keys():
+            return
+        del prepared_files[file_path]
+        document_index = self.getDocumentIndex(session_options)
+        title = document_index.getTitle(file_path)
+        if title:
+            # SolidWorks API: ?
+            session_options["app_instance"].CloseDoc(title)
+            document_index.remove(file_path)
+
+    def getOpenStrategy(self, options):
+        # Only assemblies can be opened lightweight. Instanced imports need the model of each part. See exportAssemblyInstances()
+        if options["foreignFormat"].upper() != self.extension_assembly or self.isInstancedImport(options):
+            return "resolved"
+        strategy = options.get("app_open_strategy", "resolved")
+        if strategy != "auto":
+            return chooseOpenStrategy(strategy)
+        try:
+            file_size = os.path.getsize(options["foreignFile"])
+        except OSError:
+            file_size = None
+        component_count = len(self.getDocumentDependencies(options, options["foreignFile"]))
+        return chooseOpenStrategy(strategy,
+                                  component_count,
+                                  file_size,
+                                  component_limit = options["app_open_lightweight_components"],
+                                  file_size_limit = options["app_open_lightweight_file_size"],
+                                  )
+
+    def resolveLightweightComponents(self, options):
+        resolve_start_time = time.perf_counter()
+        with traceSpan(options, "ResolveAllLightWeightComponents", "com"):
+            # SolidWorks API: 2001Plus FCS (Rev 10.0)
+            options["sw_model"].ResolveAllLightWeightComponents(False)
+        options["sw_open_strategy"] = "resolved"
+        options["sw_open_fallback"] = True
+        options["sw_open_time"] = options.get("sw_open_time", 0.0) + time.perf_counter() - resolve_start_time
+        self.logger.log("i", "Resolved the components of <{}>. Opening took {:.2f}s in total.".format(options["foreignFile"], options["sw_open_time"]))
+
+    def getVisibleComponents(self, options):
+        # Parts of the assembly, which end up in the export
+        components = []
+        with traceSpan(options, "GetComponents", "com"):
+            # SolidWorks API: 2001Plus FCS (Rev 10.0)
+            for component in options["sw_model"].GetComponents(False) or ():
+                # SolidWorks API: 2001Plus FCS (Rev 10.0)
+                if component.IsSuppressed or component.IsHidden(True) or component.GetChildren:
+                    continue
+                components.append(component)
+        return components
+
+    def resolveUntessellatedComponents(self, options):
+        """
+        Resolves the lightweight components, which have been saved without tessellation data
+
+        - Those would be missing in the export. All other components keep being lightweight.
+        - The number of visible parts is kept as "sw_component_count" for checking the export. See isExportIncomplete()
+        """
+
+        lightweight_states = (SolidWorksEnums.swComponentSuppressionState_e.swComponentLightweight,
+                              SolidWorksEnums.swComponentSuppressionState_e.swComponentFullyLightweight,
+                              )
+        resolve_start_time = time.perf_counter()
+        options["sw_component_count"] = 0
+        try:
+            components = self.getVisibleComponents(options)
+            options["sw_component_count"] = len(components)
+            # SolidWorks API: ?
+            lightweight_components = [component for component in components if component.GetSuppression2 in lightweight_states]
+            # SolidWorks API: ?
+            untessellated_components = [component for component in lightweight_components if not component.GetTessTriangleCount]
+            with traceSpan(options, "SetSuppression2", "com"):
+                for component in untessellated_components:
+                    # SolidWorks API: ?
+                    component.SetSuppression2(SolidWorksEnums.swComponentSuppressionState_e.swComponentFullyResolved)
+        except:
+            self.logger.logException("w", "Could not check the components of <{}>!".format(options["foreignFile"]))
+            return
+        if not untessellated_components:
+            return
+        options["sw_resolved_components"] = len(untessellated_components)
+        options["sw_open_time"] = options.get("sw_open_time", 0.0) + time.perf_counter() - resolve_start_time
+        self.logger.log("i", "Resolved {} of {} lightweight components of <{}>, which lack tessellation data.".format(len(untessellated_components),
+                                                                                                                    len(lightweight_components),
+                                                                                                                    options["foreignFile"],
+                                                                                                                    ))
+
+    def suppressRebuilds(self, options):
+        # Keeps SolidWorks from updating the feature tree and the graphics, while the document is exported
+        if self.debug or not options.get("sw_model"):
+            return
+        try:
+            # SolidWorks API: 2001Plus FCS (Rev 10.0)
+            feature_manager = options["sw_model"].FeatureManager
+            options["sw_feature_tree_enabled"] = feature_manager.EnableFeatureTree
+            feature_manager.EnableFeatureTree = False
+            # SolidWorks API: 2001Plus FCS (Rev 10.0)
+            model_view = options["sw_model"].ActiveView
+            if model_view:
+                options["sw_graphics_update_enabled"] = model_view.EnableGraphicsUpdate
+                model_view.EnableGraphicsUpdate = False
+        except:
+            self.logger.logException("w", "Could not suppress updates of <{}>!".format(options["foreignFile"]))
+
+    def restoreRebuilds(self, options):
+        try:
+            if "sw_feature_tree_enabled" in options.keys():
+                options["sw_model"].FeatureManager.EnableFeatureTree = options.pop("sw_feature_tree_enabled")
+            if "sw_graphics_update_enabled" in options.keys():
+                options["sw_model"].ActiveView.EnableGraphicsUpdate = options.pop("sw_graphics_update_enabled")
+        except:
+            self.logger.logException("w", "Could not restore updates of <{}>!".format(options["foreignFile"]))
+
+    # Export
+
+    def exportForeignFile(self, options, file_formats = None):
+        # Opens the file, exports it into the first possible format and closes it again. Returns options with "tempFile" on success.
+        if file_formats is None:
+            file_formats = options["fileFormats"]
+        if "tempFile" in options.keys():
+            del options["tempFile"]
+
+        with traceSpan(options, "openForeignFile"):
+            options = self.openForeignFile(options)
+        self.suppressRebuilds(options)
+        try:
+            if options.get("sw_drawing_without_models", False):
+                return options
+            if self.isInstancedImport(options):
+                return self.exportAssemblyInstances(options)
+            if len(options.get("drawing_models", ())) > 1:
+                return self.exportDrawingModels(options, file_formats)
+
+            for index, file_format in enumerate(file_formats):
+                self.logger.log("d", "Trying to convert <{}> into '{}'".format(options["foreignFile"], file_format))
+                options["tempType"] = file_format
+                options["tempFile"] = os.path.join(tempfile.gettempdir(),
+                                                   "{}.{}".format(uuid.uuid4(), file_format.upper()),
+                                                   )
+                try:
+                    with traceSpan(options, "exportFileAs"):
+                        self.exportFileAs(options)
+                except:
+                    self.logger.logException("e", "Could not export <{}> into '{}'.".format(options["foreignFile"], file_format))
+                    continue
+                if os.path.isfile(options["tempFile"]):
+                    options["fileFormatsRemaining"] = file_formats[index + 1:]
+                    return options
+                self.logger.log("w", "Temporary file not found after export!")
+            del options["tempFile"]
+        finally:
+            self.restoreRebuilds(options)
+            with traceSpan(options, "closeForeignFile"):
+                self.closeForeignFile(options)
+        return options
+
+    def exportDrawingModels(self, options, file_formats):
+        # Exports every model referenced by the drawing, while the drawing stays open
+        options["drawing_exports"] = []
+        for model_path in options["drawing_models"]:
+            model_options = dict(options)
+            for key in ("sw_drawing", "sw_drawing_path", "sw_drawing_opened", "cache_source_file", "drawing_models", "drawing_exports"):
+                model_options.pop(key, None)
+            model_options["foreignFile"] = model_path
+            model_options["foreignFormat"] = os.path.splitext(model_path)[1]
+            try:
+                model_options = self.exportForeignFile(model_options, file_formats)
+            except:
+                self.logger.logException("e", "Could not export <{}> of the drawing.".format(model_path))
+                continue
+            if "tempFile" not in model_options.keys():
+                self.logger.log("w", "Could not export <{}> of the drawing.".format(model_path))
+                continue
+            options["drawing_exports"].append({"foreignFile": model_path,
+                                               "tempType": model_options["tempType"],
+                                               "tempFile": model_options["tempFile"],
+                                               "fileFormatsRemaining": model_options["fileFormatsRemaining"],
+                                               })
+        return options
+
+    def exportAssemblyInstances(self, options):
+        # Exports each unique part of the assembly once.
+        options["instanced_assembly"] = True
+        with traceSpan(options, "GetRootComponent3/GetChildren", "com"):
+            options["instances"] = self.getPartInstancesInAssembly(options)
+        options["instance_exports"] = {}
+        # Showing the configuration of an instance changes the part for the user, too. So it's restored afterwards.
+        active_configurations = {} # path -> (model, name of the configuration being active before)
+        try:
+            for instance_key, component, transformation in options["instances"]:
+                if instance_key in options["instance_exports"].keys():
+                    continue
+                part_options = dict(options)
+                part_options["tempType"] = "stl"
+                part_options["tempFile"] = os.path.join(tempfile.gettempdir(),
+                                                        "{}.STL".format(uuid.uuid4()),
+                                                        )
+                try:
+                    # SolidWorks API: 2003 FCS (Rev 11.0)
+                    part_options["sw_model"] = component.GetModelDoc2
+                    if instance_key[0] not in active_configurations.keys():
+                        # SolidWorks API: 2001Plus FCS (Rev 10.0)
+                        active_configurations[instance_key[0]] = (part_options["sw_model"],
+                                                                  part_options["sw_model"].GetActiveConfiguration.Name,
+                                                                  )
+                    # SolidWorks API: 2004 FCS (Rev 12.0)
+                    part_options["sw_model"].ShowConfiguration2(instance_key[1])
+                    self.saveModelAs(part_options)
+                except:
+                    self.logger.logException("e", "Could not export <{}> ({}).".format(*instance_key))
+                    continue
+                if os.path.isfile(part_options["tempFile"]):
+                    options["instance_exports"][instance_key] = part_options["tempFile"]
+        finally:
+            for path, (model, configuration) in active_configurations.items():
+                try:
+                    # SolidWorks API: 2004 FCS (Rev 12.0)
+                    model.ShowConfiguration2(configuration)
+                except:
+                    self.logger.logException("w", "Could not show the configuration {} of <{}> again.".format(configuration, path))
+        self.logger.log("i", "Exported {} unique parts for {} instances.".format(len(options["instance_exports"]),
+                                                                                  len(options["instances"]))
+                        )
+        # COM objects are not valid outside of the session
+        options["instances"] = [(instance_key, transformation) for instance_key, component, transformation in options["instances"]]
+        return options
+
+    def getPartInstancesInAssembly(self, options):
+        # Returns ((path, configuration), component, transformation) for every visible part in the assembly
+        instances = []
+        # SolidWorks API: 2001Plus FCS (Rev 10.0) - GetActiveConfiguration
+        # SolidWorks API: 2013 FCS (Rev 21.0) - GetRootComponent3
+        root_component = options["sw_model"].GetActiveConfiguration.GetRootComponent3(True)
+        components = list(root_component.GetChildren or [])
+        while components:
+            component = components.pop()
+            # SolidWorks API: 2001Plus FCS (Rev 10.0)
+            if component.IsSuppressed or component.IsHidden(True):
+                continue
+            children = component.GetChildren
+            if children:
+                # Sub-assembly: Transform2 of its children is relative to the root assembly already
+                components.extend(children)
+                continue
+            # SolidWorks API: 2004 FCS (Rev 12.0)
+            transformation = list(component.Transform2.ArrayData)
+            instance_key = (os.path.normpath(component.GetPathName), component.ReferencedConfiguration)
+            instances.append((instance_key, component, transformation))
+        return instances
+
+    def getExportPreferenceProfile(self, quality_enum, adaptive_tolerances = None, components_into_one_file = True):
+        if quality_enum == -2 and adaptive_tolerances:
+            self.logger.log("i", "Using custom quality: deviation {:.3f}, angle tolerance {:.2f}".format(*adaptive_tolerances))
+        else:
+            self.logger.log("i", "Using quality: {}".format(getQualityName(quality_enum)))
+        return getExportPreferenceProfile(quality_enum, adaptive_tolerances, components_into_one_file)
+
+    def exportFileAs(self, options, quality_enum = None):
+        if self.debug:
+            _plugin_dir = os.path.split(__file__)[0]
+            _test_file = os.path.join(_plugin_dir,
+                                      "tests",
+                                      "file_type_examples",
+                                      "test_cube.{}".format(options["tempType"].lower())
+                                      )
+            if not os.path.isfile(_test_file):
+                self.logger.log("w", "Test file not found!")
+            options["tempFile"] = _test_file
+            self.logger.log("w", "Overriding 'tempFile' with: {}".format(options["tempFile"]))
+            return options
+
+        if quality_enum is None:
+            quality_enum = options["app_export_quality"]
+
+        if options.get("sw_open_strategy") == "lightweight" and "sw_component_count" not in options.keys():
+            self.resolveUntessellatedComponents(options)
+        self.saveModelAs(options, quality_enum)
+        if options.get("sw_open_strategy") == "lightweight" and isExportIncomplete(options["tempFile"],
+                                                                                    options["tempType"],
+                                                                                    options.get("sw_component_count", 0),
+                                                                                    ):
+            self.logger.log("w", "Components of <{}> are missing in the export. Resolving all of them..".format(options["foreignFile"]))
+            if os.path.isfile(options["tempFile"]):
+                os.remove(options["tempFile"])
+            self.resolveLightweightComponents(options)
+            self.saveModelAs(options, quality_enum)
+        self.storeExportInCache(options, quality_enum)
+
+        return options
+
+    def storeExportInCache(self, options, quality_enum):
+        if self.mesh_cache is None or not options.get("app_cache_enabled", True) or not os.path.isfile(options["tempFile"]):
+            return
+        # In case of drawings the file, which has been opened originally, is used as the source
+        source_file = options.get("cache_source_file", options["foreignFile"])
+        try:
+            dependencies = self.getDocumentDependencies(options, source_file)
+            self.mesh_cache.store(source_file,
+                                  options["tempFile"],
+                                  options["tempType"],
+                                  getCacheQuality(quality_enum, options.get("app_triangle_budget", 0)),
+                                  options.get("version_major"),
+                                  options["app_auto_rotate"],
+                                  dependencies,
+                                  )
+        except:
+            self.logger.logException("w", "Failed to store <{}> in the mesh cache!".format(source_file))
+
+    def getModelBoundingBox(self, options):
+        # Returns the minimum and maximum corner in mm
+        return getDocumentBoundingBox(options["sw_model"])
+
+    def getModelTolerances(self, options):
+        try:
+            with traceSpan(options, "GetPartBox/GetBox", "com"):
+                box_minimum, box_maximum = self.getModelBoundingBox(options)
+        except:
+            self.logger.logException("w", "Could not get the bounding box of <{}>! Keeping the tessellation settings unchanged.".format(options["foreignFile"]))
+            return None
+        triangle_budget = options.get("app_triangle_budget", 0) or None
+        return getAdaptiveTolerances(box_minimum, box_maximum, triangle_budget)
+
+    def saveModelAs(self, options, quality_enum = None):
+        if quality_enum is None:
+            quality_enum = options["app_export_quality"]
+
+        # Within a session the settings are restored when closing SolidWorks. Otherwise right after exporting.
+        preference_state = options.get("export_preference_state", None)
+        restore_preferences = preference_state is None
+        if restore_preferences:
+            preference_state = SolidWorksPreferenceState(options["app_instance"], self.export_preferences)
+
+        adaptive_tolerances = None
+        if quality_enum == -2:
+            adaptive_tolerances = self.getModelTolerances(options)
+
+        try:
+            with traceSpan(options, "SetUserPreference", "com"):
+                count = preference_state.apply(self.getExportPreferenceProfile(quality_enum,
+                                                                               adaptive_tolerances,
+                                                                               components_into_one_file = not options.get("app_instanced_assemblies", False),
+                                                                               ))
+            self.logger.log("d", "Changed {} export settings of SolidWorks.".format(count))
+            with traceSpan(options, "SaveAs", "com"):
+                options["sw_model"].SaveAs(options["tempFile"])
+        finally:
+            if restore_preferences:
+                with traceSpan(options, "SetUserPreference", "com"):
+                    preference_state.restore()
+
+        return options
+
+    # Close documents
+
+    def closeForeignFile(self, options):
+        with traceSpan(options, "CloseDoc", "com"):
+            self._closeForeignDocuments(options)
+
+    def _closeForeignDocuments(self, options):
+        if "app_instance" in options.keys():
+            document_index = self.getDocumentIndex(options)
+            if "sw_opened_file" in options.keys():
+                if options["sw_opened_file"]:
+                    # SolidWorks API: ?
+                    # SolidWorks API: 2001Plus FCS (Rev. 10.0) - GetTitle
+                    options["app_instance"].CloseDoc(options["sw_model"].GetTitle)
+                    document_index.remove(options["sw_model_path"])
+            if "sw_drawing_opened" in options.keys():
+                if options["sw_drawing_opened"]:
+                    # SolidWorks API: ?
+                    options["app_instance"].CloseDoc(options["sw_drawing"].GetTitle)
+                    document_index.remove(options["sw_drawing_path"])
+            self.activatePreviousFile(options)
@@ -0,0 +1,89 @@
+# Copyright (c) 2018 Thomas Karl Pietrowski
+
+# Build-ins
+import os
+
+class SolidWorksDocumentIndex():
+    """
+    Index of the documents, which are open in SolidWorks
+
+    - Walking GetFirstDocument/GetNext and calling GetPathName on each document costs several COM calls per document.
+      The index walks the list once and is updated by add() and remove() afterwards.
+    - validate() compares the count of documents with GetDocumentCount and rebuilds the index if they differ.
+      That happens, when the user opened or closed documents or when SolidWorks loaded the references of an assembly.
+    - The count doesn't change, when the user closed one document and opened another one.
+      So each look-up of a single document is confirmed by GetOpenDocumentByName, which rebuilds the index on a mismatch.
+    """
+
+    def __init__(self, app_instance):
+        self.app_instance = app_instance
+        self._entries = None # normalized path -> (document, title)
+
+    def _normalizePath(self, filepath):
+        return os.path.normpath(filepath)
+
+    def build(self):
+        self._entries = {}
+        # SolidWorks API: 98Plus
+        document = self.app_instance.GetFirstDocument
+        while document:
+            # SolidWorks API: 2001Plus FCS (Rev. 10.0) - GetTitle
+            self._entries[self._normalizePath(document.GetPathName)] = (document, document.GetTitle)
+            document = document.GetNext
+
+    def validate(self):
+        if self._entries is None:
+            self.build()
+            return False
+        # SolidWorks API: 2001Plus FCS (Rev 10.0)
+        if self.app_instance.GetDocumentCount != len(self._entries):
+            self.build()
+            return False
+        return True
+
+    def invalidate(self):
+        self._entries = None
+
+    def getDocuments(self):
+        self.validate()
+        return [document for document, _ in self._entries.values()]
+
+    def getPaths(self):
+        self.validate()
+        return list(self._entries.keys())
+
+    def getDocumentsByPath(self):
+        self.validate()
+        return {filepath: document for filepath, (document, _) in self._entries.items()}
+
+    def lookup(self, filepath):
+        # Returns (document, title) or None
+        self.validate()
+        filepath = self._normalizePath(filepath)
+        entry = self._entries.get(filepath)
+        # SolidWorks API: 2001Plus FCS (Rev 10.0)
+        document = self.app_instance.GetOpenDocumentByName(filepath)
+        if (document is None) != (entry is None):
+            self.build()
+            entry = self._entries.get(filepath)
+        return entry
+
+    def getDocument(self, filepath):
+        entry = self.lookup(filepath)
+        return entry[0] if entry else None
+
+    def getTitle(self, filepath):
+        entry = self.lookup(filepath)
+        return entry[1] if entry else None
+
+    def add(self, filepath, document):
+        # Called after opening a document ourselves
+        if self._entries is None:
+            return
+        self._entries[self._normalizePath(filepath)] = (document, document.GetTitle)
+
+    def remove(self, filepath):
+        # Called after closing a document ourselves
+        if self._entries is None:
+            return
+        self._entries.pop(self._normalizePath(filepath), None)
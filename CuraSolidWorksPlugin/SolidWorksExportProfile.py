@@ -0,0 +1,93 @@
+# Copyright (c) 2018 Thomas Karl Pietrowski
+
+try:
+    from .SolidWorksConstants import SolidWorksEnums # @UnresolvedImport
+except ImportError:
+    # Imported outside of the plugin, e.g. by SolidWorksBatchConverter or the tests
+    from SolidWorksConstants import SolidWorksEnums # @UnresolvedImport
+
+# Preferences of SolidWorks, which are changed for exporting
+export_preferences = {"swSTLComponentsIntoOneFile": ("toggle", SolidWorksEnums.UserPreferences.swSTLComponentsIntoOneFile),
+                      "swExportSTLQuality": ("integer", SolidWorksEnums.swUserPreferenceIntegerValue_e.swExportSTLQuality),
+                      "swSTLAngleTolerance": ("double", SolidWorksEnums.swUserPreferenceDoubleValue_e.swSTLAngleTolerance),
+                      "swSTLDeviation": ("double", SolidWorksEnums.swUserPreferenceDoubleValue_e.swSTLDeviation),
+                      "swExportStlUnits": ("integer", SolidWorksEnums.swUserPreferenceIntegerValue_e.swExportStlUnits),
+                      "swSTLBinaryFormat": ("toggle", SolidWorksEnums.swUserPreferenceToggle_e.swSTLBinaryFormat),
+                      }
+
+quality_classes = {30 : "Fine (3D-printing)",
+                   20 : "Coarse (3D-printing)",
+                   10 : "Fine (SolidWorks)",
+                    0 : "Coarse (SolidWorks)",
+                   -1 : "Keep settings unchanged",
+                   -2 : "Custom (adapted to the model size)",
+                   }
+
+def getExportPreferenceProfile(quality_enum, adaptive_tolerances = None, components_into_one_file = True):
+    profile = {}
+
+    # Export for assemblies
+    # SolidWorks API: 2001 Plus FCS (Rev 10.0)
+    profile["swSTLComponentsIntoOneFile"] = components_into_one_file
+
+    # Setting  quality
+    # -2 := Custom (derived from the size of the model, see getAdaptiveTolerances())
+    # -1 := Keep settings unchanged
+    #  0 := Coarse (as defined by SolidWorks)
+    # 10 := Fine (as defined by SolidWorks)
+    # 20 := Coarse (3D printing profile)
+    # 30 := Fine (3D printing profile)
+
+    if quality_enum == -2 and adaptive_tolerances:
+        profile["swExportSTLQuality"] = SolidWorksEnums.swSTLQuality_e.swSTLQuality_Custom
+        profile["swSTLDeviation"] = adaptive_tolerances[0]
+        profile["swSTLAngleTolerance"] = adaptive_tolerances[1]
+    elif quality_enum < 0:
+        pass # Using the settings, which are currently set in SolidWorks
+    elif quality_enum in range(0, 10):
+        profile["swExportSTLQuality"] = SolidWorksEnums.swSTLQuality_e.swSTLQuality_Coarse
+    elif quality_enum in range(10, 20):
+        profile["swExportSTLQuality"] = SolidWorksEnums.swSTLQuality_e.swSTLQuality_Fine
+    elif quality_enum in range(20, 30):
+        profile["swExportSTLQuality"] = SolidWorksEnums.swSTLQuality_e.swSTLQuality_Custom
+        profile["swSTLAngleTolerance"] = 5.0
+        profile["swSTLDeviation"] = 0.4
+    else:
+        profile["swExportSTLQuality"] = SolidWorksEnums.swSTLQuality_e.swSTLQuality_Custom
+        profile["swSTLAngleTolerance"] = 1.0
+        profile["swSTLDeviation"] = 0.1
+
+    # Changing the default unit for STLs to mm, which is expected by Cura
+    profile["swExportStlUnits"] = SolidWorksEnums.swLengthUnit_e.swMM
+
+    # Changing the output type temporary to binary
+    # SolidWorks API: 2001 Plus FCS (Rev 10.0)
+    profile["swSTLBinaryFormat"] = True
+
+    return profile
+
+def getQualityName(quality_enum):
+    # Name of the quality class, the value belongs to
+    if quality_enum in quality_classes.keys():
+        return quality_classes[quality_enum]
+    if quality_enum < 0:
+        return quality_classes[-1]
+    return quality_classes[min(quality_enum // 10 * 10, 30)]
+
+def getCacheQuality(quality_enum, triangle_budget = 0):
+    # Quality, the mesh cache stores exports by. The custom quality also depends on the triangle budget.
+    if quality_enum == -2:
+        return [quality_enum, triangle_budget or 0]
+    return quality_enum
+
+def getDocumentBoundingBox(document):
+    # Returns the minimum and maximum corner in mm
+    # SolidWorks API: 2001Plus FCS (Rev 10.0) - GetType
+    if document.GetType == SolidWorksEnums.swDocumentTypes_e.swDocASSEMBLY:
+        # SolidWorks API: 2001Plus FCS (Rev 10.0)
+        box = document.GetBox(0)
+    else:
+        # SolidWorks API: 2001Plus FCS (Rev 10.0)
+        box = document.GetPartBox(True)
+    box = [value * 1000.0 for value in box] # m -> mm
+    return box[:3], box[3:6]
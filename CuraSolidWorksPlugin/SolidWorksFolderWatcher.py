@@ -0,0 +1,161 @@
+# Copyright (c) 2018 Thomas Karl Pietrowski
+
+# Build-ins
+import os
+import queue
+import threading
+import time
+
+class SolidWorksFolderWatcher():
+    """
+    Watches folders for new or changed files and hands them to a callback
+
+    - The folders are polled, since change notifications don't work reliably on network shares.
+    - Files are compared by size and modification time. Bursts of saves are debounced:
+      A file is only handed over, when it didn't change for debounce seconds.
+    - Settled files wait in a queue of at most max_queued files for the workers.
+      When the queue is full, files stay pending and are queued by one of the next polls.
+    - Files, which exist when the watcher starts, are only handed over with convert_existing = True.
+    - stop() never waits for space in the queue. The workers notice the stop, once the queue is empty.
+    """
+
+    # Seconds an idle worker waits for a file, before it checks whether the watcher has been stopped
+    stop_check_interval = 0.1
+
+    def __init__(self, folders, callback, extensions, poll_interval = 5, debounce = 10, max_queued = 16, workers = 1,
+                 convert_existing = False, time_function = time.monotonic):
+        self.folders = list(folders)
+        self.callback = callback
+        self.extensions = [extension.upper() for extension in extensions]
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.workers = workers
+        self.convert_existing = convert_existing
+        self.time_function = time_function
+
+        self.handled = 0
+        self.failed = 0
+
+        self._known = None # path -> fingerprint, which has been handed over or existed at the start
+        self._pending = {} # path -> (fingerprint, time of the last change)
+        self._queued = set()
+        self._queue = queue.Queue(maxsize = max_queued)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._watch_thread = None
+        self._worker_threads = []
+
+    def isWatchedFile(self, file_name):
+        # Lock files of open documents start with "~$"
+        return os.path.splitext(file_name)[1].upper() in self.extensions and not file_name.startswith("~$")
+
+    def scan(self):
+        # Returns {path: (size, mtime)} of all watched files
+        files = {}
+        for folder in self.folders:
+            for directory, _, file_names in os.walk(folder):
+                for file_name in file_names:
+                    if not self.isWatchedFile(file_name):
+                        continue
+                    file_path = os.path.join(directory, file_name)
+                    try:
+                        stat = os.stat(file_path)
+                    except OSError:
+                        continue # Removed meanwhile
+                    files[file_path] = (stat.st_size, stat.st_mtime_ns)
+        return files
+
+    def poll(self):
+        # Returns the list of files, which have been queued
+        files = self.scan()
+        now = self.time_function()
+        queued = []
+        with self._lock:
+            if self._known is None:
+                self._known = {} if self.convert_existing else dict(files)
+
+            for file_path in list(self._known.keys()):
+                if file_path not in files:
+                    del self._known[file_path]
+            for file_path in list(self._pending.keys()):
+                if file_path not in files:
+                    del self._pending[file_path]
+
+            for file_path, fingerprint in files.items():
+                if self._known.get(file_path) == fingerprint:
+                    continue
+                pending = self._pending.get(file_path)
+                if pending is None or pending[0] != fingerprint:
+                    # New or changed again. Waiting for the saves to settle down.
+                    self._pending[file_path] = (fingerprint, now)
+                    continue
+                if now - pending[1] < self.debounce or file_path in self._queued:
+                    continue
+                if self._stop_event.is_set():
+                    break # Nothing is queued anymore, after stop() has drained the queue
+                try:
+                    self._queue.put_nowait(file_path)
+                except queue.Full:
+                    continue
+                self._queued.add(file_path)
+                self._known[file_path] = fingerprint
+                del self._pending[file_path]
+                queued.append(file_path)
+        return queued
+
+    def _work(self):
+        while True:
+            try:
+                file_path = self._queue.get(timeout = self.stop_check_interval)
+            except queue.Empty:
+                if self._stop_event.is_set():
+                    break
+                continue
+            succeeded = False
+            try:
+                self.callback(file_path)
+                succeeded = True
+            except Exception:
+                pass # The callback is expected to report its errors. The file is tried again, when it changes next time.
+            with self._lock:
+                self._queued.discard(file_path)
+                if succeeded:
+                    self.handled += 1
+                else:
+                    self.failed += 1
+
+    def _watch(self):
+        while not self._stop_event.is_set():
+            try:
+                self.poll()
+            except OSError:
+                pass # Folder temporarily not accessible
+            self._stop_event.wait(self.poll_interval)
+
+    def start(self):
+        self._stop_event.clear()
+        self._worker_threads = [threading.Thread(target = self._work, name = "SolidWorksFolderWatcher-{}".format(index), daemon = True)
+                                for index in range(self.workers)]
+        self._watch_thread = threading.Thread(target = self._watch, name = "SolidWorksFolderWatcher", daemon = True)
+        for thread in self._worker_threads + [self._watch_thread]:
+            thread.start()
+
+    def stop(self, timeout = None, discard_queued = False):
+        # Files, which have been queued already, are still handled unless discard_queued is set
+        self._stop_event.set()
+        if self._watch_thread:
+            self._watch_thread.join(timeout)
+            self._watch_thread = None
+        if discard_queued:
+            with self._lock:
+                while True:
+                    try:
+                        file_path = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    # Handed over again, when it changes next time
+                    self._queued.discard(file_path)
+                    self._known.pop(file_path, None)
+        for thread in self._worker_threads:
+            thread.join(timeout)
+        self._worker_threads = []
@@ -0,0 +1,29 @@
+# Copyright (c) 2018 Thomas Karl Pietrowski
+
+# Build-ins
+import logging
+
+class PythonLogger():
+    """
+    Same interface as UM.Logger, but logs through Python's logging
+
+    - Used by the modules, which also run without Cura: In the batch converter and the tests.
+      Inside Cura they get UM.Logger passed instead.
+    - Messages are formatted with the given arguments like UM.Logger does: log("d", "Started: %s", name)
+    """
+
+    levels = {"d": logging.DEBUG,
+              "i": logging.INFO,
+              "w": logging.WARNING,
+              "e": logging.ERROR,
+              "c": logging.CRITICAL,
+              }
+
+    def __init__(self, name = "SolidWorksPlugin"):
+        self._logger = logging.getLogger(name)
+
+    def log(self, log_type, message, *args):
+        self._logger.log(self.levels.get(log_type, logging.INFO), message, *args)
+
+    def logException(self, log_type, message, *args):
+        self._logger.log(self.levels.get(log_type, logging.ERROR), message, *args, exc_info = True)
@@ -0,0 +1,194 @@
+# Copyright (c) 2018 Thomas Karl Pietrowski
+
+# Build-ins
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+class SolidWorksMeshCache():
+    """
+    Persistent on-disk cache of meshes exported by SolidWorks
+
+    - Entries are keyed by the content hash of the source file, the quality setting and the auto-rotate flag.
+    - The SolidWorks major revision is stored per entry. A lookup with a known revision only hits entries of the same revision.
+      With revision None, e.g. when the default installation hasn't been started yet, the revision stored last is accepted.
+    - The hashes of referenced documents are stored per entry and verified on lookup.
+    - The total size is capped and the least recently used entries get evicted first.
+      Hashes of files, which aren't referenced by any entry anymore, are dropped with them.
+    - Exported files are hard-linked into the cache, so they aren't written twice. Copied only across drives.
+    """
+
+    index_filename = "index.json"
+    hash_block_size = 1024 * 1024
+
+    def __init__(self, directory, size_limit):
+        self.directory = directory
+        self.size_limit = size_limit # in bytes
+
+        self._lock = threading.RLock()
+        self._index = None
+
+    def _getIndexPath(self):
+        return os.path.join(self.directory, self.index_filename)
+
+    def _loadIndex(self):
+        if self._index is not None:
+            return self._index
+        self._index = {"entries": {},
+                       "hashes": {},
+                       }
+        try:
+            with open(self._getIndexPath(), "r") as index_file:
+                index = json.load(index_file)
+            self._index["entries"].update(index.get("entries", {}))
+            self._index["hashes"].update(index.get("hashes", {}))
+        except (OSError, ValueError):
+            pass
+        # Entries of previous versions were keyed by the revision and can't be found anymore
+        for key in [key for key, entry in self._index["entries"].items() if "revision" not in entry.keys()]:
+            self._removeEntry(key)
+        return self._index
+
+    def _saveIndex(self):
+        os.makedirs(self.directory, exist_ok = True)
+        index_path = self._getIndexPath()
+        with open(index_path + ".tmp", "w") as index_file:
+            json.dump(self._index, index_file)
+        os.replace(index_path + ".tmp", index_path)
+
+    def hashFile(self, filepath):
+        # Hashing multiple GB is expensive. As long as size and mtime did not change, the last hash is reused.
+        filepath = os.path.normpath(filepath)
+        stat = os.stat(filepath)
+        fingerprint = [stat.st_size, stat.st_mtime_ns]
+        hashes = self._loadIndex()["hashes"]
+        if filepath in hashes and hashes[filepath][:2] == fingerprint:
+            return hashes[filepath][2]
+
+        file_hash = hashlib.sha256()
+        with open(filepath, "rb") as file_object:
+            block = file_object.read(self.hash_block_size)
+            while block:
+                file_hash.update(block)
+                block = file_object.read(self.hash_block_size)
+        hashes[filepath] = fingerprint + [file_hash.hexdigest()]
+        return hashes[filepath][2]
+
+    def makeKey(self, source_hash, quality, auto_rotate):
+        key_data = json.dumps([source_hash, quality, bool(auto_rotate)])
+        return hashlib.sha256(key_data.encode("utf-8")).hexdigest()
+
+    def _areDependenciesUnchanged(self, dependencies):
+        for filepath, file_hash in dependencies.items():
+            try:
+                if self.hashFile(filepath) != file_hash:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def lookup(self, source_file, quality, revision, auto_rotate):
+        with self._lock:
+            try:
+                key = self.makeKey(self.hashFile(source_file), quality, auto_rotate)
+            except OSError:
+                return None
+            entries = self._loadIndex()["entries"]
+            if key not in entries:
+                return None
+            entry = entries[key]
+            if revision is not None and entry["revision"] != revision:
+                # Replaced by the next store()
+                return None
+            mesh_file = os.path.join(self.directory, entry["file"])
+            if not os.path.isfile(mesh_file) or not self._areDependenciesUnchanged(entry["dependencies"]):
+                self._removeEntry(key)
+                self._pruneHashes()
+                self._saveIndex()
+                return None
+            entry["last_access"] = time.time()
+            self._saveIndex()
+            return {"file": mesh_file,
+                    "type": entry["type"],
+                    }
+
+    def store(self, source_file, mesh_file, mesh_type, quality, revision, auto_rotate, dependencies = ()):
+        with self._lock:
+            key = self.makeKey(self.hashFile(source_file), quality, auto_rotate)
+            dependency_hashes = {}
+            for dependency in dependencies:
+                try:
+                    dependency_hashes[os.path.normpath(dependency)] = self.hashFile(dependency)
+                except OSError:
+                    # Not found on disk. Can't be validated later, so don't cache at all.
+                    return None
+
+            entries = self._loadIndex()["entries"]
+            if key in entries:
+                self._removeEntry(key)
+
+            os.makedirs(self.directory, exist_ok = True)
+            filename = "{}.{}".format(key, mesh_type.lower())
+            self._linkFile(mesh_file, os.path.join(self.directory, filename))
+            entries[key] = {"file": filename,
+                            "type": mesh_type,
+                            "size": os.path.getsize(mesh_file),
+                            "last_access": time.time(),
+                            "source": os.path.normpath(source_file),
+                            "revision": revision,
+                            "dependencies": dependency_hashes,
+                            }
+            self._evict()
+            self._saveIndex()
+            return key
+
+    def _linkFile(self, mesh_file, cache_file):
+        # The export is read and removed afterwards. A hard link keeps its data without writing it again.
+        if os.path.isfile(cache_file):
+            os.remove(cache_file)
+        try:
+            os.link(mesh_file, cache_file)
+        except OSError:
+            # E.g. the temporary directory is on another drive
+            shutil.copyfile(mesh_file, cache_file)
+
+    def getSize(self):
+        with self._lock:
+            return sum([entry["size"] for entry in self._loadIndex()["entries"].values()])
+
+    def _removeEntry(self, key):
+        entry = self._loadIndex()["entries"].pop(key)
+        try:
+            os.remove(os.path.join(self.directory, entry["file"]))
+        except OSError:
+            pass
+
+    def _pruneHashes(self):
+        # Hashes are only kept for the sources and dependencies of the remaining entries
+        index = self._loadIndex()
+        referenced_files = set()
+        for entry in index["entries"].values():
+            referenced_files.add(entry["source"])
+            referenced_files.update(entry["dependencies"].keys())
+        for filepath in [filepath for filepath in index["hashes"].keys() if filepath not in referenced_files]:
+            del index["hashes"][filepath]
+
+    def _evict(self):
+        entries = self._loadIndex()["entries"]
+        total_size = self.getSize()
+        for key in sorted(entries.keys(), key = lambda key: entries[key]["last_access"]):
+            if total_size <= self.size_limit:
+                break
+            total_size -= entries[key]["size"]
+            self._removeEntry(key)
+        self._pruneHashes()
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._loadIndex()["entries"].keys()):
+                self._removeEntry(key)
+            self._pruneHashes()
+            self._saveIndex()
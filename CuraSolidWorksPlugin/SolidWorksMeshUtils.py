@@ -0,0 +1,271 @@
+# Copyright (c) 2018 Thomas Karl Pietrowski
+
+# 3rd-party
+import numpy
+
+try:
+    from .SolidWorksStlReader import stl_mapping # @UnresolvedImport
+except ImportError:
+    # Imported outside of the plugin, e.g. by SolidWorksBatchConverter or the tests
+    from SolidWorksStlReader import stl_mapping # @UnresolvedImport
+
+# Rows processed at once. Bounds the size of temporary copies.
+chunk_size = 1 << 20
+
+def getWriteableArray(data):
+    # MeshData marks its arrays as read-only. Arrays owning their memory can be made writeable again.
+    if data.flags.writeable:
+        return data
+    try:
+        data.flags.writeable = True
+        return data
+    except ValueError:
+        return numpy.array(data)
+
+def getReadOnlyArray(data):
+    # MeshData keeps a copy of any writeable array it gets. Read-only arrays are taken over as they are.
+    if data is not None:
+        data.flags.writeable = False
+    return data
+
+def rotateAboutXInPlace(data):
+    # Rotates an array of points or normals by +90 degrees around the X-axis: (x, y, z) -> (x, -z, y)
+    column_backup = numpy.empty(min(len(data), chunk_size), dtype = data.dtype)
+    for start in range(0, len(data), chunk_size):
+        chunk = data[start:start + chunk_size]
+        y = column_backup[:len(chunk)]
+        y[:] = chunk[:, 1]
+        numpy.negative(chunk[:, 2], out = chunk[:, 1])
+        chunk[:, 2] = y
+    return data
+
+def getInstanceTransformation(array_data):
+    # MathTransform.ArrayData: 3x3 rotation (row vectors), translation in meters and scale
+    transformation = numpy.identity(4, dtype = numpy.float64)
+    transformation[:3, :3] = numpy.array(array_data[:9], dtype = numpy.float64).reshape(3, 3).T * array_data[12]
+    transformation[:3, 3] = numpy.array(array_data[9:12], dtype = numpy.float64) * 1000.0 # m -> mm
+    return transformation
+
+def transformVertices(vertices, transformation):
+    return vertices.dot(transformation[:3, :3].T.astype(vertices.dtype)) + transformation[:3, 3].astype(vertices.dtype)
+
+def getWorldMapping(auto_rotate):
+    # Auto-rotation keeps SolidWorks' coordinates. Without it, everything is mapped like Uranium's STLReader does.
+    return numpy.identity(4) if auto_rotate else stl_mapping
+
+def getInstancePlacement(array_data, auto_rotate):
+    # The meshes of the instances have been mapped by the STL reader already, while ArrayData is in SolidWorks' coordinates
+    return getWorldMapping(auto_rotate).dot(getInstanceTransformation(array_data)).dot(stl_mapping.T)
+
+def map3mfMeshes(meshes, items, auto_rotate):
+    """
+    Maps the meshes and build items returned by read3mf()
+
+    - SolidWorks writes its own coordinates into 3MF files, just like into STLs. They're mapped the same way as those.
+    - The mapping is applied to the vertices, so the transformation of a single part stays the identity.
+    """
+
+    world_mapping = getWorldMapping(auto_rotate)
+    if not auto_rotate:
+        meshes = dict([(object_id, (vertices.dot(world_mapping[:3, :3].T.astype(vertices.dtype)), indices))
+                       for object_id, (vertices, indices) in meshes.items()])
+    items = [(object_id, name, world_mapping.dot(transformation).dot(world_mapping.T)) for object_id, name, transformation in items]
+    return meshes, items
+
+def isRotatedAfterReading(options):
+    # Only STLs are rotated by the post-processing. 3MF files are mapped while reading them.
+    # Instanced assemblies are placed by their transformations, which include the rotation already.
+    return bool(options["app_auto_rotate"]) and not options.get("instanced_assembly", False) and options["tempType"] == "stl"
+
+def getWeldEpsilon(options):
+    # None, if vertex welding is disabled
+    if not options.get("app_weld_vertices", False):
+        return None
+    return options.get("app_weld_epsilon", 0.001)
+
+def getDecimationLimits(options):
+    # (triangle budget, max. error). Either of them is None, if not set.
+    return options.get("app_triangle_budget", 0) or None, options.get("app_decimation_max_error", 0) or None
+
+def weldTriangleSoup(vertices, indices, epsilon):
+    # Returns None for indexed meshes, which have been welded already, and incomplete triangle soups
+    if indices is not None or len(vertices) % 3:
+        return None
+    return weldVertices(vertices, epsilon)
+
+def reduceMesh(vertices, indices, triangle_budget = None, max_error = None):
+    """
+    Decimates an indexed mesh or a triangle soup by decimateMesh()
+
+    - Triangle soups are welded without tolerance first.
+    - Returns None, if the mesh is within the triangle budget already.
+    """
+
+    if indices is None:
+        vertices, indices = weldVertices(vertices, 0)
+    if triangle_budget is not None and len(indices) <= triangle_budget:
+        return None
+    return decimateMesh(vertices, indices, triangle_budget = triangle_budget, max_error = max_error)
+
+def weldVertices(vertices, epsilon):
+    """
+    Merges vertices, which are closer than epsilon, and returns an indexed mesh
+
+    - vertices: Triangle soup, three rows per face
+    - Returns the unique vertices and int32 indices. Faces, which collapsed while welding, are dropped.
+    """
+
+    if epsilon > 0:
+        keys = numpy.floor(vertices / epsilon + 0.5).astype(numpy.int64)
+    else:
+        keys = vertices
+    order = numpy.lexsort((keys[:, 2], keys[:, 1], keys[:, 0]))
+    sorted_keys = keys[order]
+    is_first = numpy.empty(len(order), dtype = bool)
+    is_first[:1] = True
+    numpy.any(sorted_keys[1:] != sorted_keys[:-1], axis = 1, out = is_first[1:])
+    del sorted_keys, keys
+
+    inverse = numpy.empty(len(order), dtype = numpy.int32)
+    inverse[order] = numpy.cumsum(is_first, dtype = numpy.int32) - 1
+    unique_vertices = vertices[order[is_first]]
+
+    indices = inverse.reshape(-1, 3)
+    degenerated = (indices[:, 0] == indices[:, 1]) | (indices[:, 1] == indices[:, 2]) | (indices[:, 0] == indices[:, 2])
+    if degenerated.any():
+        indices = indices[~degenerated]
+    return unique_vertices, indices
+
+def calculateVertexNormals(vertices, indices):
+    # Sum of the face normals around each vertex, weighted by the face area
+    faces = vertices[indices]
+    face_normals = numpy.cross(faces[:, 1] - faces[:, 0], faces[:, 2] - faces[:, 0])
+    del faces
+    normals = numpy.zeros(vertices.shape, dtype = numpy.float64)
+    for axis in range(3):
+        for corner in range(3):
+            normals[:, axis] += numpy.bincount(indices[:, corner], weights = face_normals[:, axis], minlength = len(vertices))
+    lengths = numpy.linalg.norm(normals, axis = 1)
+    lengths[lengths == 0] = 1
+    normals /= lengths[:, numpy.newaxis]
+    return normals.astype(vertices.dtype)
+
+def _getClusterIds(vertices, origin, cell_size):
+    # Vertices falling into the same grid cell share one cluster id
+    cells = numpy.floor((vertices - origin) / cell_size).astype(numpy.int64)
+    dimensions = cells.max(axis = 0) + 1
+    keys = (cells[:, 0] * dimensions[1] + cells[:, 1]) * dimensions[2] + cells[:, 2]
+    _, cluster_ids = numpy.unique(keys, return_inverse = True)
+    return cluster_ids.reshape(-1).astype(numpy.int32)
+
+def _getRemainingFaces(indices):
+    degenerated = (indices[:, 0] == indices[:, 1]) | (indices[:, 1] == indices[:, 2]) | (indices[:, 0] == indices[:, 2])
+    return ~degenerated
+
+def _getClusterPositions(vertices, indices, cluster_ids, cluster_count, origin, cell_size):
+    # Places each cluster at the point minimizing the sum of the squared distances to the planes of its faces
+    faces = vertices[indices].astype(numpy.float64)
+    normals = numpy.cross(faces[:, 1] - faces[:, 0], faces[:, 2] - faces[:, 0])
+    areas = numpy.linalg.norm(normals, axis = 1)
+    normals /= numpy.where(areas > 0, areas, 1)[:, numpy.newaxis]
+    offsets = -numpy.sum(normals * faces[:, 0], axis = 1)
+    del faces
+    plane = (normals[:, 0], normals[:, 1], normals[:, 2], offsets)
+
+    corner_clusters = cluster_ids[indices]
+    quadrics = numpy.empty((cluster_count, 4, 4), dtype = numpy.float64)
+    for row in range(4):
+        for column in range(row, 4):
+            coefficient = plane[row] * plane[column] * areas
+            accumulated = numpy.zeros(cluster_count, dtype = numpy.float64)
+            for corner in range(3):
+                accumulated += numpy.bincount(corner_clusters[:, corner], weights = coefficient, minlength = cluster_count)
+            quadrics[:, row, column] = accumulated
+            quadrics[:, column, row] = accumulated
+    del corner_clusters
+
+    counts = numpy.bincount(cluster_ids, minlength = cluster_count)
+    positions = numpy.empty((cluster_count, 3), dtype = numpy.float64)
+    for axis in range(3):
+        positions[:, axis] = numpy.bincount(cluster_ids, weights = vertices[:, axis], minlength = cluster_count) / counts
+
+    # Flat or edge-like clusters have no unique minimum and keep the mean position
+    matrices = quadrics[:, :3, :3]
+    scale = numpy.trace(matrices, axis1 = 1, axis2 = 2)
+    determinants = numpy.linalg.det(matrices)
+    solvable = (scale > 0) & (numpy.abs(determinants) > 1e-3 * numpy.maximum(scale, 1e-30)**3)
+    if solvable.any():
+        solutions = numpy.linalg.solve(matrices[solvable], -quadrics[solvable, :3, 3:4])[:, :, 0]
+        # Nearly parallel planes meet far away from the surface. Keeping the point within the cell of the cluster
+        # bounds its deviation by the cell size.
+        any_vertex = numpy.empty(cluster_count, dtype = numpy.int64)
+        any_vertex[cluster_ids] = numpy.arange(len(cluster_ids))
+        cell_minimum = origin + numpy.floor((vertices[any_vertex[solvable]] - origin) / cell_size) * cell_size
+        positions[solvable] = numpy.clip(solutions, cell_minimum, cell_minimum + cell_size)
+    return positions
+
+def decimateMesh(vertices, indices, triangle_budget = None, max_error = None, iterations = 16):
+    """
+    Reduces an indexed mesh by quadric-based vertex clustering
+
+    - The cell size of the clustering grid is searched, so the result stays within triangle_budget.
+    - max_error limits the cell size and therefore the deviation from the original surface.
+      Each cluster is placed within its cell.
+    - Returns the new vertices and int32 indices.
+    """
+
+    if triangle_budget is not None and len(indices) <= triangle_budget:
+        return vertices, indices
+    origin = vertices.min(axis = 0)
+    diagonal = float(numpy.linalg.norm(vertices.max(axis = 0) - origin))
+    if diagonal == 0:
+        return vertices, indices
+
+    # Keeps the cell keys within int64
+    smallest_cell = diagonal * 1e-5
+    largest_cell = diagonal if max_error is None else max(min(max_error, diagonal), smallest_cell)
+    if triangle_budget is None:
+        cell_size = largest_cell
+    else:
+        cell_size = largest_cell
+        low, high = numpy.log(smallest_cell), numpy.log(largest_cell)
+        for _ in range(iterations):
+            middle = (low + high) / 2
+            cluster_ids = _getClusterIds(vertices, origin, numpy.exp(middle))
+            if numpy.count_nonzero(_getRemainingFaces(cluster_ids[indices])) > triangle_budget:
+                low = middle
+            else:
+                high = middle
+                cell_size = numpy.exp(middle)
+
+    cluster_ids = _getClusterIds(vertices, origin, cell_size)
+    cluster_count = int(cluster_ids.max()) + 1
+    positions = _getClusterPositions(vertices, indices, cluster_ids, cluster_count, origin, cell_size)
+
+    new_indices = cluster_ids[indices]
+    new_indices = new_indices[_getRemainingFaces(new_indices)]
+    # Faces collapsing onto the same three clusters are kept once
+    _, unique_faces = numpy.unique(numpy.sort(new_indices, axis = 1), axis = 0, return_index = True)
+    new_indices = new_indices[numpy.sort(unique_faces)]
+
+    # Drops clusters, which are not used by any face anymore
+    used, new_indices = numpy.unique(new_indices, return_inverse = True)
+    return positions[used].astype(vertices.dtype), new_indices.reshape(-1, 3).astype(numpy.int32)
+
+def postProcessMesh(options, vertices, indices):
+    """
+    Same stages as SolidWorksReader.nodePostProcessing(), for a single mesh without normals
+
+    - options: Options of the import, merged with the ones of the export the mesh has been read from
+    - Returns the vertices and indices. Indices stay None, if the triangle soup has been neither welded nor decimated.
+    """
+
+    if isRotatedAfterReading(options):
+        vertices = rotateAboutXInPlace(getWriteableArray(vertices))
+    epsilon = getWeldEpsilon(options)
+    if epsilon is not None:
+        vertices, indices = weldTriangleSoup(vertices, indices, epsilon) or (vertices, indices)
+    triangle_budget, max_error = getDecimationLimits(options)
+    if triangle_budget or max_error:
+        vertices, indices = reduceMesh(vertices, indices, triangle_budget, max_error) or (vertices, indices)
+    return vertices, indices
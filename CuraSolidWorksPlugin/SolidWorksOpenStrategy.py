@@ -0,0 +1,98 @@
+# Copyright (c) 2018 Thomas Karl Pietrowski
+
+# Build-ins
+import os
+import zipfile
+
+try:
+    from .SolidWorks3mfReader import getModelPath # @UnresolvedImport
+    from .SolidWorksStlReader import getTriangleCount, isBinaryStl # @UnresolvedImport
+except ImportError:
+    # Imported outside of the plugin, e.g. by SolidWorksBatchConverter or the tests
+    from SolidWorks3mfReader import getModelPath # @UnresolvedImport
+    from SolidWorksStlReader import getTriangleCount, isBinaryStl # @UnresolvedImport
+
+# "auto" opens large assemblies lightweight and everything else resolved
+open_strategies = ("auto", "resolved", "lightweight")
+
+# Limits of "auto": referenced documents and file size in bytes
+lightweight_component_limit = 200
+lightweight_file_size_limit = 50 * 1024 * 1024
+
+# An export of this size can't contain any triangle
+minimum_export_size = 512
+
+# Smallest closed mesh. Every visible component adds at least this many triangles to an export.
+minimum_component_triangles = 4
+
+# 3MF files are scanned in chunks of this size for counting their triangles
+scan_chunk_size = 1 << 20
+triangle_tag = b"<triangle "
+
+def chooseOpenStrategy(strategy, component_count = None, file_size = None,
+                       component_limit = lightweight_component_limit, file_size_limit = lightweight_file_size_limit):
+    """
+    Decides how an assembly is opened
+
+    - Lightweight components are loaded with their saved tessellation only. That's what the export needs,
+      but it saves loading the features of each part, which is most of the time and memory for large assemblies.
+    - The number of components is estimated by the referenced documents, since instances can only be counted after opening.
+    """
+
+    if strategy in ("resolved", "lightweight"):
+        return strategy
+    if component_count is not None and component_count >= component_limit:
+        return "lightweight"
+    if file_size is not None and file_size >= file_size_limit:
+        return "lightweight"
+    return "resolved"
+
+def isExportEmpty(file_path, file_type):
+    # Lightweight components, which were saved without tessellation data, end up as missing or empty meshes
+    if not os.path.isfile(file_path):
+        return True
+    if file_type.lower() == "stl" and isBinaryStl(file_path):
+        return getTriangleCount(file_path) == 0
+    return os.path.getsize(file_path) < minimum_export_size
+
+def count3mfTriangles(file_path):
+    # Counts the triangle elements of the model in chunks, without parsing it
+    with zipfile.ZipFile(file_path, "r") as archive:
+        with archive.open(getModelPath(archive)) as model_file:
+            count = 0
+            tail = b""
+            while True:
+                chunk = model_file.read(scan_chunk_size)
+                if not chunk:
+                    return count
+                data = tail + chunk
+                count += data.count(triangle_tag)
+                # Keeps the start of a tag, which is split between two chunks
+                tail = data[-(len(triangle_tag) - 1):]
+
+def getExportTriangleCount(file_path, file_type):
+    # Triangles of an export, without reading its mesh. None, if that can't be told for the format.
+    if file_type.lower() == "stl" and isBinaryStl(file_path):
+        return getTriangleCount(file_path)
+    if file_type.lower() == "3mf":
+        try:
+            return count3mfTriangles(file_path)
+        except (KeyError, zipfile.BadZipFile):
+            return 0
+    return None
+
+def isExportIncomplete(file_path, file_type, component_count):
+    """
+    Whether components are missing in the export of an assembly, which has been opened lightweight
+
+    - Each visible component adds at least minimum_component_triangles, so fewer triangles mean components are missing.
+    - Components with a fine tessellation can hide missing ones. So this only catches what
+      SolidWorksDocumentExporter.resolveUntessellatedComponents() missed before the export.
+    """
+
+    if isExportEmpty(file_path, file_type):
+        return True
+    triangle_count = getExportTriangleCount(file_path, file_type)
+    if triangle_count is None:
+        return False
+    return triangle_count < component_count * minimum_component_triangles
@@ -0,0 +1,73 @@
+# Copyright (c) 2018 Thomas Karl Pietrowski
+
+# Build-ins
+import queue
+import threading
+
+class SolidWorksImportPipeline():
+    """
+    Overlaps the export by SolidWorks with reading the exported meshes
+
+    - Producer threads call export_function(job) for one job after the other.
+      These are the COM calls, which are serialized per instance of SolidWorks anyway, so there is one producer per instance.
+    - A pool of consumer threads calls read_function(exported) on the finished exports.
+    - Between both stages a queue holds at most max_pending finished exports.
+      When the consumers fall behind, the producer waits, so temporary files and meshes don't pile up.
+    """
+
+    def __init__(self, export_function, read_function, max_pending = 2, workers = 2, exporters = 1):
+        self.export_function = export_function
+        self.read_function = read_function
+        self.max_pending = max_pending
+        self.workers = max(1, workers)
+        self.exporters = max(1, exporters)
+
+    def run(self, jobs):
+        # Returns a list of (result, error) in the order of jobs
+        results = [(None, None), ] * len(jobs)
+        finished = queue.Queue(maxsize = self.max_pending)
+        remaining_jobs = iter(enumerate(jobs))
+        state = {"producers": self.exporters}
+        lock = threading.Lock()
+
+        def produce():
+            while True:
+                with lock:
+                    index, job = next(remaining_jobs, (None, None))
+                if index is None:
+                    break
+                try:
+                    finished.put((index, self.export_function(job), None))
+                except Exception as e:
+                    finished.put((index, None, e))
+            with lock:
+                state["producers"] -= 1
+                if state["producers"]:
+                    return
+            # The last producer stops the consumers
+            for _ in range(self.workers):
+                finished.put(None)
+
+        def consume():
+            while True:
+                item = finished.get()
+                if item is None:
+                    break
+                index, exported, error = item
+                if error is not None:
+                    results[index] = (None, error)
+                    continue
+                try:
+                    results[index] = (self.read_function(exported), None)
+                except Exception as e:
+                    results[index] = (None, e)
+
+        threads = [threading.Thread(target = produce, name = "SolidWorksExport-{}".format(index), daemon = True)
+                   for index in range(self.exporters)]
+        threads += [threading.Thread(target = consume, name = "SolidWorksRead-{}".format(index), daemon = True)
+                    for index in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
@@ -0,0 +1,82 @@
+# Copyright (c) 2018 Thomas Karl Pietrowski
+
+# Build-ins
+import json
+import os
+
+class SolidWorksPreferenceState():
+    """
+    Tracks the user preferences of SolidWorks, which are changed while exporting
+
+    - The preferences are read once, when the state is created.
+    - apply() only sets preferences, which differ from the last known value.
+    - restore() sets everything back in one pass.
+    - The original values are written to a journal before the first change.
+      If Cura crashes, restoreJournal() sets them back on the next start.
+    """
+
+    # Kind of preference -> (getter, setter) of ISldWorks
+    accessors = {"toggle": ("GetUserPreferenceToggle", "SetUserPreferenceToggle"),
+                 "integer": ("GetUserPreferenceIntegerValue", "SetUserPreferenceIntegerValue"),
+                 "double": ("GetUserPreferenceDoubleValue", "SetUserPreferenceDoubleValue"),
+                 }
+
+    def __init__(self, app_instance, preferences, journal_path = None):
+        self.app_instance = app_instance
+        self.preferences = preferences # name -> (kind, enum)
+        self.journal_path = journal_path
+
+        self.original = {}
+        for name, (kind, enum) in self.preferences.items():
+            self.original[name] = getattr(self.app_instance, self.accessors[kind][0])(enum)
+        self.current = dict(self.original)
+
+    def _setValue(self, name, value):
+        kind, enum = self.preferences[name]
+        getattr(self.app_instance, self.accessors[kind][1])(enum, value)
+        self.current[name] = value
+
+    def isModified(self):
+        return self.current != self.original
+
+    def apply(self, values):
+        changes = [(name, value) for name, value in values.items() if self.current[name] != value]
+        if changes and not self.isModified():
+            self.writeJournal()
+        for name, value in changes:
+            self._setValue(name, value)
+        return len(changes)
+
+    def restore(self):
+        changes = [(name, value) for name, value in self.original.items() if self.current[name] != value]
+        for name, value in changes:
+            self._setValue(name, value)
+        self.removeJournal()
+        return len(changes)
+
+    def writeJournal(self):
+        if not self.journal_path:
+            return
+        journal = {}
+        for name, (kind, enum) in self.preferences.items():
+            journal[name] = [kind, enum, self.original[name]]
+        os.makedirs(os.path.dirname(self.journal_path), exist_ok = True)
+        with open(self.journal_path + ".tmp", "w") as journal_file:
+            json.dump(journal, journal_file)
+        os.replace(self.journal_path + ".tmp", self.journal_path)
+
+    def removeJournal(self):
+        if self.journal_path and os.path.isfile(self.journal_path):
+            os.remove(self.journal_path)
+
+    @classmethod
+    def restoreJournal(cls, app_instance, journal_path):
+        # Restores preferences, which were left modified by a previous run
+        if not os.path.isfile(journal_path):
+            return False
+        with open(journal_path, "r") as journal_file:
+            journal = json.load(journal_file)
+        for name, (kind, enum, value) in journal.items():
+            getattr(app_instance, cls.accessors[kind][1])(enum, value)
+        os.remove(journal_path)
+        return True
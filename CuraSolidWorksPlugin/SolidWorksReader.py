@@ -4,38 +4,53 @@
 # * Adding selection to separately import parts from an assembly
 
 # Build-ins
-import math
+import json
 import os
-import winreg
-
-# 3rd-party
-import numpy
+import threading
+import time
 
 # Cura/Uranium
 from UM.Application import Application # @UnresolvedImport
 from UM.i18n import i18nCatalog # @UnresolvedImport
 from UM.Logger import Logger # @UnresolvedImport
 from UM.Math.Matrix import Matrix # @UnresolvedImport
-from UM.Math.Vector import Vector # @UnresolvedImport
-from UM.Math.Quaternion import Quaternion # @UnresolvedImport
+from UM.Mesh.MeshData import MeshData # @UnresolvedImport
 from UM.Mesh.MeshReader import MeshReader # @UnresolvedImport
 from UM.Message import Message # @UnresolvedImport
 from UM.PluginRegistry import PluginRegistry # @UnresolvedImport
 from UM.Preferences import Preferences # @UnresolvedImport
+from UM.Resources import Resources # @UnresolvedImport
+from UM.Scene.GroupDecorator import GroupDecorator # @UnresolvedImport
+from UM.Signal import Signal # @UnresolvedImport
 from UM.Version import Version
 
 # Since 3.4: Register Mimetypes:
 if Version("3.4") <= Version(Application.getInstance().getVersion()):
     from UM.MimeTypeDatabase import MimeTypeDatabase, MimeType
 
+# Cura
+from cura.Scene.CuraSceneNode import CuraSceneNode # @UnresolvedImport
+
 # CIU
 from .CadIntegrationUtils.CommonComReader import CommonCOMReader # @UnresolvedImport
 from .CadIntegrationUtils.ComFactory import ComConnector # @UnresolvedImport
 from .CadIntegrationUtils.SystemUtils import convertDosPathIntoLongPath # @UnresolvedImport
 
 # This plugin
-from .SolidWorksConstants import SolidWorksEnums, SolidWorkVersions # @UnresolvedImport
+from .SolidWorks3mfReader import read3mf # @UnresolvedImport
+from .SolidWorksConstants import SolidWorkVersions # @UnresolvedImport
 from .SolidWorksDialogHandler import SolidWorksReaderWizard # @UnresolvedImport
+from .SolidWorksDocumentExporter import SolidWorksDocumentExporter # @UnresolvedImport
+from .SolidWorksExportProfile import export_preferences, getCacheQuality, quality_classes # @UnresolvedImport
+from .SolidWorksFolderWatcher import SolidWorksFolderWatcher # @UnresolvedImport
+from .SolidWorksMeshCache import SolidWorksMeshCache # @UnresolvedImport
+from .SolidWorksMeshUtils import calculateVertexNormals, getDecimationLimits, getInstancePlacement, getReadOnlyArray, getWeldEpsilon, getWriteableArray, isRotatedAfterReading, map3mfMeshes, reduceMesh, rotateAboutXInPlace, weldTriangleSoup # @UnresolvedImport
+from .SolidWorksPipeline import SolidWorksImportPipeline # @UnresolvedImport
+from .SolidWorksRegistry import SolidWorksRegistry, WinRegBackend # @UnresolvedImport
+from .SolidWorksStlReader import isBinaryStl, readBinaryStl # @UnresolvedImport
+from .SolidWorksSystemLoad import getAvailableMemory, getCpuLoad # @UnresolvedImport
+from .SolidWorksSession import SolidWorksSessionPool # @UnresolvedImport
+from .SolidWorksTrace import SolidWorksTrace, traceSpan # @UnresolvedImport
 from .CuraCompat import Deprecations
 
 i18n_catalog = i18nCatalog("SolidWorksPlugin")
@@ -44,6 +59,9 @@ DEBUG = False
 EMULATE_VERSION_API = 25
 
 class SolidWorksReader(CommonCOMReader):
+    # Preferences of SolidWorks, which are changed for exporting
+    export_preferences = export_preferences
+
     def __init__(self):
         super().__init__("SolidWorks", "SldWorks.Application")
 
@@ -71,6 +89,29 @@ class SolidWorksReader(CommonCOMReader):
         self.addPluginPreference("show_export_settings_always", True)
         self.addPluginPreference("auto_rotate", True)
         self.addPluginPreference("checks_at_initialization", True)
+        self.addPluginPreference("cache_enabled", True)
+        self.addPluginPreference("cache_size_limit", 2048) # in MB
+        self.addPluginPreference("installation_checks", "{}")
+        self.addPluginPreference("session_idle_timeout", 300) # in seconds, 0 closes SolidWorks after each file
+        self.addPluginPreference("session_instances", 1) # instances of SolidWorks converting in parallel
+        self.addPluginPreference("session_recycle_after", 0) # jobs until an instance is restarted, 0 never restarts it
+        self.addPluginPreference("prestart", False) # start SolidWorks in advance, when Cura has been loaded
+        self.addPluginPreference("prestart_timeout", 180) # in seconds, SolidWorks is closed again, if nothing is imported
+        self.addPluginPreference("prestart_min_free_memory", 4096) # in MB
+        self.addPluginPreference("prestart_max_cpu_load", 75) # in percent
+        self.addPluginPreference("watch_folders", "") # separated by ";", new or changed files in there are converted into the mesh cache
+        self.addPluginPreference("watch_poll_interval", 5) # in seconds
+        self.addPluginPreference("watch_debounce", 10) # in seconds without changes, before a file is converted
+        self.addPluginPreference("watch_queue_size", 16) # files waiting for being converted
+        self.addPluginPreference("open_strategy", "auto") # assemblies are opened "resolved", "lightweight" or "auto" by their size
+        self.addPluginPreference("open_lightweight_components", 200) # referenced documents, from which "auto" opens lightweight
+        self.addPluginPreference("open_lightweight_file_size", 50) # in MB, from which "auto" opens lightweight
+        self.addPluginPreference("instanced_assemblies", False)
+        self.addPluginPreference("weld_vertices", True)
+        self.addPluginPreference("weld_epsilon", 0.001) # in mm
+        self.addPluginPreference("triangle_budget", 0) # per mesh, 0 means unlimited
+        self.addPluginPreference("decimation_max_error", 0) # in mm, 0 means unlimited. Meshes are decimated, if either is set.
+        self.addPluginPreference("trace_directory", "") # Chrome traces of each conversion are written here, if set
 
         self._extension_part = ".SLDPRT"
         self._extension_assembly = ".SLDASM"
@@ -80,26 +121,44 @@ class SolidWorksReader(CommonCOMReader):
                                       self._extension_drawing.lower(),
                                       ]
 
-        self._convert_assembly_into_once = True  # False is not implemented now!
-
         self._ui = SolidWorksReaderWizard(self)
 
-        self.quality_classes = {
-                                30 : "Fine (3D-printing)",
-                                20 : "Coarse (3D-printing)",
-                                10 : "Fine (SolidWorks)",
-                                 0 : "Coarse (SolidWorks)",
-                                -1 : "Keep settings unchanged",
-                                }
+        self.quality_classes = dict(quality_classes)
+
+        # Cache of exported meshes, so files don't need to be converted by SolidWorks again
+        self._mesh_cache = SolidWorksMeshCache(os.path.join(Resources.getCacheStoragePath(), self.preference_namespace),
+                                               self.cacheSizeLimit)
+
+        # Opens, exports and closes the documents. Shared with the batch converter.
+        self._exporter = SolidWorksDocumentExporter(ComConnector,
+                                                    logger = Logger,
+                                                    mesh_cache = self._mesh_cache,
+                                                    debug = DEBUG,
+                                                    )
 
-        self.root_component = None
+        # Registered versions of SolidWorks. Looked up once and cached.
+        self._registry = SolidWorksRegistry(WinRegBackend(), self._default_app_name)
 
         # Results of the validation checks of each version
         self.operational_versions = []
         self.technical_infos_per_version = {}
 
-        # Check for operational installations
-        self.updateOperationalInstallations(skip_all_tests = not self.checksAtInitialization)
+        # Checks for operational installations are running in the background. See startInstallationChecks()
+        self.installationChecksUpdated = Signal()
+        self.installationChecksFinished = Signal()
+        self._installation_checks_thread = None
+        self._installation_checks_done = threading.Event()
+
+        # SolidWorks is kept running between conversions. See getSession()
+        self._session = None
+        self._session_lock = threading.Lock()
+        # Files opened in the background while the wizard is shown. See prepareForeignFile()
+        self._prepared_sessions = {} # file path -> session
+        # Set, while SolidWorks has been started in advance and no file has been imported yet. See prestartSession()
+        self._prestart_timer = None
+        # Converts files of the watched folders into the mesh cache. See startFolderWatcher()
+        self._folder_watcher = None
+        Application.getInstance().applicationShuttingDown.connect(self._onApplicationShuttingDown)
 
     def addPluginPreference(self, name, default_value):
         Deprecations.getPreferences().addPreference("{}/{}".format(self.preference_namespace, name), default_value)
@@ -108,17 +167,36 @@ class SolidWorksReader(CommonCOMReader):
     def checksAtInitialization(self):
         return Deprecations.getPreferences().getValue("cura_solidworks/checks_at_initialization")
 
+    @property
+    def cacheEnabled(self):
+        return Deprecations.getPreferences().getValue("cura_solidworks/cache_enabled")
+
+    @property
+    def cacheSizeLimit(self):
+        size_limit = Deprecations.getPreferences().getValue("cura_solidworks/cache_size_limit")
+        if isinstance(size_limit, str):
+            size_limit = eval(size_limit)
+        return int(size_limit) * 1024 * 1024
+
+    def isInstancedImport(self, options):
+        return self._exporter.isInstancedImport(options)
+
     @property
     def _app_names(self):
         return [self.getVersionedServiceName(version) for version in self.operational_versions] + super()._app_names
 
     @property
-    def _prefered_app_name(self):
+    def _prefered_installation_code(self):
         installation_code = Deprecations.getPreferences().getValue("cura_solidworks/preferred_installation")
         if isinstance(installation_code, str):
             installation_code = eval(installation_code)
         if isinstance(installation_code, float):
             installation_code = int(installation_code)
+        return installation_code
+
+    @property
+    def _prefered_app_name(self):
+        installation_code = self._prefered_installation_code
 
         if installation_code is -1:
             return None # We have no preference
@@ -128,6 +206,20 @@ class SolidWorksReader(CommonCOMReader):
             return self.getVersionedServiceName(installation_code) # Use chosen version
         return None
 
+    def getExpectedRevisionMajor(self):
+        # The major revision, which will be used for the conversion, without starting SolidWorks.
+        installation_code = self._prefered_installation_code
+        if installation_code in self.operational_versions:
+            return installation_code
+        elif installation_code == -1 and self.operational_versions:
+            return self.operational_versions[0]
+        elif installation_code == -2:
+            # The system default is the version registered last
+            current_version = self._registry.getCurrentVersion()
+            if current_version in self.operational_versions:
+                return current_version
+        return None # Unknown until SolidWorks has been started. The mesh cache accepts the revision stored last then.
+
     def getVersionedServiceName(self, version):
         return "SldWorks.Application.{}".format(version)
 
@@ -139,45 +231,43 @@ class SolidWorksReader(CommonCOMReader):
             return self.getVersionedServiceName(revision_major)
 
     def getServicesFromRegistry(self):
-        versions = []
-        registered_services = winreg.OpenKey(winreg.HKEY_CLASSES_ROOT, None)
-        key_prefix = "{}.".format(self._default_app_name)
-        i = 0
-        while True:
-            try:
-                key = winreg.EnumKey(registered_services, i)
-                if key.startswith(key_prefix):
-                    try:
-                        major_version = key[len(key_prefix):]
-                        major_version = int(major_version)
-                        versions.append(major_version)
-                    except ValueError:
-                        pass
-                i += 1
-            except WindowsError:
-                break
-        versions.sort()
-        versions.reverse()
-        return versions
+        return self._registry.getVersions()
 
     def isServiceRegistered(self, major_version):
-        sldwks_app_name = self.getVersionedServiceName(major_version)
-        try:
-            # Could find a better key to detect whether SolidWorks is installed..
-            winreg.OpenKey(winreg.HKEY_CLASSES_ROOT, sldwks_app_name, 0, winreg.KEY_READ)
-            return True
-        except:
-            return False
+        # Could find a better key to detect whether SolidWorks is installed..
+        return self._registry.isServiceRegistered(major_version)
 
-    def getSoftwareInstallPath(self, major_version):
+    def getServiceCommand(self, major_version):
+        command = self._registry.getServiceCommand(major_version)
+        if not command:
+            raise FileNotFoundError("Found no command to start '{}'!".format(self.getVersionedServiceName(major_version)))
+        return command
+
+    def getSoftwareExecutablePath(self, major_version):
         executable_extension = ".exe"
-        regpath = "{}\shell\open\command".format(self.getVersionedServiceName(major_version))
-        sldwks_exe = winreg.QueryValue(winreg.HKEY_CLASSES_ROOT, regpath)
+        sldwks_exe = self.getServiceCommand(major_version)
         sldwks_exe = sldwks_exe[:sldwks_exe.find(executable_extension)+len(executable_extension)+1]
         sldwks_exe = convertDosPathIntoLongPath(sldwks_exe)
+        return sldwks_exe
+
+    def getSoftwareInstallPath(self, major_version):
+        sldwks_exe = self.getSoftwareExecutablePath(major_version)
         sldwkd_inst = os.path.split(sldwks_exe)[0]
         return sldwkd_inst
 
+    def getInstallationFingerprint(self, major_version):
+        # Anything, which changes when SolidWorks gets (un-)installed, updated or repaired
+        try:
+            sldwks_exe = self.getSoftwareExecutablePath(major_version).strip().strip("\"")
+            sldwks_exe_stat = os.stat(sldwks_exe)
+            return {"registry": self.getServiceCommand(major_version),
+                    "executable": sldwks_exe,
+                    "mtime": sldwks_exe_stat.st_mtime,
+                    "size": sldwks_exe_stat.st_size,
+                    }
+        except:
+            return None
+
     def isSoftwareInstallPath(self, major_version):
         # Also check whether the executable can be found..
         # Why? - SolidWorks 2017 lefts an key after uninstallation, which points to an orphaned path.
@@ -330,23 +420,100 @@ class SolidWorksReader(CommonCOMReader):
         Logger.log("i", "Success! Installation of '{}' seems to be valid!".format(self.getVersionedServiceName(version)))
         return (True, info_dict)
 
-    def updateOperationalInstallations(self, skip_all_tests = False):
-        self.operational_versions = []
-        self.technical_infos_per_version = {}
+    def getStoredInstallationChecks(self):
+        stored_checks = Deprecations.getPreferences().getValue("cura_solidworks/installation_checks")
+        try:
+            return json.loads(stored_checks)
+        except (TypeError, ValueError):
+            Logger.log("w", "Could not parse the results of the last installation checks. Checking again..")
+            return {}
+
+    def storeInstallationChecks(self, checks):
+        Deprecations.getPreferences().setValue("cura_solidworks/installation_checks", json.dumps(checks))
+
+    def updateOperationalInstallations(self, skip_all_tests = False, use_stored_checks = True):
+        # Runs in the background, while imports and the dialog read the results.
+        # So the results are collected locally and replaced as a whole, instead of being reset and filled in-place.
+        operational_versions = []
+        technical_infos_per_version = {}
+        if not use_stored_checks:
+            # Checking again, so (un-)installations since the last look-up are noticed
+            self._registry.clearCache()
         versions = self.getServicesFromRegistry()
         if DEBUG:
-            if EMULATE_VERSION_API not in self.operational_versions:
+            if EMULATE_VERSION_API not in versions:
                 versions.append(EMULATE_VERSION_API)
+        stored_checks = self.getStoredInstallationChecks() if use_stored_checks else {}
+        checks = {}
         for version in versions:
             if skip_all_tests or DEBUG:
-                self.operational_versions.append(version)
+                operational_versions.append(version)
                 if DEBUG:
-                    self.technical_infos_per_version[version] = self.isVersionOperational(version)[1]
+                    technical_infos_per_version[version] = self.isVersionOperational(version)[1]
                 continue
-            result, info = self.isVersionOperational(version)
-            self.technical_infos_per_version[version] = info
+
+            # Starting SolidWorks for the checks takes long, so reuse the last results as long as the installation is unchanged
+            fingerprint = self.getInstallationFingerprint(version)
+            stored_check = stored_checks.get(str(version))
+            if fingerprint and stored_check and stored_check["fingerprint"] == fingerprint:
+                Logger.log("d", "Installation of '{}' is unchanged. Reusing the results of the last checks.".format(self.getVersionedServiceName(version)))
+                result, info = stored_check["result"], stored_check["info"]
+            else:
+                result, info = self.isVersionOperational(version)
+            if fingerprint:
+                checks[str(version)] = {"fingerprint": fingerprint,
+                                        "result": result,
+                                        "info": info,
+                                        }
+
+            technical_infos_per_version[version] = info
             if result:
-                self.operational_versions.append(version)
+                operational_versions.append(version)
+            # The dialog shows the progress of each version
+            self.technical_infos_per_version = dict(technical_infos_per_version)
+            self.installationChecksUpdated.emit()
+
+        self.technical_infos_per_version = technical_infos_per_version
+        self.operational_versions = operational_versions
+        if not skip_all_tests and not DEBUG:
+            self.storeInstallationChecks(checks)
+
+    def startInstallationChecks(self, use_stored_checks = True):
+        if self.isInstallationCheckPending() and self._installation_checks_thread:
+            Logger.log("d", "Installation checks are running already..")
+            return
+        self._installation_checks_done.clear()
+        self._installation_checks_thread = threading.Thread(target = self._runInstallationChecks,
+                                                            args = (use_stored_checks, ),
+                                                            name = "SolidWorksInstallationChecks",
+                                                            daemon = True,
+                                                            )
+        self._installation_checks_thread.start()
+
+    def _runInstallationChecks(self, use_stored_checks):
+        # The checks start SolidWorks through COM, so this thread needs an apartment of its own
+        ComConnector.CoInit()
+        try:
+            self.updateOperationalInstallations(skip_all_tests = not self.checksAtInitialization,
+                                                use_stored_checks = use_stored_checks)
+        except:
+            Logger.logException("e", "Checking the installations of SolidWorks failed!")
+        finally:
+            ComConnector.UnCoInit()
+            self._installation_checks_done.set()
+            self.installationChecksUpdated.emit()
+            self.installationChecksFinished.emit(self)
+        if self.prestartEnabled:
+            self.prestartSession()
+        self.startFolderWatcher()
+
+    def isInstallationCheckPending(self):
+        return not self._installation_checks_done.is_set()
+
+    def waitForInstallationChecks(self, timeout = None):
+        if self.isInstallationCheckPending():
+            Logger.log("d", "Waiting for the installation checks to finish..")
+        return self._installation_checks_done.wait(timeout)
 
     def isOperational(self):
         # Whenever there are versions, which work, we are good to go!
@@ -354,18 +521,563 @@ class SolidWorksReader(CommonCOMReader):
             return True
         return False
 
-    def preRead(self, options):
-        super().preRead(options)
+    def preRead(self, file_path, *args, **kwargs):
+        super().preRead(file_path, *args, **kwargs)
 
         Logger.log("d", "Showing wizard, if needed..")
-        self._ui.showConfigUI(blocking = True)
-        if self._ui.getCancelled():
+        wizard_result = self._ui.showConfigUI()
+        if not wizard_result.done():
+            # The user's think time hides starting SolidWorks and opening the file.
+            # The chosen quality is read by getReadOptions() afterwards and applied on export.
+            self.prepareForeignFile(file_path)
+        if not wizard_result.result():
             Logger.log("d", "User cancelled conversion of file!")
+            self.discardPreparedFile(file_path)
             return MeshReader.PreReadResult.cancelled
         Logger.log("d", "Continuing to convert file..")
 
         return MeshReader.PreReadResult.accepted
 
+    def prepareForeignFile(self, file_path):
+        # Starts SolidWorks and opens the file in the background. Only done, when it's clear which versions can be used.
+        if self.isInstallationCheckPending() or not self.isOperational():
+            return
+        if os.path.splitext(file_path)[1].upper() not in (self._extension_part, self._extension_assembly):
+            return
+        options = self.getReadOptions(file_path)
+        if self.getCacheEntry(options):
+            # read() won't need SolidWorks for it
+            Logger.log("d", "<{}> is in the mesh cache. Not opening it in advance.".format(file_path))
+            return
+        session = self.getSession().getNextSession()
+        with self._session_lock:
+            self._prepared_sessions[file_path] = session
+        session.submit(self._exporter.openPreparedFile, options)
+
+    def popPreparedSession(self, file_path):
+        # Session, which opened the file in the background, if it's still part of the current pool
+        with self._session_lock:
+            session = self._prepared_sessions.pop(file_path, None)
+            if session is None or self._session is None or session not in self._session.sessions:
+                return None
+            return session
+
+    def discardPreparedFile(self, file_path):
+        session = self.popPreparedSession(file_path)
+        if session:
+            session.submit(self._exporter.closePreparedFile, file_path)
+
+    def read(self, file_path):
+        self.waitForInstallationChecks()
+        if not self.isOperational():
+            Logger.log("e", "Found no operational installation of SolidWorks. Can't convert <{}>!".format(file_path))
+            return None
+
+        options = self.getReadOptions(file_path)
+        try:
+            with traceSpan(options, "read"):
+                scene_nodes = self.readFromCache(options)
+                if scene_nodes:
+                    self.discardPreparedFile(file_path)
+                    return scene_nodes
+
+                return self.readOnSession(options, self.popPreparedSession(file_path))
+        finally:
+            self.exportTrace(options)
+
+    # Exported files, which may wait for being read, and threads reading them. See readBatch()
+    pipeline_max_pending = 2
+    pipeline_workers = 2
+
+    def readBatch(self, file_paths):
+        """
+        Converts many files within a single session of SolidWorks
+
+        - The export settings are only applied once for all files.
+        - Returns a list of (file_path, scene_nodes, error) in the order of file_paths.
+          An error while converting one file doesn't affect the others.
+        """
+
+        results = [None, ] * len(file_paths)
+        self.waitForInstallationChecks()
+        if not self.isOperational():
+            error = RuntimeError("Found no operational installation of SolidWorks!")
+            return [(file_path, None, error) for file_path in file_paths]
+
+        # Files found in the cache don't need SolidWorks at all
+        pending = []
+        for index, file_path in enumerate(file_paths):
+            options = self.getReadOptions(file_path)
+            scene_nodes = self.readFromCache(options)
+            if scene_nodes:
+                results[index] = (file_path, scene_nodes, None)
+                self.exportTrace(options)
+            else:
+                pending.append((index, options))
+        if not pending:
+            return results
+
+        # While SolidWorks exports the next file, the previous ones are read by a pool of threads.
+        # Each instance of SolidWorks in the pool gets its own exporting thread.
+        # The export settings are only changed by the first export and restored when the session ends.
+        session = self.getSession()
+        pipeline = SolidWorksImportPipeline(lambda options: session.run(self.exportForeignFile, options),
+                                            self.readExportResult,
+                                            max_pending = self.pipeline_max_pending,
+                                            workers = self.pipeline_workers,
+                                            exporters = session.size,
+                                            )
+        pipeline_results = pipeline.run([options for _, options in pending])
+
+        for (index, options), (scene_nodes, error) in zip(pending, pipeline_results):
+            file_path = options["foreignFile"]
+            self.showExportMessages(options)
+            if error is None and not scene_nodes:
+                error = RuntimeError("Could not convert <{}>!".format(file_path))
+            if error is not None:
+                Logger.log("e", "Converting <{}> failed: {}".format(file_path, repr(error)))
+            results[index] = (file_path, scene_nodes, error)
+            self.exportTrace(options)
+
+        return results
+
+    def getCacheEntry(self, options):
+        # Only merged meshes are cached
+        if not self.cacheEnabled or self.isInstancedImport(options):
+            return None
+        with traceSpan(options, "cacheLookup"):
+            return self._mesh_cache.lookup(options["foreignFile"],
+                                           getCacheQuality(options["app_export_quality"], options["app_triangle_budget"]),
+                                           self.getExpectedRevisionMajor(),
+                                           options["app_auto_rotate"],
+                                           )
+
+    def readFromCache(self, options):
+        cache_entry = self.getCacheEntry(options)
+        if not cache_entry:
+            return None
+        Logger.log("i", "Found <{}> in the mesh cache. Skipping the conversion by SolidWorks!".format(options["foreignFile"]))
+        options["tempType"] = cache_entry["type"]
+        options["tempFile"] = cache_entry["file"]
+        with traceSpan(options, "readExportedFile"):
+            scene_nodes = self.readExportedFile(options)
+        if not scene_nodes:
+            Logger.log("w", "Reading the cached mesh failed. Converting the file again..")
+            return None
+        return self.finishSceneNodes(options, scene_nodes)
+
+    def getWatchedFolders(self):
+        watch_folders = Deprecations.getPreferences().getValue("cura_solidworks/watch_folders") or ""
+        return [folder.strip() for folder in watch_folders.split(";") if folder.strip()]
+
+    def startFolderWatcher(self):
+        """
+        Converts new or changed files of the watched folders into the mesh cache, so importing them later is a cache hit
+
+        - Only done with the cache enabled and an operational installation.
+        - A single worker hands the files to the session one by one, so imports by the user wait for one file at most.
+        """
+
+        self.stopFolderWatcher()
+        folders = self.getWatchedFolders()
+        if not folders or not self.cacheEnabled or not self.isOperational():
+            return
+        Logger.log("i", "Watching {} for SolidWorks files..".format(", ".join(folders)))
+        self._folder_watcher = SolidWorksFolderWatcher(folders,
+                                                       self.preConvertFile,
+                                                       [self._extension_part, self._extension_assembly, self._extension_drawing],
+                                                       poll_interval = self.getPreferenceNumber("watch_poll_interval"),
+                                                       debounce = self.getPreferenceNumber("watch_debounce"),
+                                                       max_queued = self.getPreferenceNumber("watch_queue_size"),
+                                                       )
+        self._folder_watcher.start()
+
+    def stopFolderWatcher(self):
+        if self._folder_watcher:
+            # Files, which are waiting in the queue, would delay the shutdown
+            self._folder_watcher.stop(timeout = 0, discard_queued = True)
+            self._folder_watcher = None
+
+    def preConvertFile(self, file_path):
+        # Called by the folder watcher. Exports the file into the mesh cache without reading it.
+        options = self.getReadOptions(file_path)
+        if self.isInstancedImport(options):
+            return
+        if self.getCacheEntry(options):
+            Logger.log("d", "<{}> is in the mesh cache already.".format(file_path))
+            return
+        Logger.log("i", "Converting <{}> into the mesh cache..".format(file_path))
+        try:
+            with traceSpan(options, "session"):
+                options = self.getSession().run(self.exportForeignFile, options)
+        except:
+            Logger.logException("e", "Converting <{}> into the mesh cache failed!".format(file_path))
+            raise
+        finally:
+            self.exportTrace(options)
+        temp_files = [export["tempFile"] for export in [options] + options.get("drawing_exports", []) if "tempFile" in export.keys()]
+        for temp_file in temp_files:
+            if not options["tempFileKeep"] and os.path.isfile(temp_file):
+                os.remove(temp_file)
+
+    def getReadOptions(self, file_path):
+        options = {"foreignFile": file_path,
+                   "foreignFormat": os.path.splitext(file_path)[1],
+                   "tempFileKeep": False,
+                   }
+        trace_directory = Deprecations.getPreferences().getValue("cura_solidworks/trace_directory")
+        if trace_directory:
+            options["trace"] = SolidWorksTrace(file_path)
+            options["trace_directory"] = trace_directory
+        self.preStartApp(options)
+        return options
+
+    def exportTrace(self, options):
+        if "trace" not in options.keys():
+            return
+        try:
+            trace_file = options["trace"].export(options["trace_directory"])
+            Logger.log("d", "Wrote trace of <{}> to <{}>".format(options["foreignFile"], trace_file))
+        except OSError:
+            Logger.logException("w", "Could not write the trace of <{}>!".format(options["foreignFile"]))
+
+    def getPreferenceNumber(self, name):
+        value = Deprecations.getPreferences().getValue("cura_solidworks/{}".format(name))
+        if isinstance(value, str):
+            value = eval(value)
+        return value
+
+    @property
+    def sessionIdleTimeout(self):
+        return self.getPreferenceNumber("session_idle_timeout")
+
+    @property
+    def sessionInstances(self):
+        return max(1, int(self.getPreferenceNumber("session_instances") or 1))
+
+    @property
+    def sessionRecycleAfter(self):
+        return int(self.getPreferenceNumber("session_recycle_after") or 0)
+
+    @property
+    def prestartEnabled(self):
+        return bool(Deprecations.getPreferences().getValue("cura_solidworks/prestart"))
+
+    def isSystemReadyForPrestart(self):
+        # Starting SolidWorks takes a lot of memory and CPU time. That shouldn't slow down the user's work.
+        available_memory = getAvailableMemory()
+        min_free_memory = self.getPreferenceNumber("prestart_min_free_memory") * 1024 * 1024
+        if available_memory is not None and available_memory < min_free_memory:
+            Logger.log("d", "Not starting SolidWorks in advance. Only {} MB of memory are available.".format(available_memory // (1024 * 1024)))
+            return False
+        cpu_load = getCpuLoad()
+        max_cpu_load = self.getPreferenceNumber("prestart_max_cpu_load") / 100.0
+        if cpu_load is not None and cpu_load > max_cpu_load:
+            Logger.log("d", "Not starting SolidWorks in advance. The CPU load is {:.0%}.".format(cpu_load))
+            return False
+        return True
+
+    def prestartSession(self):
+        """
+        Starts the preferred installation of SolidWorks in advance, so the first import doesn't wait for it
+
+        - SolidWorks is started hidden by the session like for any import.
+        - If no file is imported within prestart_timeout seconds, the session is closed again.
+        """
+
+        if not self.isOperational() or not self.isSystemReadyForPrestart():
+            return
+        Logger.log("i", "Starting <{}> in advance..".format(self.getSessionAppNames()[0]))
+        session = self.getSession(prestart = True)
+        session.getNextSession().submit(self.onSessionPrestarted)
+
+    def onSessionPrestarted(self, session_options):
+        # Runs inside the session. The start doesn't belong to the trace of the first import.
+        app_start_span = session_options.pop("app_start_span", None)
+        if app_start_span:
+            Logger.log("d", "SolidWorks has been started in advance within {:.1f}s.".format(app_start_span[1] - app_start_span[0]))
+
+    def _onPrestartTimeout(self):
+        # The session is taken out under the lock, but closed outside of it. Otherwise getSession() would wait for SolidWorks to close.
+        with self._session_lock:
+            if self._prestart_timer is None:
+                return
+            self._prestart_timer = None
+            session = self._session
+            self._session = None
+        if session:
+            Logger.log("d", "No file has been imported after starting SolidWorks in advance. Closing it again..")
+            session.shutdown()
+
+    def getSessionAppNames(self):
+        app_names = list(self._app_names)
+        prefered_app_name = self._prefered_app_name
+        if prefered_app_name:
+            if prefered_app_name in app_names:
+                app_names.remove(prefered_app_name)
+            app_names.insert(0, prefered_app_name)
+        return app_names
+
+    def getSession(self, prestart = False):
+        previous_session = None
+        with self._session_lock:
+            if not prestart and self._prestart_timer:
+                # The session started in advance is being used
+                self._prestart_timer.cancel()
+                self._prestart_timer = None
+            elif prestart and self._session is None:
+                self._prestart_timer = threading.Timer(self.getPreferenceNumber("prestart_timeout"), self._onPrestartTimeout)
+                self._prestart_timer.daemon = True
+                self._prestart_timer.start()
+            app_names = self.getSessionAppNames()
+            instances = self.sessionInstances
+            if self._session and (self._session.app_names != app_names or self._session.size != instances):
+                Logger.log("d", "Preferred installation or number of instances has changed. Closing the current session..")
+                previous_session = self._session
+                self._session = None
+            if self._session is None:
+                self._session = SolidWorksSessionPool(self,
+                                                      app_names,
+                                                      size = instances,
+                                                      com_connector = ComConnector,
+                                                      logger = Logger,
+                                                      )
+            self._session.idle_timeout = self.sessionIdleTimeout
+            self._session.max_jobs = self.sessionRecycleAfter
+            session = self._session
+        if previous_session:
+            # Closed outside of the lock, so other callers don't wait for it
+            previous_session.shutdown()
+        return session
+
+    def _onApplicationShuttingDown(self):
+        with self._session_lock:
+            if self._prestart_timer:
+                self._prestart_timer.cancel()
+                self._prestart_timer = None
+        self.stopFolderWatcher()
+        with self._session_lock:
+            if self._session:
+                Logger.log("d", "Closing SolidWorks, since Cura is shutting down..")
+                self._session.shutdown(timeout = 60)
+                self._session = None
+
+    def readOnSession(self, options, session = None):
+        # The file is converted on the given session, e.g. the one which opened it already
+        session = session or self.getSession()
+        file_formats = None
+        while True:
+            try:
+                with traceSpan(options, "session"):
+                    options = session.run(self.exportForeignFile, options, file_formats)
+            except:
+                Logger.logException("e", "Converting <{}> by SolidWorks failed!".format(options["foreignFile"]))
+                break
+            self.showExportMessages(options)
+            scene_nodes = self.readExportResult(options)
+            if scene_nodes:
+                return scene_nodes
+            if "tempFile" not in options.keys():
+                break
+
+            # Trying the next format, which is supported by this version of SolidWorks
+            file_formats = options["fileFormatsRemaining"]
+            if not file_formats:
+                break
+
+        error_message = Message(i18n_catalog.i18nc("@info:status", "Could not convert your file with SolidWorks. Please check the log for details."))
+        error_message.setTitle("SolidWorks plugin")
+        error_message.show()
+        return None
+
+    def showExportMessages(self, options):
+        # Problems flagged by the exporter, which the user should know about. Shown once per file.
+        if options.pop("sw_open_errors", False):
+            error_message = Message(i18n_catalog.i18nc("@info:status", "SolidWorks reported errors while opening your file. We recommend to solve these issues inside SolidWorks itself."))
+            error_message.setTitle("SolidWorks plugin")
+            error_message.show()
+        if options.pop("sw_drawing_without_models", False):
+            error_message = Message(i18n_catalog.i18nc("@info:status", "Found no models inside your drawing. Could you please check its content again and make sure one part or assembly is inside?\n\nThanks!"))
+            error_message.setTitle("SolidWorks plugin")
+            error_message.show()
+
+    def readExportResult(self, options):
+        # Reads whatever exportForeignFile returned. Returns None, if nothing could be read.
+        if options.get("instanced_assembly", False):
+            scene_nodes = self.readInstancedAssembly(options)
+            if scene_nodes:
+                return self.finishSceneNodes(options, scene_nodes)
+            return None
+        if "drawing_exports" in options.keys():
+            return self.readDrawingModels(options)
+        if "tempFile" not in options.keys():
+            return None
+
+        with traceSpan(options, "readExportedFile"):
+            scene_nodes = self.readExportedFile(options)
+        self.removeTempFile(options)
+        if scene_nodes:
+            return self.finishSceneNodes(options, scene_nodes)
+        return None
+
+    def exportForeignFile(self, session_options, options, file_formats = None):
+        # Runs inside the session. Exports the file into the first possible format.
+        options = self._exporter.joinSession(session_options, options)
+        with traceSpan(options, "exportForeignFile"):
+            return self._exporter.exportForeignFile(options, file_formats)
+
+    def readDrawingModels(self, options):
+        # Each model of the drawing becomes a scene node of its own
+        scene_nodes = []
+        for drawing_export in options["drawing_exports"]:
+            model_options = dict(options)
+            model_options.update(drawing_export)
+            with traceSpan(options, "readExportedFile"):
+                model_nodes = self.readExportedFile(model_options)
+            self.removeTempFile(model_options)
+            if not model_nodes:
+                Logger.log("w", "Could not read the exported mesh of <{}>.".format(drawing_export["foreignFile"]))
+                continue
+            with traceSpan(options, "nodePostProcessing"):
+                model_nodes = self.nodePostProcessing(model_options, model_nodes)
+            for scene_node in model_nodes:
+                scene_node.setName(os.path.basename(drawing_export["foreignFile"]))
+            scene_nodes.extend(model_nodes)
+        if not scene_nodes:
+            return None
+        if len(scene_nodes) == 1:
+            return scene_nodes[0]
+        return scene_nodes
+
+    def readInstancedAssembly(self, options):
+        # Reading each unique part once. All instances share the same MeshData.
+        meshes = {}
+        for instance_key, temp_file in options["instance_exports"].items():
+            part_options = dict(options)
+            part_options["tempType"] = "stl"
+            part_options["tempFile"] = temp_file
+            with traceSpan(options, "readExportedFile"):
+                scene_nodes = self.readExportedFile(part_options)
+            self.removeTempFile(part_options)
+            if not scene_nodes:
+                Logger.log("w", "Could not read the exported mesh of <{}> ({}).".format(*instance_key))
+                continue
+            meshes[instance_key] = (scene_nodes[0].getMeshData(), scene_nodes[0].getLocalTransformation().getData())
+        if not meshes:
+            return None
+
+        # The STL reader maps SolidWorks' coordinates (x, y, z) onto (x, z, -y).
+        # Auto-rotation maps them back. Without it, the whole assembly is mapped like a single STL would be.
+        group_node = CuraSceneNode()
+        group_node.addDecorator(GroupDecorator())
+        group_node.setName(os.path.basename(options["foreignFile"]))
+        group_node.setSelectable(True)
+        for instance_key, array_data in options["instances"]:
+            if instance_key not in meshes.keys():
+                continue
+            mesh_data, reader_transformation = meshes[instance_key]
+            transformation = getInstancePlacement(array_data, options["app_auto_rotate"]).dot(reader_transformation)
+            scene_node = CuraSceneNode()
+            scene_node.setMeshData(mesh_data)
+            scene_node.setName("{} ({})".format(os.path.basename(instance_key[0]), instance_key[1]))
+            scene_node.setTransformation(Matrix(transformation))
+            group_node.addChild(scene_node)
+        return [group_node, ]
+
+    def readExportedFile(self, options):
+        # SolidWorks exports binary STLs and 3MFs, which are read directly. Anything else is read by Cura.
+        if options["tempType"] == "stl" and isBinaryStl(options["tempFile"]):
+            try:
+                return self.readBinaryStlFile(options)
+            except:
+                Logger.logException("e", "Failed to read the exported mesh <{}>! Trying Cura's reader..".format(options["tempFile"]))
+        elif options["tempType"] == "3mf":
+            try:
+                return self.read3mfFile(options)
+            except:
+                Logger.logException("e", "Failed to read the exported mesh <{}>! Trying Cura's reader..".format(options["tempFile"]))
+
+        try:
+            reader = Application.getInstance().getMeshFileHandler().getReaderForFile(options["tempFile"])
+            if not reader:
+                Logger.log("e", "Found no reader for '{}'!".format(options["tempType"]))
+                return None
+            scene_nodes = reader.read(options["tempFile"])
+        except:
+            Logger.logException("e", "Failed to read the exported mesh <{}>!".format(options["tempFile"]))
+            return None
+        if not scene_nodes:
+            return None
+        if not isinstance(scene_nodes, list):
+            scene_nodes = [scene_nodes, ]
+        return scene_nodes
+
+    def readBinaryStlFile(self, options):
+        vertices, normals = readBinaryStl(options["tempFile"])
+        if not len(vertices):
+            Logger.log("e", "Found no triangles in <{}>!".format(options["tempFile"]))
+            return None
+        Logger.log("d", "Loaded a mesh with {} vertices".format(len(vertices)))
+        scene_node = CuraSceneNode()
+        scene_node.setMeshData(MeshData(vertices = vertices,
+                                        normals = normals,
+                                        file_name = options["tempFile"],
+                                        ))
+        scene_node.setName(os.path.basename(options["foreignFile"]))
+        scene_node.setSelectable(True)
+        return [scene_node, ]
+
+    def read3mfFile(self, options):
+        meshes, items = read3mf(options["tempFile"])
+        if not items:
+            Logger.log("e", "Found no objects in <{}>!".format(options["tempFile"]))
+            return None
+        Logger.log("d", "Loaded {} meshes with {} vertices, placed {} times".format(len(meshes),
+                                                                                   sum([len(vertices) for vertices, _ in meshes.values()]),
+                                                                                   len(items),
+                                                                                   )
+                   )
+
+        meshes, items = map3mfMeshes(meshes, items, options["app_auto_rotate"])
+        mesh_datas = {}
+        for object_id, (vertices, indices) in meshes.items():
+            mesh_datas[object_id] = MeshData(vertices = getReadOnlyArray(vertices),
+                                             normals = getReadOnlyArray(calculateVertexNormals(vertices, indices)),
+                                             indices = getReadOnlyArray(indices),
+                                             file_name = options["tempFile"],
+                                             )
+
+        scene_nodes = []
+        for object_id, name, transformation in items:
+            scene_node = CuraSceneNode()
+            scene_node.setMeshData(mesh_datas[object_id])
+            scene_node.setName(name or os.path.basename(options["foreignFile"]))
+            scene_node.setSelectable(True)
+            scene_node.setTransformation(Matrix(transformation))
+            scene_nodes.append(scene_node)
+        if len(scene_nodes) == 1:
+            return scene_nodes
+
+        group_node = CuraSceneNode()
+        group_node.addDecorator(GroupDecorator())
+        group_node.setName(os.path.basename(options["foreignFile"]))
+        group_node.setSelectable(True)
+        for scene_node in scene_nodes:
+            group_node.addChild(scene_node)
+        return [group_node, ]
+
+    def removeTempFile(self, options):
+        if not options["tempFileKeep"] and os.path.isfile(options["tempFile"]):
+            Logger.log("d", "Removing temporary {} file, called <{}>".format(options["tempType"], options["tempFile"]))
+            os.remove(options["tempFile"])
+
+    def finishSceneNodes(self, options, scene_nodes):
+        with traceSpan(options, "nodePostProcessing"):
+            scene_nodes = self.nodePostProcessing(options, scene_nodes)
+        if len(scene_nodes) == 1:
+            return scene_nodes[0]
+        return scene_nodes
+
     def setAppVisible(self, state, options):
         # SolidWorks API: ?
         options["app_instance"].Visible = state
@@ -384,69 +1096,47 @@ class SolidWorksReader(CommonCOMReader):
             options["app_export_quality"] = int(options["app_export_quality"])
 
         options["app_auto_rotate"] = Deprecations.getPreferences().getValue("cura_solidworks/auto_rotate")
+        options["app_weld_vertices"] = Deprecations.getPreferences().getValue("cura_solidworks/weld_vertices")
+        options["app_weld_epsilon"] = Deprecations.getPreferences().getValue("cura_solidworks/weld_epsilon")
+        if isinstance(options["app_weld_epsilon"], str):
+            options["app_weld_epsilon"] = float(options["app_weld_epsilon"])
+        options["app_triangle_budget"] = Deprecations.getPreferences().getValue("cura_solidworks/triangle_budget")
+        if isinstance(options["app_triangle_budget"], str):
+            options["app_triangle_budget"] = eval(options["app_triangle_budget"])
+        options["app_triangle_budget"] = int(options["app_triangle_budget"] or 0)
+        options["app_decimation_max_error"] = Deprecations.getPreferences().getValue("cura_solidworks/decimation_max_error")
+        if isinstance(options["app_decimation_max_error"], str):
+            options["app_decimation_max_error"] = float(options["app_decimation_max_error"])
+        options["app_open_strategy"] = Deprecations.getPreferences().getValue("cura_solidworks/open_strategy") or "auto"
+        options["app_open_lightweight_components"] = self.getPreferenceNumber("open_lightweight_components")
+        options["app_open_lightweight_file_size"] = self.getPreferenceNumber("open_lightweight_file_size") * 1024 * 1024
+        options["app_instanced_assemblies"] = bool(Deprecations.getPreferences().getValue("cura_solidworks/instanced_assemblies"))
+        options["app_cache_enabled"] = self.cacheEnabled
+        self._mesh_cache.size_limit = self.cacheSizeLimit
 
     def getRevisionNumber(self, options):
         # Getting revision after starting
         if DEBUG:
             return [EMULATE_VERSION_API, 0, 0]
-
-        # SolidWorks API: ?
-        revision_number = options["app_instance"].RevisionNumber
-        if isinstance(revision_number, str):
-            revision_number = [int(x) for x in revision_number.split(".")]
-            try:
-                options["version_major"] = revision_number[0]
-                Logger.log("d", "Major version is: {}".format(options["version_major"]))
-                options["version_minor"] = revision_number[1]
-                Logger.log("d", "Minor version is: {}".format(options["version_minor"]))
-                options["version_patch"] = revision_number[2]
-                Logger.log("d", "Patch version is: {}".format(options["version_patch"]))
-            except IndexError:
-                Logger.logException("w", "Unable to parse revision number from SolidWorks.RevisionNumber. revision_number is: {revision_number}.".format(revision_number = revision_number))
-            except:
-                Logger.logException("c", "Unexpected error: revision_number = {revision_number}".format(revision_number = revision_number))
-        else:
-            Logger.log("c", "revision_number has a wrong type: {}".format(type(revision_number)))
-
-        return revision_number
+        return self._exporter.getRevisionNumber(options)
 
     def startApp(self, options):
         if DEBUG:
             options["tempFileKeep"] = True
+        elif options.get("app_start_new_instance", False):
+            # Attaching to the running instance would share it with another session of the pool
+            Logger.log("d", "Starting a new instance of %s...", options["app_name"])
+            options["app_instance"] = ComConnector.CreateClassObject(options["app_name"])
+            options["app_was_active"] = False
         else:
             super().startApp(options)
 
-            # Tell SolidWorks we operating in the background
-            # SolidWorks API: 2006 SP2 (Rev 14.2)
-            options["app_operate_in_background"] = options["app_instance"].CommandInProgress # SolidWorks API: 2006 SP2 (Rev 14.2)
-            options["app_instance"].CommandInProgress = True
-
-            # Allow SolidWorks to run in the background and be invisible
-            # SolidWorks API: ?
-            options["app_instance_user_control"] = options["app_instance"].UserControl
-            options["app_instance"].UserControl = False
-
-            # If the following property is true, then the SolidWorks frame will be visible on a call to ISldWorks::ActivateDoc2; so set it to false
-            # SolidWorks API: ?
-            options["app_instance_visible"] = options["app_instance"].Visible
-            options["app_instance"].Visible = False
-
-            # Keep SolidWorks frame invisible when ISldWorks::ActivateDoc2 is called
-            # SolidWorks API: ?
-            options["app_frame"] = options["app_instance"].Frame
-            options["app_frame_invisible"] = options["app_frame"].KeepInvisible
-            options["app_frame"].KeepInvisible = True
+        if not DEBUG:
+            self._exporter.hideApp(options)
 
         # Updating options["fileFormats"] depending on the started version
         revision = self.getRevisionNumber(options)
-        options["fileFormats"] = [] # Ordered list of preferred formats
-
-        # WORKAROUND: DISABLING 3MF-USAGE. THE READER RETURNS A NODE, WHICH FAILS TO BE ROTATED.
-        #             WHEN DOING A SIMPLE ROATATION IT BLOWS UP THE MEMORY!
-        # TODO: Adding check whether all readers are available per format!
-        if revision[0] >= 25:
-            options["fileFormats"].append("3mf")
-        options["fileFormats"].append("stl")
+        options["fileFormats"] = self._exporter.getFileFormats(revision[0])
 
         version_name = self.getFriendlyName(revision[0])
         Logger.log("d", "Started: %s", version_name)
@@ -454,372 +1144,133 @@ class SolidWorksReader(CommonCOMReader):
         return options
 
     def closeApp(self, options):
-        if "app_frame" in options.keys():
-            # Normally, we want to do that, but this confuses SolidWorks more than needed, it seems.
-            Logger.log("d", "Rolling back changes on app_frame.")
-            if "app_frame_invisible" in options.keys():
-                options["app_frame"].KeepInvisible = options["app_frame_invisible"]
-
-        if "app_instance" in options.keys():
-            # Same here. By logic I would assume that we need to undo it, but when processing multiple parts, SolidWorks gets confused again..
-            # Or there is another sense..
-            Logger.log("d", "Rolling back changes on app_instance.")
-            if "app_instance_visible" in options.keys():
-                # SolidWorks API: ?
-                options["app_instance"].Visible = options["app_instance_visible"]
-            if "app_instance_user_control" in options.keys():
-                # SolidWorks API: ?
-                options["app_instance"].UserControl = options["app_instance_user_control"]
-            if "app_operate_in_background" in options.keys():
-                # SolidWorks API: 2006 SP2 (Rev 14.2)
-                options["app_instance"].CommandInProgress = options["app_operate_in_background"]
+        self._exporter.restoreApp(options)
         Logger.log("d", "Closed SolidWorks.")
 
-    def walkComponentsInAssembly(self, root = None):
-        if root is None:
-            root = self.root_component
-
-        children = root.GetChildren
-
-        if children:
-            children = [self.walkComponentsInAssembly(child) for child in children]
-            return root, children
-        else:
-            return root
-
-        """
-        models = options["sw_model"].GetComponents(True)
-
-        for model in models:
-            #Logger.log("d", model.GetModelDoc2())
-            #Logger.log("d", repr(model.GetTitle))
-            Logger.log("d", repr(model.GetPathName))
-            #Logger.log("d", repr(model.GetType))
-            if model.GetPathName in ComponentsCount.keys():
-                ComponentsCount[model.GetPathName] = ComponentsCount[model.GetPathName] + 1
-            else:
-                ComponentsCount[model.GetPathName] = 1
-
-        for key in ComponentsCount.keys():
-            Logger.log("d", "Found %s %s-times in the assembly!" %(key, ComponentsCount[key]))
-        """
-
     def getOpenDocuments(self, options):
-        open_files = []
-        # SolidWorks API: 98Plus
-        open_file = options["app_instance"].GetFirstDocument
-        while open_file:
-            open_files.append(open_file)
-            open_file = open_file.GetNext
-        Logger.log("i", "Found {} open files..".format(len(open_files)))
-        return open_files
-
-    def getOpenDocumentPaths(self, options):
-        paths = []
-        for document in self.getOpenDocuments(options):
-            paths.append(document.GetPathName)
-        return paths
-
-    def getOpenDocumentFilepathDict(self, options):
-        """
-        Returns a dictionary of filepaths and document objects
-
-        - Apparently we can't get .GetDocuments working
-        """
-
-        open_files = self.getOpenDocuments(options)
-        open_file_paths = {}
-        for open_file in open_files:
-            open_file_paths[os.path.normpath(open_file.GetPathName)] = open_file
-            open_file = open_file.GetNext
-        return open_file_paths
-
-    def getDocumentTitleByFilepath(self, options, filepath):
-        open_files = self.getOpenDocumentFilepathDict(options)
-        for open_file_path in open_files.keys():
-            if os.path.normpath(filepath) == open_file_path:
-                Logger.log("i", "Found title '{}' for file <{}>".format(open_files[open_file_path].GetTitle,
-                                                                        open_file_path)
-                           )
-                return open_files[open_file_path].GetTitle
-        return None
-
-    def getDocumentsInDrawing(self, options):
-        referenceModelNames = []
-        # SolidWorks API: ?
-        swView = options["sw_model"].GetFirstView
-        while not swView is None:
-            if swView.GetReferencedModelName not in referenceModelNames and swView.GetReferencedModelName != "":
-                referenceModelNames.append(swView.GetReferencedModelName)
-            swView = swView.GetNextView
-        return referenceModelNames
-
-    def countDocumentsInDrawing(self, options):
-        return len(self.getDocumentsInDrawing(options))
-
-    def activatePreviousFile(self, options):
-        if "sw_previous_active_file" in options.keys():
-            if options["sw_previous_active_file"] and "GetTitle" in dir(options["sw_previous_active_file"]):
-                error = ComConnector.getByVarInt()
-                # SolidWorks API: >= 20.0.x
-                options["app_instance"].ActivateDoc3(options["sw_previous_active_file"].GetTitle,
-                                                     True,
-                                                     SolidWorksEnums.swRebuildOnActivation_e.swDontRebuildActiveDoc,
-                                                     error
-                                                     )
-        return options
+        return self._exporter.getOpenDocuments(options)
 
     def openForeignFile(self, options):
+        return self._exporter.openForeignFile(options)
+
+    def getPreferenceJournalPath(self, options):
+        return os.path.join(Resources.getDataStoragePath(),
+                            self.preference_namespace,
+                            "export_preferences_{}{}.json".format(options.get("version_major"),
+                                                                  "_{}".format(options["app_instance_index"]) if options.get("app_instance_index") else "",
+                                                                  ),
+                            )
+
+    def onSessionStarted(self, session_options):
+        # Called by the session after SolidWorks has been started
         if DEBUG:
-            return options
-        open_file_paths = self.getOpenDocumentPaths(options)
-
-        # SolidWorks API: X
-        options["sw_previous_active_file"] = options["app_instance"].ActiveDoc
-        # If the file has not been loaded open it!
-        if not os.path.normpath(options["foreignFile"]) in open_file_paths:
-            Logger.log("d", "Opening the foreign file!")
-            if options["foreignFormat"].upper() == self._extension_part:
-                filetype = SolidWorksEnums.swDocumentTypes_e.swDocPART
-            elif options["foreignFormat"].upper() == self._extension_assembly:
-                filetype = SolidWorksEnums.swDocumentTypes_e.swDocASSEMBLY
-            elif options["foreignFormat"].upper() == self._extension_drawing:
-                filetype = SolidWorksEnums.swDocumentTypes_e.swDocDRAWING
-            else:
-                raise NotImplementedError("Unknown extension. Something went terribly wrong!")
-
-            # SolidWorks API: 2008 FCS (Rev 16.0)
-            documentSpecification = options["app_instance"].GetOpenDocSpec(options["foreignFile"])
-
-            ## NOTE: SPEC: FileName
-            #documentSpecification.FileName
-
-            ## NOTE: SPEC: DocumentType
-            ## TODO: Really needed here?!
-            documentSpecification.DocumentType = filetype
-
-            ## TODO: Test the impact of LightWeight = True
-            #documentSpecification.LightWeight = True
-            documentSpecification.Silent = True
+            return
+        self._exporter.onSessionStarted(session_options, self.getPreferenceJournalPath(session_options))
 
-            ## TODO: Double check, whether file was really opened read-only..
-            documentSpecification.ReadOnly = True
-
-            documentSpecificationObject = ComConnector.GetComObject(documentSpecification)
-            # SolidWorks API: 2008 FCS (Rev 16.0)
-            options["sw_model"] = options["app_instance"].OpenDoc7(documentSpecificationObject)
-
-            if documentSpecification.Warning:
-                Logger.log("w", "Warnings happened while opening your SolidWorks file!")
-            if documentSpecification.Error:
-                Logger.log("e", "Errors happened while opening your SolidWorks file!")
-                error_message = Message(i18n_catalog.i18nc("@info:status", "SolidWorks reported errors while opening your file. We recommend to solve these issues inside SolidWorks itself."))
-                error_message.setTitle("SolidWorks plugin")
-                error_message.show()
-            options["sw_opened_file"] = True
-        else:
-            Logger.log("d", "Foreign file has already been opened!")
-            options["sw_model"] = self.getOpenDocumentFilepathDict(options)[os.path.normpath(options["foreignFile"])]
-            options["sw_opened_file"] = False
-
-        if options["foreignFormat"].upper() == self._extension_drawing:
-            count_of_documents = self.countDocumentsInDrawing(options)
-            if count_of_documents == 0:
-                error_message = Message(i18n_catalog.i18nc("@info:status", "Found no models inside your drawing. Could you please check its content again and make sure one part or assembly is inside?\n\nThanks!"))
-                error_message.setTitle("SolidWorks plugin")
-                error_message.show()
-            elif count_of_documents > 1:
-                error_message = Message(i18n_catalog.i18nc("@info:status", "Found more than one part or assembly inside your drawing. We currently only support drawings with exactly one part or assembly inside.\n\nSorry!"))
-                error_message.setTitle("SolidWorks plugin")
-                error_message.show()
-            else:
-                options["sw_drawing"] = options["sw_model"]
-                options["sw_drawing_opened"] = options["sw_opened_file"]
-                options["foreignFile"] = self.getDocumentsInDrawing(options)[0]
-                options["foreignFormat"] = os.path.splitext(options["foreignFile"])[1]
-                self.activatePreviousFile(options)
-
-                options = self.openForeignFile(options)
-
-        error = ComConnector.getByVarInt()
-        # SolidWorks API: >= 20.0.x
-        # SolidWorks API: 2001Plus FCS (Rev. 10.0) - GetTitle
-        options["app_instance"].ActivateDoc3(options["sw_model"].GetTitle,
-                                             True,
-                                             SolidWorksEnums.swRebuildOnActivation_e.swDontRebuildActiveDoc,
-                                             error,
-                                             )
-
-        # Might be useful in the future, but no need for this ATM
-        #self.configuration = options["sw_model"].getActiveConfiguration
-        #self.root_component = self.configuration.GetRootComponent
-
-        ## EXPERIMENTAL: Browse single parts in assembly
-        #if filetype == SolidWorksEnums.FileTypes.SWassembly:
-        #    Logger.log("d", 'walkComponentsInAssembly: ' + repr(self.walkComponentsInAssembly()))
-
-        return options
+    def onSessionClosing(self, session_options):
+        # Called by the session before SolidWorks gets closed
+        self._exporter.onSessionClosing(session_options)
 
     def exportFileAs(self, options, quality_enum = None):
-        if DEBUG:
-            _plugin_dir = os.path.split(__file__)[0]
-            _test_file = os.path.join(_plugin_dir,
-                                      "tests",
-                                      "file_type_examples",
-                                      "test_cube.{}".format(options["tempType"].lower())
-                                      )
-            if not os.path.isfile(_test_file):
-                Logger.log("w", "Test file not found!")
-            options["tempFile"] = _test_file
-            Logger.log("w", "Overriding 'tempFile' with: {}".format(options["tempFile"]))
-            return options
-
-        # # Backing up everything
-        if options["foreignFormat"].upper() == self._extension_assembly:
-            # Backing up current setting of swSTLComponentsIntoOneFile
-            # SolidWorks API: 2009 FCS (Rev 17.0)
-            swSTLComponentsIntoOneFileBackup = options["app_instance"].GetUserPreferenceToggle(SolidWorksEnums.UserPreferences.swSTLComponentsIntoOneFile)
-
-        # Backing up quality settings
-        # SolidWorks API: ?
-        swExportSTLQualityBackup = options["app_instance"].GetUserPreferenceIntegerValue(SolidWorksEnums.swUserPreferenceIntegerValue_e.swExportSTLQuality)
-        swExportSTLAngleToleranceBackup = options["app_instance"].GetUserPreferenceIntegerValue(SolidWorksEnums.swUserPreferenceDoubleValue_e.swSTLAngleTolerance)
-        swExportSTLDeviationBackup = options["app_instance"].GetUserPreferenceIntegerValue(SolidWorksEnums.swUserPreferenceDoubleValue_e.swSTLDeviation)
-
-        # Backing up the default unit for STLs to mm, which is expected by Cura
-        # SolidWorks API: ?
-        swExportStlUnitsBackup = options["app_instance"].GetUserPreferenceIntegerValue(SolidWorksEnums.swUserPreferenceIntegerValue_e.swExportStlUnits)
-        # Backing up the output type temporary to binary
-        # SolidWorks API: 2009 FCS (Rev 17.0)
-        swSTLBinaryFormatBackup = options["app_instance"].GetUserPreferenceToggle(SolidWorksEnums.swUserPreferenceToggle_e.swSTLBinaryFormat)
-
-        # # Setting everything up
-        # Export for assemblies
-        if options["foreignFormat"].upper() == self._extension_assembly:
-            # Setting up swSTLComponentsIntoOneFile
-            # SolidWorks API: 2001 Plus FCS (Rev 10.0)
-            options["app_instance"].SetUserPreferenceToggle(SolidWorksEnums.UserPreferences.swSTLComponentsIntoOneFile,
-                                                                self._convert_assembly_into_once)
-
-        # Setting  quality
-        # -2 := Custom (not supported yet!)
-        # -1 := Keep settings unchanged
-        #  0 := Coarse (as defined by SolidWorks)
-        # 10 := Fine (as defined by SolidWorks)
-        # 20 := Coarse (3D printing profile)
-        # 30 := Fine (3D printing profile)
-
-        if quality_enum is -1 or quality_enum < -1:
-            Logger.log("i", "Using settings, which are currently set in SolidWorks!")
-        elif quality_enum in range(0, 10):
-            Logger.log("i", "Using SolidWorks' coarse quality!")
-            # Give actual value for quality
-            # SolidWorks API: ?
-            options["app_instance"].SetUserPreferenceIntegerValue(SolidWorksEnums.swUserPreferenceIntegerValue_e.swExportSTLQuality,
-                                                                  SolidWorksEnums.swSTLQuality_e.swSTLQuality_Coarse)
-        elif quality_enum in range(10, 20):
-            Logger.log("i", "Using SolidWorks' fine quality!")
-            # Give actual value for quality
-            # SolidWorks API: ?
-            options["app_instance"].SetUserPreferenceIntegerValue(SolidWorksEnums.swUserPreferenceIntegerValue_e.swExportSTLQuality,
-                                                                  SolidWorksEnums.swSTLQuality_e.swSTLQuality_Fine)
-        elif quality_enum in range(20, 30):
-            Logger.log("i", "Using coarse quality for 3D printing!")
-            # Give actual value for quality
-            options["app_instance"].SetUserPreferenceIntegerValue(SolidWorksEnums.swUserPreferenceIntegerValue_e.swExportSTLQuality,
-                                                                  SolidWorksEnums.swSTLQuality_e.swSTLQuality_Custom)
-            options["app_instance"].SetUserPreferenceIntegerValue(SolidWorksEnums.swUserPreferenceDoubleValue_e.swSTLAngleTolerance,
-                                                                  5.0)
-            options["app_instance"].SetUserPreferenceIntegerValue(SolidWorksEnums.swUserPreferenceDoubleValue_e.swSTLDeviation,
-                                                                  0.4)
-        elif quality_enum >= 30:
-            Logger.log("i", "Using fine quality for 3D printing!")
-            # Give actual value for quality
-            options["app_instance"].SetUserPreferenceIntegerValue(SolidWorksEnums.swUserPreferenceIntegerValue_e.swExportSTLQuality,
-                                                                  SolidWorksEnums.swSTLQuality_e.swSTLQuality_Custom)
-            options["app_instance"].SetUserPreferenceIntegerValue(SolidWorksEnums.swUserPreferenceDoubleValue_e.swSTLAngleTolerance,
-                                                                  1.0)
-            options["app_instance"].SetUserPreferenceIntegerValue(SolidWorksEnums.swUserPreferenceDoubleValue_e.swSTLDeviation,
-                                                                  0.1)
-        else:
-            Logger.log("e", "Invalid value for quality: {}".format(repr(quality_enum)))
-
-        # Changing the default unit for STLs to mm, which is expected by Cura
-        # SolidWorks API: ?
-        options["app_instance"].SetUserPreferenceIntegerValue(SolidWorksEnums.swUserPreferenceIntegerValue_e.swExportStlUnits,
-                                                              SolidWorksEnums.swLengthUnit_e.swMM)
-
-        # Changing the output type temporary to binary
-        # SolidWorks API: 2001 Plus FCS (Rev 10.0)
-        options["app_instance"].SetUserPreferenceToggle(SolidWorksEnums.swUserPreferenceToggle_e.swSTLBinaryFormat, True)
-
-        options["sw_model"].SaveAs(options["tempFile"])
-
-        ## Restoring swSTLBinaryFormat
-        # SolidWorks API: 2001 Plus FCS (Rev 10.0)
-        options["app_instance"].SetUserPreferenceToggle(SolidWorksEnums.swUserPreferenceToggle_e.swSTLBinaryFormat,
-                                                        swSTLBinaryFormatBackup)
-
-        ## Restoring swExportStlUnits
-        # SolidWorks API: ?
-        options["app_instance"].SetUserPreferenceIntegerValue(SolidWorksEnums.swUserPreferenceIntegerValue_e.swExportStlUnits,
-                                                              swExportStlUnitsBackup)
-
-        ## Restoring swSTL*
-        options["app_instance"].SetUserPreferenceIntegerValue(SolidWorksEnums.swUserPreferenceDoubleValue_e.swSTLAngleTolerance,
-                                                              swExportSTLAngleToleranceBackup)
-        options["app_instance"].SetUserPreferenceIntegerValue(SolidWorksEnums.swUserPreferenceDoubleValue_e.swSTLDeviation,
-                                                              swExportSTLDeviationBackup)
-        # SolidWorks API: ?
-        options["app_instance"].SetUserPreferenceIntegerValue(SolidWorksEnums.swUserPreferenceIntegerValue_e.swExportSTLQuality,
-                                                              swExportSTLQualityBackup)
-
-        if options["foreignFormat"].upper() == self._extension_assembly:
-            # Restoring swSTLComponentsIntoOneFile
-            # SolidWorks API: 2001 Plus FCS (Rev 10.0)
-            options["app_instance"].SetUserPreferenceToggle(SolidWorksEnums.UserPreferences.swSTLComponentsIntoOneFile, swSTLComponentsIntoOneFileBackup)
-
-        return options
+        return self._exporter.exportFileAs(options, quality_enum)
 
     def closeForeignFile(self, options):
-        if "app_instance" in options.keys():
-            if "sw_opened_file" in options.keys():
-                if options["sw_opened_file"]:
-                    # SolidWorks API: ?
-                    # SolidWorks API: 2001Plus FCS (Rev. 10.0) - GetTitle
-                    options["app_instance"].CloseDoc(options["sw_model"].GetTitle)
-            if "sw_drawing_opened" in options.keys():
-                if options["sw_drawing_opened"]:
-                    # SolidWorks API: ?
-                    options["app_instance"].CloseDoc(options["sw_drawing"].GetTitle)
-            self.activatePreviousFile(options)
+        self._exporter.closeForeignFile(options)
+
+    def replaceMeshData(self, scene_nodes, function):
+        # Calls function(mesh_data) once per unique mesh and sets the result on all nodes sharing it
+        replaced_meshes = {} # id -> (original, replacement). Keeps the originals alive, so ids can't be reused.
+        nodes_to_process = list(scene_nodes)
+        while nodes_to_process:
+            scene_node = nodes_to_process.pop()
+            nodes_to_process.extend(scene_node.getChildren())
+            mesh_data = scene_node.getMeshData()
+            if mesh_data is None:
+                continue
+            if id(mesh_data) not in replaced_meshes.keys():
+                replaced_meshes[id(mesh_data)] = (mesh_data, function(mesh_data))
+            scene_node.setMeshData(replaced_meshes[id(mesh_data)][1])
+
+    def rotateMeshData(self, mesh_data):
+        # Done in-place on the vertices and normals, so no transformed copy of the mesh is needed.
+        # The arrays are read-only again, when MeshData takes them over. Otherwise it would copy them.
+        vertices = mesh_data.getVertices()
+        if vertices is not None:
+            vertices = getReadOnlyArray(rotateAboutXInPlace(getWriteableArray(vertices)))
+        normals = mesh_data.getNormals()
+        if normals is not None:
+            normals = getReadOnlyArray(rotateAboutXInPlace(getWriteableArray(normals)))
+        return mesh_data.set(vertices = vertices, normals = normals)
+
+    def weldMeshData(self, mesh_data, epsilon):
+        vertices = mesh_data.getVertices()
+        if vertices is None:
+            return mesh_data
+        welded = weldTriangleSoup(vertices, mesh_data.getIndices() if mesh_data.hasIndices() else None, epsilon)
+        if welded is None:
+            return mesh_data
+        memory_before = vertices.nbytes
+        if mesh_data.getNormals() is not None:
+            memory_before += mesh_data.getNormals().nbytes
+
+        welded_vertices, indices = welded
+        normals = calculateVertexNormals(welded_vertices, indices)
+        Logger.log("d", "Welded {} vertices into {} ({:.1f} MB -> {:.1f} MB)".format(len(vertices),
+                                                                                    len(welded_vertices),
+                                                                                    memory_before / 1024**2,
+                                                                                    (welded_vertices.nbytes + normals.nbytes + indices.nbytes) / 1024**2,
+                                                                                    )
+                   )
+        return mesh_data.set(vertices = getReadOnlyArray(welded_vertices),
+                             normals = getReadOnlyArray(normals),
+                             indices = getReadOnlyArray(indices),
+                             )
+
+    def decimateMeshData(self, mesh_data, triangle_budget, max_error):
+        # triangle_budget and max_error may be None, but not both
+        vertices = mesh_data.getVertices()
+        if vertices is None:
+            return mesh_data
+
+        start_time = time.perf_counter()
+        decimated = reduceMesh(vertices, mesh_data.getIndices() if mesh_data.hasIndices() else None, triangle_budget, max_error)
+        if decimated is None:
+            return mesh_data
+        new_vertices, new_indices = decimated
+        normals = calculateVertexNormals(new_vertices, new_indices)
+        Logger.log("d", "Decimated {} triangles into {} within {:.2f}s".format(mesh_data.getFaceCount(),
+                                                                              len(new_indices),
+                                                                              time.perf_counter() - start_time,
+                                                                              )
+                   )
+        return mesh_data.set(vertices = getReadOnlyArray(new_vertices),
+                             normals = getReadOnlyArray(normals),
+                             indices = getReadOnlyArray(new_indices),
+                             )
 
     def nodePostProcessing(self, options, scene_nodes, revision = None):
         Logger.log("d", "Doing postprocessing on: {}".format(repr(scene_nodes)))
         super().nodePostProcessing(options, scene_nodes)
         # # Auto-rotation
-        if options["app_auto_rotate"]:
-            if options["tempType"] == "stl":
-                Logger.log("d", "Doing auto-rotation..")
-                # Known problem under SolidWorks 2016 until 2018:
-                # Exported models are rotated by -90 degrees. This rotates them back!
-                rotation = Quaternion.fromAngleAxis(math.radians(90), Vector.Unit_X)
-                zero_translation = Matrix(data=numpy.zeros(3, dtype = numpy.float64))
-                for scene_node in scene_nodes:
-                    if not scene_node.hasChildren():
-                        scene_node.rotate(rotation)
-                        mesh_data = scene_node.getMeshData()
-                        transformation_matrix = scene_node.getLocalTransformation()
-                        transformation_matrix.setTranslation(zero_translation)
-                        scene_node.setMeshData(mesh_data.getTransformed(transformation_matrix))
-                    else:
-                        Logger.log("d", "Passing children: {}".format(repr(scene_node.getChildren())))
-                        self.nodePostProcessing(options, scene_node.getChildren(), revision = revision)
-                return scene_nodes
-            elif options["tempType"] == "3mf":
-                for scene_node in scene_nodes:
-                    Logger.log("d", "node: {}".format(dir(scene_node)))
-                    zero_translation = Matrix()
-                    scene_node.setTransformation(zero_translation)
-                return scene_nodes
+        # Instanced assemblies are placed by their transformations, which include the rotation already.
+        # 3MF files are already mapped while reading them.
+        if isRotatedAfterReading(options):
+            Logger.log("d", "Doing auto-rotation..")
+            # Known problem under SolidWorks 2016 until 2018:
+            # Exported models are rotated by -90 degrees. This rotates them back!
+            self.replaceMeshData(scene_nodes, self.rotateMeshData)
+
+        # # Vertex welding
+        # STL files are triangle soups, where each vertex is stored once per adjacent face.
+        epsilon = getWeldEpsilon(options)
+        if epsilon is not None:
+            self.replaceMeshData(scene_nodes, lambda mesh_data: self.weldMeshData(mesh_data, epsilon))
+
+        # # Decimation
+        # Reduces each mesh to the triangle budget or as far as the error bound allows. More triangles don't improve the print.
+        triangle_budget, max_error = getDecimationLimits(options)
+        if triangle_budget or max_error:
+            start_time = time.perf_counter()
+            self.replaceMeshData(scene_nodes, lambda mesh_data: self.decimateMeshData(mesh_data, triangle_budget, max_error))
+            Logger.log("d", "Decimation took {:.2f}s".format(time.perf_counter() - start_time))
         return scene_nodes
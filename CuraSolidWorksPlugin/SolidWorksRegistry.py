@@ -0,0 +1,128 @@
+# Copyright (c) 2018 Thomas Karl Pietrowski
+
+# Build-ins
+import threading
+
+class WinRegBackend():
+    """
+    Reads HKEY_CLASSES_ROOT through winreg
+    """
+
+    def __init__(self):
+        import winreg # @UnresolvedImport
+        self._winreg = winreg
+
+    def hasKey(self, path):
+        try:
+            self._winreg.CloseKey(self._winreg.OpenKey(self._winreg.HKEY_CLASSES_ROOT, path, 0, self._winreg.KEY_READ))
+            return True
+        except OSError:
+            return False
+
+    def getValue(self, path):
+        # Default value of the key or None, if the key doesn't exist
+        try:
+            return self._winreg.QueryValue(self._winreg.HKEY_CLASSES_ROOT, path)
+        except OSError:
+            return None
+
+class MemoryRegistryBackend():
+    """
+    In-memory registry for testing. Keys are case-insensitive like in the Windows registry.
+
+    - keys: {"SldWorks.Application.26\\CLSID": "{...}", ...}
+      Parent keys exist implicitly.
+    - Each access is counted in calls, so the number of registry accesses can be compared.
+    """
+
+    def __init__(self, keys = None):
+        self._keys = {}
+        self.calls = 0
+        for path, value in (keys or {}).items():
+            self.setValue(path, value)
+
+    def setValue(self, path, value):
+        parts = path.lower().split("\\")
+        for index in range(1, len(parts)):
+            self._keys.setdefault("\\".join(parts[:index]), None)
+        self._keys["\\".join(parts)] = value
+
+    def hasKey(self, path):
+        self.calls += 1
+        return path.lower() in self._keys.keys()
+
+    def getValue(self, path):
+        self.calls += 1
+        return self._keys.get(path.lower())
+
+class SolidWorksRegistry():
+    """
+    Discovers the installed versions of SolidWorks in the registry
+
+    - Instead of enumerating all keys of HKEY_CLASSES_ROOT, only the known keys are looked up:
+      "SldWorks.Application\\CurVer" and "SldWorks.Application.<N>" for the range of probed major revisions.
+    - All results are cached until clearCache() is called.
+    """
+
+    # Every major revision from the first versions of SolidWorks until SolidWorks 2030, like enumerating all keys found them.
+    # Old installations, e.g. SolidWorks 2006 (14), still register their service.
+    probed_versions = range(1, 39)
+
+    def __init__(self, backend, app_name = "SldWorks.Application"):
+        self.backend = backend
+        self.app_name = app_name
+        self._cache = {}
+        self._lock = threading.RLock()
+
+    def _cached(self, key, function, *args):
+        with self._lock:
+            if key not in self._cache.keys():
+                self._cache[key] = function(*args)
+            return self._cache[key]
+
+    def clearCache(self):
+        with self._lock:
+            self._cache = {}
+
+    def getVersionedAppName(self, version):
+        return "{}.{}".format(self.app_name, version)
+
+    def getCurrentVersion(self):
+        # Version registered as default by the last installation: "SldWorks.Application.26"
+        return self._cached(("current_version", ), self._readCurrentVersion)
+
+    def _readCurrentVersion(self):
+        current_version = self.backend.getValue("{}\\CurVer".format(self.app_name))
+        if not current_version or not current_version.startswith("{}.".format(self.app_name)):
+            return None
+        try:
+            return int(current_version[len(self.app_name) + 1:])
+        except ValueError:
+            return None
+
+    def isServiceRegistered(self, version):
+        return self._cached(("registered", version), self.backend.hasKey, self.getVersionedAppName(version))
+
+    def getVersions(self):
+        return list(self._cached(("versions", ), self._readVersions))
+
+    def _readVersions(self):
+        versions = set([version for version in self.probed_versions if self.isServiceRegistered(version)])
+        current_version = self.getCurrentVersion()
+        if current_version is not None and self.isServiceRegistered(current_version):
+            versions.add(current_version)
+        return sorted(versions, reverse = True)
+
+    def getServiceCommand(self, version):
+        return self._cached(("command", version), self._readServiceCommand, version)
+
+    def _readServiceCommand(self, version):
+        # Command to start the version. Falls back to the local server of its CLSID.
+        app_name = self.getVersionedAppName(version)
+        command = self.backend.getValue("{}\\shell\\open\\command".format(app_name))
+        if command:
+            return command
+        clsid = self.backend.getValue("{}\\CLSID".format(app_name))
+        if clsid:
+            return self.backend.getValue("CLSID\\{}\\LocalServer32".format(clsid))
+        return None
@@ -0,0 +1,324 @@
+# Copyright (c) 2018 Thomas Karl Pietrowski
+
+# Build-ins
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# This plugin
+try:
+    from .SolidWorksLogger import PythonLogger # @UnresolvedImport
+except ImportError:
+    from SolidWorksLogger import PythonLogger # @UnresolvedImport
+
+class SolidWorksSession():
+    """
+    Keeps a single instance of SolidWorks alive between conversions
+
+    - All COM calls are done by one worker thread, since COM objects are bound to the apartment they were created in.
+      The thread enters its own apartment through com_connector.CoInit() and leaves it, when the thread ends.
+    - SolidWorks is started with the first job and set up once (CommandInProgress, UserControl, Visible, KeepInvisible).
+    - After being idle for idle_timeout seconds or on shutdown() the app is closed again.
+    - Before a job is run on an app, which has been waiting for more than health_check_interval seconds,
+      the app is checked to still respond. Otherwise a new one is started.
+    - After max_jobs jobs the app is closed and started again with the next job. 0 never recycles the app.
+    - Logs through logger, which is UM.Logger inside Cura.
+    """
+
+    def __init__(self, reader, app_names, idle_timeout = 300, index = 0, start_new_instance = False, max_jobs = 0, pool = None,
+                 com_connector = None, logger = None):
+        self.reader = reader
+        self.com_connector = com_connector
+        self.logger = logger or PythonLogger()
+        self.app_names = app_names
+        self.idle_timeout = idle_timeout
+        self.index = index
+        self.start_new_instance = start_new_instance
+        self.max_jobs = max_jobs
+        self.health_check_interval = 60
+        self.pool = pool
+
+        # Options of the running app, like "app_instance". None whenever the app is not running.
+        self.options = None
+        self.jobs_done = 0
+        self.pending_jobs = 0
+        self.last_start_failure = None
+        self._last_job_time = None
+
+        self._jobs = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def submit(self, function, *args, **kwargs):
+        # Calls function(session_options, *args, **kwargs) inside the worker thread
+        future = Future()
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target = self._worker,
+                                                name = "SolidWorksSession" if not self.index else "SolidWorksSession-{}".format(self.index),
+                                                daemon = True,
+                                                )
+                self._thread.start()
+            self.pending_jobs += 1
+            self._jobs.put((future, function, args, kwargs))
+        future.add_done_callback(self._onJobDone)
+        return future
+
+    def _onJobDone(self, future):
+        with self._thread_lock:
+            self.pending_jobs -= 1
+
+    def run(self, function, *args, **kwargs):
+        return self.submit(function, *args, **kwargs).result()
+
+    def shutdown(self, timeout = None):
+        with self._thread_lock:
+            thread = self._thread
+            if thread is None or not thread.is_alive():
+                return
+            self._jobs.put(None)
+        thread.join(timeout)
+
+    def isAppRunning(self):
+        return self.options is not None
+
+    def _worker(self):
+        if self.com_connector:
+            self.com_connector.CoInit()
+        try:
+            self._processJobs()
+        finally:
+            if self.com_connector:
+                self.com_connector.UnCoInit()
+
+    def _processJobs(self):
+        while True:
+            try:
+                # Only wait for the idle timeout, when there is something to close
+                timeout = self.idle_timeout if self.isAppRunning() else None
+                job = self._jobs.get(timeout = timeout)
+            except queue.Empty:
+                self.logger.log("d", "SolidWorks has been idle for {} seconds. Closing it..".format(self.idle_timeout))
+                self._closeApp()
+                continue
+
+            if job is None:
+                self._closeApp()
+                break
+
+            future, function, args, kwargs = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                self._checkAppHealth()
+                if not self.isAppRunning():
+                    self._startApp()
+                future.set_result(function(self.options, *args, **kwargs))
+            except BaseException as e:
+                if self.isAppRunning() and not self._isAppAlive():
+                    self.logger.log("w", "SolidWorks stopped responding. Starting a new instance with the next job..")
+                    self._dropApp()
+                future.set_exception(e)
+            self._last_job_time = time.monotonic()
+
+            if not self.isAppRunning():
+                continue
+            self.jobs_done += 1
+            if not self.idle_timeout:
+                self._closeApp()
+            elif self.max_jobs and self.jobs_done >= self.max_jobs:
+                self.logger.log("d", "SolidWorks has done {} jobs. Recycling it to free its memory..".format(self.jobs_done))
+                self._closeApp()
+
+    def _checkAppHealth(self):
+        if not self.isAppRunning() or self._last_job_time is None:
+            return
+        if time.monotonic() - self._last_job_time < self.health_check_interval:
+            return
+        if not self._isAppAlive():
+            self.logger.log("w", "SolidWorks stopped responding while being idle. Starting a new instance..")
+            self._dropApp()
+
+    def _startApp(self):
+        last_error = None
+        start_time = time.perf_counter()
+        for app_name in self.app_names:
+            options = {"app_name": app_name,
+                       "app_instance_index": self.index,
+                       "app_start_new_instance": self.start_new_instance,
+                       }
+            try:
+                self.reader.startApp(options)
+                if self.pool:
+                    self.pool.claimInstance(self, options)
+                self.reader.onSessionStarted(options)
+            except Exception as e:
+                self.logger.logException("e", "Failed to start <{}>!".format(app_name))
+                self._releaseApp(options)
+                last_error = e
+                continue
+            # Picked up by the first job, which can add it to its trace
+            options["app_start_span"] = (start_time, time.perf_counter())
+            self.options = options
+            self.jobs_done = 0
+            self.last_start_failure = None
+            return options
+        self.last_start_failure = time.monotonic()
+        raise RuntimeError("Could not start any of {}!".format(self.app_names)) from last_error
+
+    def _releaseApp(self, options):
+        # Leaves an app, which failed to start, the way it was found
+        if self.pool:
+            self.pool.releaseInstance(self)
+        if "app_instance" not in options.keys():
+            return
+        try:
+            if options.get("app_instance_shared", False):
+                # Belongs to another session, which keeps using it
+                self.reader.postCloseApp(options)
+                return
+            self.reader.closeApp(options)
+            if not options.get("app_was_active", True):
+                # SolidWorks API: ?
+                options["app_instance"].ExitApp()
+            self.reader.postCloseApp(options)
+        except:
+            self.logger.logException("w", "Closing <{}> after a failed start failed!".format(options["app_name"]))
+
+    def _isAppAlive(self):
+        if "app_instance" not in self.options.keys():
+            return True
+        try:
+            # SolidWorks API: ?
+            self.options["app_instance"].RevisionNumber
+            return True
+        except:
+            return False
+
+    def _dropApp(self):
+        if self.pool:
+            self.pool.releaseInstance(self)
+        try:
+            self.reader.postCloseApp(self.options)
+        except:
+            self.logger.logException("w", "Cleaning up after SolidWorks stopped responding failed!")
+        self.options = None
+
+    def _closeApp(self):
+        if not self.isAppRunning():
+            return
+        options = self.options
+        if self.pool:
+            self.pool.releaseInstance(self)
+        try:
+            self.reader.onSessionClosing(options)
+        except:
+            self.logger.logException("e", "Restoring the export settings of SolidWorks failed!")
+        try:
+            self.reader.closeApp(options)
+            if "app_instance" in options.keys():
+                if not options["app_was_active"] and not self.reader.getOpenDocuments(options):
+                    self.logger.log("d", "Looks like we opened SolidWorks and there are no open files. Let's close SolidWorks again!")
+                    # SolidWorks API: ?
+                    options["app_instance"].ExitApp()
+            self.reader.postCloseApp(options)
+        except:
+            self.logger.logException("e", "Closing SolidWorks failed!")
+        self.options = None
+
+class SolidWorksSessionPool():
+    """
+    Runs several instances of SolidWorks, so files can be converted in parallel
+
+    - Each instance is driven by its own SolidWorksSession, so each one lives in the apartment of its own worker thread.
+    - The sessions start with different versions of SolidWorks, when several versions are operational.
+      Otherwise the same version is started several times.
+    - Only the first session may attach to an instance, which is already running. The others start a new instance each.
+      Instances are told apart by their process ID. A session, which ends up with the instance of another session, tries the next version.
+    - Jobs are given to the session with the least pending jobs. Sessions, which failed to start recently, are skipped.
+    - With size = 1 the pool behaves exactly like a single session.
+    """
+
+    # Seconds a session is skipped after failing to start SolidWorks
+    start_failure_backoff = 60
+
+    def __init__(self, reader, app_names, size = 1, idle_timeout = 300, max_jobs = 0, com_connector = None, logger = None):
+        self.reader = reader
+        self.app_names = app_names
+        self.size = max(1, size)
+        self._claimed_process_ids = {} # session index -> process ID
+        self._claim_lock = threading.Lock()
+
+        self.sessions = []
+        for index in range(self.size):
+            # Rotating the versions, so the instances are spread over all operational versions
+            offset = index % len(app_names) if app_names else 0
+            self.sessions.append(SolidWorksSession(reader,
+                                                   app_names[offset:] + app_names[:offset],
+                                                   idle_timeout = idle_timeout,
+                                                   index = index,
+                                                   start_new_instance = index > 0,
+                                                   max_jobs = max_jobs,
+                                                   pool = self,
+                                                   com_connector = com_connector,
+                                                   logger = logger,
+                                                   ))
+
+    @property
+    def idle_timeout(self):
+        return self.sessions[0].idle_timeout
+
+    @idle_timeout.setter
+    def idle_timeout(self, idle_timeout):
+        for session in self.sessions:
+            session.idle_timeout = idle_timeout
+
+    @property
+    def max_jobs(self):
+        return self.sessions[0].max_jobs
+
+    @max_jobs.setter
+    def max_jobs(self, max_jobs):
+        for session in self.sessions:
+            session.max_jobs = max_jobs
+
+    def getNextSession(self):
+        now = time.monotonic()
+        available_sessions = [session for session in self.sessions
+                              if session.last_start_failure is None or now - session.last_start_failure > self.start_failure_backoff]
+        # The first session is always available as the last resort
+        available_sessions = available_sessions or self.sessions[:1]
+        # Running instances are preferred over starting new ones
+        return min(available_sessions, key = lambda session: (session.pending_jobs, not session.isAppRunning(), session.index))
+
+    def submit(self, function, *args, **kwargs):
+        return self.getNextSession().submit(function, *args, **kwargs)
+
+    def run(self, function, *args, **kwargs):
+        return self.submit(function, *args, **kwargs).result()
+
+    def shutdown(self, timeout = None):
+        for session in self.sessions:
+            session.shutdown(timeout)
+
+    def isAppRunning(self):
+        return any([session.isAppRunning() for session in self.sessions])
+
+    def claimInstance(self, session, options):
+        # Called by a session after starting SolidWorks. Fails, if another session drives the same instance already.
+        if "app_instance" not in options.keys():
+            return
+        # SolidWorks API: ?
+        process_id = options["app_instance"].GetProcessID
+        with self._claim_lock:
+            for index, claimed_process_id in self._claimed_process_ids.items():
+                if index != session.index and claimed_process_id == process_id:
+                    options["app_instance_shared"] = True
+                    raise RuntimeError("<{}> is driven by session {} already!".format(options["app_name"], index))
+            self._claimed_process_ids[session.index] = process_id
+        options["app_process_id"] = process_id
+
+    def releaseInstance(self, session):
+        with self._claim_lock:
+            self._claimed_process_ids.pop(session.index, None)
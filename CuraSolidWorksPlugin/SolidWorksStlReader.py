@@ -0,0 +1,89 @@
+# Copyright (c) 2018 Thomas Karl Pietrowski
+
+# Build-ins
+import os
+
+# 3rd-party
+import numpy
+
+# Layout of binary STL files: 80 bytes header, uint32 triangle count and 50 bytes per triangle
+stl_header_size = 80
+stl_data_offset = stl_header_size + 4
+stl_triangle_dtype = numpy.dtype([("normal", "<f4", (3, )),
+                                  ("vertices", "<f4", (3, 3)),
+                                  ("attribute", "<u2"),
+                                  ])
+
+# Mapping of Uranium's STLReader: (x, y, z) -> (x, z, -y)
+stl_mapping = numpy.array([[1, 0, 0, 0],
+                           [0, 0, 1, 0],
+                           [0, -1, 0, 0],
+                           [0, 0, 0, 1],
+                           ], dtype = numpy.float64)
+
+# Triangles processed at once. Bounds the memory used by temporary arrays.
+chunk_triangles = 1 << 20
+
+def getTriangleCount(file_path):
+    with open(file_path, "rb") as stl_file:
+        stl_file.seek(stl_header_size)
+        return int(numpy.frombuffer(stl_file.read(4), dtype = "<u4")[0])
+
+def isBinaryStl(file_path):
+    # ASCII files can start with "solid" as well as binary ones, but only binary ones have this exact size
+    file_size = os.path.getsize(file_path)
+    if file_size < stl_data_offset:
+        return False
+    return file_size == stl_data_offset + getTriangleCount(file_path) * stl_triangle_dtype.itemsize
+
+def iterTriangleChunks(file_path):
+    # Yields views of the memory-mapped file. Only the chunk being processed needs to be paged in, the file isn't read at once.
+    triangle_count = getTriangleCount(file_path)
+    if not triangle_count:
+        return
+    triangles = numpy.memmap(file_path,
+                             dtype = stl_triangle_dtype,
+                             mode = "r",
+                             offset = stl_data_offset,
+                             shape = (triangle_count, ),
+                             )
+    try:
+        for start in range(0, triangle_count, chunk_triangles):
+            yield start, triangles[start:start + chunk_triangles]
+    finally:
+        del triangles
+
+def calculateFaceNormals(vertices):
+    # Same as MeshBuilder.calculateNormals(fast = True): One normal per face, repeated for all three vertices
+    faces = vertices.reshape(-1, 3, 3)
+    normals = numpy.cross(faces[:, 1] - faces[:, 0], faces[:, 2] - faces[:, 0])
+    lengths = numpy.linalg.norm(normals, axis = 1)
+    lengths[lengths == 0] = 1
+    normals /= lengths[:, numpy.newaxis]
+    return numpy.repeat(normals, 3, axis = 0)
+
+def readBinaryStl(file_path):
+    """
+    Reads a binary STL file into vertices and normals
+
+    - The arrays are sized by the triangle count from the header and filled chunk by chunk.
+      They hold the whole mesh, since MeshData needs it. Only the file's content and the temporary arrays
+      of the mapping and the normals are limited to one chunk. So the peak memory is about the size of the result.
+    - Coordinates are mapped like Uranium's STLReader does: (x, y, z) -> (x, z, -y)
+    - The arrays are returned read-only.
+    """
+
+    triangle_count = getTriangleCount(file_path)
+    vertices = numpy.empty((triangle_count * 3, 3), dtype = numpy.float32)
+    normals = numpy.empty((triangle_count * 3, 3), dtype = numpy.float32)
+    for start, chunk in iterTriangleChunks(file_path):
+        chunk_vertices = vertices[start * 3:(start + len(chunk)) * 3]
+        points = chunk["vertices"].reshape(-1, 3)
+        chunk_vertices[:, 0] = points[:, 0]
+        chunk_vertices[:, 1] = points[:, 2]
+        numpy.negative(points[:, 1], out = chunk_vertices[:, 2])
+        normals[start * 3:(start + len(chunk)) * 3] = calculateFaceNormals(chunk_vertices)
+    # Read-only arrays are taken over by MeshData without another copy
+    vertices.flags.writeable = False
+    normals.flags.writeable = False
+    return vertices, normals
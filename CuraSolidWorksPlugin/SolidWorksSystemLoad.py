@@ -0,0 +1,64 @@
+# Copyright (c) 2018 Thomas Karl Pietrowski
+
+# Build-ins
+import ctypes
+import sys
+import time
+
+class _MEMORYSTATUSEX(ctypes.Structure):
+    _fields_ = [("dwLength", ctypes.c_ulong),
+                ("dwMemoryLoad", ctypes.c_ulong),
+                ("ullTotalPhys", ctypes.c_ulonglong),
+                ("ullAvailPhys", ctypes.c_ulonglong),
+                ("ullTotalPageFile", ctypes.c_ulonglong),
+                ("ullAvailPageFile", ctypes.c_ulonglong),
+                ("ullTotalVirtual", ctypes.c_ulonglong),
+                ("ullAvailVirtual", ctypes.c_ulonglong),
+                ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+                ]
+
+class _FILETIME(ctypes.Structure):
+    _fields_ = [("dwLowDateTime", ctypes.c_ulong),
+                ("dwHighDateTime", ctypes.c_ulong),
+                ]
+
+    def toInt(self):
+        return (self.dwHighDateTime << 32) + self.dwLowDateTime
+
+def getAvailableMemory():
+    # Available physical memory in bytes. None, if it can't be determined on this system.
+    if sys.platform != "win32":
+        return None
+    status = _MEMORYSTATUSEX()
+    status.dwLength = ctypes.sizeof(_MEMORYSTATUSEX)
+    if not ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+        return None
+    return status.ullAvailPhys
+
+def getSystemTimes():
+    # (idle, kernel, user) in 100ns. The kernel time includes the idle time.
+    if sys.platform != "win32":
+        return None
+    idle_time, kernel_time, user_time = _FILETIME(), _FILETIME(), _FILETIME()
+    if not ctypes.windll.kernel32.GetSystemTimes(ctypes.byref(idle_time), ctypes.byref(kernel_time), ctypes.byref(user_time)):
+        return None
+    return (idle_time.toInt(), kernel_time.toInt(), user_time.toInt())
+
+def calculateCpuLoad(previous_times, current_times):
+    # Share of the CPU time, which was not idle between both samples of getSystemTimes()
+    idle_time, kernel_time, user_time = [current - previous for previous, current in zip(previous_times, current_times)]
+    total_time = kernel_time + user_time
+    if total_time <= 0:
+        return 0.0
+    return max(0.0, min(1.0, (total_time - idle_time) / total_time))
+
+def getCpuLoad(interval = 0.5):
+    # CPU load between 0.0 and 1.0 over the given interval. None, if it can't be determined on this system.
+    previous_times = getSystemTimes()
+    if previous_times is None:
+        return None
+    time.sleep(interval)
+    current_times = getSystemTimes()
+    if current_times is None:
+        return None
+    return calculateCpuLoad(previous_times, current_times)
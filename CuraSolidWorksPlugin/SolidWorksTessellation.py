@@ -0,0 +1,43 @@
+# Copyright (c) 2018 Thomas Karl Pietrowski
+
+# Build-ins
+import math
+
+# Chordal deviation per mm of the model's diagonal and its limits in mm
+deviation_per_size = 1.0 / 2000.0
+deviation_minimum = 0.01
+deviation_maximum = 0.5
+
+# Angle tolerance in degrees at the deviation derived from the size and its limits
+angle_tolerance_default = 2.0
+angle_tolerance_minimum = 1.0
+angle_tolerance_maximum = 10.0
+
+def getAdaptiveTolerances(box_minimum, box_maximum, triangle_budget = None):
+    """
+    Derives swSTLDeviation and swSTLAngleTolerance from the size of the model
+
+    - The deviation grows with the diagonal of the bounding box, so small parts aren't over- and large ones under-tessellated.
+    - With a triangle budget the deviation is increased until the estimated triangle count fits:
+      Curved surfaces with radius r need edges of about sqrt(8 * r * deviation).
+      Taking a quarter of the diagonal as radius and the surface of the bounding box as upper limit of the area
+      gives about area / (4 * r * deviation) triangles.
+    - Returns (deviation in mm, angle tolerance in degrees)
+    """
+
+    size = [max(maximum - minimum, 0.0) for minimum, maximum in zip(box_minimum, box_maximum)]
+    diagonal = math.sqrt(sum([length**2 for length in size]))
+    if diagonal <= 0:
+        return deviation_minimum, angle_tolerance_default
+
+    size_deviation = min(max(diagonal * deviation_per_size, deviation_minimum), deviation_maximum)
+    deviation = size_deviation
+    if triangle_budget:
+        area = 2 * (size[0] * size[1] + size[1] * size[2] + size[2] * size[0])
+        radius = diagonal / 4
+        deviation = max(deviation, area / (4 * radius * triangle_budget))
+
+    # The angle tolerance scales like the edge length: with the square root of the deviation
+    angle_tolerance = angle_tolerance_default * math.sqrt(deviation / size_deviation)
+    angle_tolerance = min(max(angle_tolerance, angle_tolerance_minimum), angle_tolerance_maximum)
+    return deviation, angle_tolerance
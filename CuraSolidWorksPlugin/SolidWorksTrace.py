@@ -0,0 +1,92 @@
+# Copyright (c) 2018 Thomas Karl Pietrowski
+
+# Build-ins
+import contextlib
+import json
+import os
+import re
+import threading
+import time
+
+class SolidWorksTrace():
+    """
+    Records the time spent per phase of a conversion
+
+    - Spans are measured with the monotonic clock and stored as Chrome trace events ("X" events in microseconds).
+    - The thread is recorded per span, so the work of the session's worker thread shows up as its own track.
+    - export() writes a file, which can be opened by chrome://tracing or https://ui.perfetto.dev
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.events = []
+        self._origin = time.perf_counter()
+        self._thread_names = {}
+
+    def _toMicroseconds(self, timestamp):
+        return (timestamp - self._origin) * 1000000.0
+
+    def addSpan(self, name, category, start_time, end_time, thread = None, **args):
+        thread = thread or threading.current_thread()
+        self._thread_names[thread.ident] = thread.name
+        # list.append is atomic, so spans can be added from several threads
+        self.events.append({"name": name,
+                            "cat": category,
+                            "ph": "X",
+                            "ts": self._toMicroseconds(start_time),
+                            "dur": (end_time - start_time) * 1000000.0,
+                            "pid": os.getpid(),
+                            "tid": thread.ident,
+                            "args": args,
+                            })
+
+    @contextlib.contextmanager
+    def span(self, name, category = "phase", **args):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.addSpan(name, category, start_time, time.perf_counter(), **args)
+
+    def getDurations(self):
+        # Total time per span name in seconds
+        durations = {}
+        for event in self.events:
+            durations[event["name"]] = durations.get(event["name"], 0.0) + event["dur"] / 1000000.0
+        return durations
+
+    def getTraceEvents(self):
+        events = [{"name": "thread_name",
+                   "ph": "M",
+                   "pid": os.getpid(),
+                   "tid": thread_ident,
+                   "args": {"name": thread_name},
+                   } for thread_ident, thread_name in self._thread_names.items()]
+        return events + sorted(self.events, key = lambda event: event["ts"])
+
+    def export(self, directory):
+        os.makedirs(directory, exist_ok = True)
+        file_name = re.sub(r"[^\w\-.]", "_", os.path.basename(self.name))
+        file_path = os.path.join(directory, "{}_{}.json".format(time.strftime("%Y%m%d-%H%M%S"), file_name))
+        with open(file_path, "w") as trace_file:
+            json.dump({"traceEvents": self.getTraceEvents(),
+                       "displayTimeUnit": "ms",
+                       "otherData": {"file": self.name},
+                       }, trace_file)
+        return file_path
+
+class _DisabledSpan():
+    # Used whenever tracing is disabled. Entering it costs about as much as an empty with-statement.
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_disabled_span = _DisabledSpan()
+
+def traceSpan(options, name, category = "phase", **args):
+    trace = options.get("trace")
+    if trace is None:
+        return _disabled_span
+    return trace.span(name, category, **args)
@@ -80,6 +80,7 @@ UM.Dialog
                         append({ text: catalog.i18nc("@option:curaSolidworksStlQuality", "Fine (SolidWorks)"), code: 10 });
                         append({ text: catalog.i18nc("@option:curaSolidworksStlQuality", "Coarse (SolidWorks)"), code: 0 });
                         append({ text: catalog.i18nc("@option:curaSolidworksStlQuality", "Keep settings unchanged"), code: -1 });
+                        append({ text: catalog.i18nc("@option:curaSolidworksStlQuality", "Custom (adapted to the model size)"), code: -2 });
                     }
                 }
             }
@@ -35,21 +35,27 @@ def getMetaData():
 
     return metaData
 
+def _onInstallationChecksFinished(reader):
+    if not reader.isOperational():
+        no_valid_installation_message = Message(i18n_catalog.i18nc("@info:status",
+                                                                   "Dear customer,\nWe could not find a valid installation of 3DS SolidWorks on your system. That means that either 3DS SolidWorks is not installed or you don't own an valid license. Please make sure that running 3DS SolidWorks itself works without issues and/or contact your ICT.\n\nWith kind regards\n - Thomas Karl Pietrowski"
+                                                                   ),
+                                                0)
+        no_valid_installation_message.setTitle("SolidWorks plugin")
+        no_valid_installation_message.show()
+
 def register(app):
     plugin_data = {}
     if Platform.isWindows():
+        # The reader is registered right away. Whether an installation is operational is checked in the background,
+        # so the startup of Cura is not blocked by starting SolidWorks. Reading files waits for the checks to finish.
         reader = SolidWorksReader.SolidWorksReader()
-        if reader.isOperational():
-            plugin_data["mesh_reader"] = reader
-        else:
-            no_valid_installation_message = Message(i18n_catalog.i18nc("@info:status",
-                                                                       "Dear customer,\nWe could not find a valid installation of 3DS SolidWorks on your system. That means that either 3DS SolidWorks is not installed or you don't own an valid license. Please make sure that running 3DS SolidWorks itself works without issues and/or contact your ICT.\n\nWith kind regards\n - Thomas Karl Pietrowski"
-                                                                       ),
-                                                    0)
-            no_valid_installation_message.setTitle("SolidWorks plugin")
-            no_valid_installation_message.show()
+        reader.installationChecksFinished.connect(_onInstallationChecksFinished)
+        plugin_data["mesh_reader"] = reader
 
         plugin_data["extension"] = SolidWorksDialogHandler.SolidWorksDialogHandler(reader)
+
+        reader.startInstallationChecks()
     else:
         not_correct_os_message = Message(i18n_catalog.i18nc("@info:status",
                                                             "Dear customer,\nYou are currently running this plugin on an operating system other than Windows. This plugin will only work on Windows with 3DS SolidWorks installed, including an valid license. Please install this plugin on a Windows machine with 3DS SolidWorks installed.\n\nWith kind regards\n - Thomas Karl Pietrowski"
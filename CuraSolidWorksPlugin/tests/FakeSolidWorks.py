@@ -0,0 +1,532 @@
+'''
+Created on 18.10.2018
+
+@author: Thomas Pietrowski
+
+Scriptable stand-in for SldWorks.Application
+
+- Implements the members used by SolidWorksReader, so it can be driven without SolidWorks.
+- Every member can be delayed to emulate the latency of COM calls: latency = {"SaveAs": 0.5, ...}
+- Calls are counted per member in FakeSldWorksApplication.calls
+- With a FakeComConnector every call fails outside of a COM apartment, like it does on Windows.
+- After setting crashed = True every call fails, like calls to a SolidWorks, which stopped responding.
+- SaveAs writes spheres as binary STL or 3MF files. Other formats are written empty.
+- Documents are scripted by their path:
+    app.addPart("C:\\part.SLDPRT", triangles = 10000)
+    app.addPart("C:\\part.SLDPRT", triangles = 10000, tessellated = False) # Saved without tessellation data
+    app.addAssembly("C:\\assembly.SLDASM", [("C:\\part.SLDPRT", "Default", array_data), ])
+    app.addDrawing("C:\\drawing.SLDDRW", ["C:\\part.SLDPRT", ])
+- Assemblies are opened lightweight, if requested. Lightweight parts without tessellation data are missing in exports until resolved.
+'''
+
+import collections
+import math
+import ntpath
+import os
+import sys
+import threading
+import time
+import zipfile
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.split(__file__)[0], ".."))
+from SolidWorksStlReader import stl_header_size, stl_triangle_dtype # @UnresolvedImport
+
+# swDocumentTypes_e
+swDocPART = 1
+swDocASSEMBLY = 2
+swDocDRAWING = 3
+
+# swComponentSuppressionState_e
+swComponentFullyResolved = 2
+swComponentFullyLightweight = 4
+
+# Identity of MathTransform.ArrayData: rotation, translation, scale and 3 unused values
+identity_array_data = (1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0)
+
+def getSphereFaces(triangles):
+    # Tessellated sphere with about the given number of triangles. Neighboring faces share their vertices.
+    rings = max(2, int(math.sqrt(max(triangles, 8) / 4)))
+    theta, phi = numpy.meshgrid(numpy.linspace(0, numpy.pi, rings + 1),
+                                numpy.linspace(0, 2 * numpy.pi, 2 * rings + 1),
+                                indexing = "ij",
+                                )
+    points = numpy.stack([numpy.sin(theta) * numpy.cos(phi),
+                          numpy.sin(theta) * numpy.sin(phi),
+                          numpy.cos(theta),
+                          ], axis = -1) * 50.0
+    a, b = points[:-1, :-1], points[1:, :-1]
+    c, d = points[1:, 1:], points[:-1, 1:]
+    return numpy.concatenate([numpy.stack([a, b, c], axis = -2).reshape(-1, 3, 3),
+                              numpy.stack([a, c, d], axis = -2).reshape(-1, 3, 3),
+                              ])
+
+def writeSyntheticStl(file_path, triangles):
+    # Writes a sphere as binary STL. Returns the number of triangles.
+    faces = getSphereFaces(triangles)
+    data = numpy.zeros(len(faces), dtype = stl_triangle_dtype)
+    data["vertices"] = faces
+    with open(file_path, "wb") as stl_file:
+        stl_file.write(b"\0" * stl_header_size)
+        stl_file.write(numpy.array([len(data)], dtype = "<u4").tobytes())
+        data.tofile(stl_file)
+    return len(data)
+
+def writeSynthetic3mf(file_path, triangles):
+    # Writes a sphere as 3MF file with a single build item. Returns the number of triangles.
+    faces = getSphereFaces(triangles)
+    vertices = "".join(['<vertex x="{:.6f}" y="{:.6f}" z="{:.6f}"/>'.format(*vertex) for vertex in faces.reshape(-1, 3)])
+    indices = "".join(['<triangle v1="{}" v2="{}" v3="{}"/>'.format(index * 3, index * 3 + 1, index * 3 + 2) for index in range(len(faces))])
+    model = ('<?xml version="1.0" encoding="UTF-8"?>'
+             '<model unit="millimeter" xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">'
+             '<resources><object id="1" type="model"><mesh><vertices>{}</vertices><triangles>{}</triangles></mesh></object></resources>'
+             '<build><item objectid="1"/></build>'
+             '</model>').format(vertices, indices)
+    with zipfile.ZipFile(file_path, "w") as archive:
+        archive.writestr("3D/3dmodel.model", model)
+    return len(faces)
+
+class FakeComConnector():
+    """
+    Stand-in for ComConnector of CadIntegrationUtils
+
+    - Keeps track of the threads, which entered a COM apartment by CoInit().
+    """
+
+    def __init__(self):
+        self.apartments = collections.Counter() # thread ident -> CoInit calls, which weren't followed by UnCoInit
+        self.threads = set() # Idents of all threads, which entered an apartment
+        self._lock = threading.Lock()
+
+    def CoInit(self):
+        with self._lock:
+            self.apartments[threading.get_ident()] += 1
+            self.threads.add(threading.get_ident())
+
+    def UnCoInit(self):
+        with self._lock:
+            self.apartments[threading.get_ident()] -= 1
+            if not self.apartments[threading.get_ident()]:
+                del self.apartments[threading.get_ident()]
+
+    def isInApartment(self):
+        with self._lock:
+            return self.apartments[threading.get_ident()] > 0
+
+    def GetComObject(self, value):
+        return value
+
+    def getByVarInt(self):
+        return None
+
+class _FakeComObject():
+    def __init__(self, app):
+        self._app = app
+
+    def _call(self, name):
+        self._app._call(name)
+
+class FakeFrame(_FakeComObject):
+    def __init__(self, app):
+        super().__init__(app)
+        self.KeepInvisible = False
+
+class FakeDocumentSpecification():
+    def __init__(self, file_name):
+        self.FileName = file_name
+        self.DocumentType = None
+        self.LightWeight = False
+        self.Silent = False
+        self.ReadOnly = False
+        self.Warning = 0
+        self.Error = 0
+
+class FakeMathTransform():
+    def __init__(self, array_data):
+        self.ArrayData = tuple(array_data)
+
+class FakeFeatureManager(_FakeComObject):
+    def __init__(self, app):
+        super().__init__(app)
+        self.EnableFeatureTree = True
+
+class FakeModelView(_FakeComObject):
+    def __init__(self, app):
+        super().__init__(app)
+        self.EnableGraphicsUpdate = True
+
+class FakeComponent(_FakeComObject):
+    def __init__(self, app, path, configuration, array_data, children = (), suppressed = False, hidden = False, assembly = None):
+        super().__init__(app)
+        self._path = path
+        self._assembly = assembly # The FakeModelDoc, which keeps the suppression state
+        self._children = list(children)
+        self._suppressed = suppressed
+        self._hidden = hidden
+        self.ReferencedConfiguration = configuration
+        self.Transform2 = FakeMathTransform(array_data)
+
+    @property
+    def GetChildren(self):
+        self._call("Component2.GetChildren")
+        return tuple(self._children)
+
+    @property
+    def GetPathName(self):
+        self._call("Component2.GetPathName")
+        return self._path
+
+    @property
+    def IsSuppressed(self):
+        self._call("Component2.IsSuppressed")
+        return self._suppressed
+
+    def IsHidden(self, consider_suppressed):
+        self._call("Component2.IsHidden")
+        return self._hidden
+
+    @property
+    def GetModelDoc2(self):
+        self._call("Component2.GetModelDoc2")
+        return self._app._getDocument(self._path)
+
+    @property
+    def GetSuppression2(self):
+        self._call("Component2.GetSuppression2")
+        if self._app.no_suppression_state:
+            raise AttributeError("GetSuppression2")
+        if self._assembly is not None and self._assembly._isLightweight(self._path):
+            return swComponentFullyLightweight
+        return swComponentFullyResolved
+
+    @property
+    def GetTessTriangleCount(self):
+        self._call("Component2.GetTessTriangleCount")
+        if self._assembly is not None:
+            return self._assembly._getComponentTriangleCount(self._path)
+        return self._app._getScript(self._path).get("triangles", self._app.default_triangles)
+
+    def SetSuppression2(self, state):
+        self._call("Component2.SetSuppression2")
+        if self._assembly is not None and state == swComponentFullyResolved:
+            self._assembly._resolved_paths.add(ntpath.normpath(self._path).lower())
+        return True
+
+class FakeConfiguration(_FakeComObject):
+    def __init__(self, app, root_component, name):
+        super().__init__(app)
+        self._root_component = root_component
+        self._name = name
+
+    @property
+    def Name(self):
+        self._call("Configuration.Name")
+        return self._name
+
+    def GetRootComponent3(self, resolve):
+        self._call("Configuration.GetRootComponent3")
+        return self._root_component
+
+class FakeView(_FakeComObject):
+    def __init__(self, app, referenced_model_name, next_view):
+        super().__init__(app)
+        self._referenced_model_name = referenced_model_name
+        self._next_view = next_view
+
+    @property
+    def GetReferencedModelName(self):
+        self._call("View.GetReferencedModelName")
+        return self._referenced_model_name
+
+    @property
+    def GetNextView(self):
+        self._call("View.GetNextView")
+        return self._next_view
+
+class FakeModelDoc(_FakeComObject):
+    def __init__(self, app, path, document_type, script):
+        super().__init__(app)
+        self._path = path
+        self._document_type = document_type
+        self._script = script
+        self._configuration = script.get("configuration", "Default") # Active configuration, as the document has been saved
+        self._lightweight = False
+        self._resolved_paths = set()
+        self.FeatureManager = FakeFeatureManager(app)
+        self.ActiveView = FakeModelView(app)
+
+    @property
+    def GetTitle(self):
+        self._call("ModelDoc2.GetTitle")
+        return ntpath.basename(self._path)
+
+    @property
+    def GetPathName(self):
+        self._call("ModelDoc2.GetPathName")
+        return self._path
+
+    @property
+    def GetNext(self):
+        self._call("ModelDoc2.GetNext")
+        documents = self._app._open_documents
+        index = documents.index(self)
+        if index + 1 < len(documents):
+            return documents[index + 1]
+        return None
+
+    def ShowConfiguration2(self, configuration):
+        self._call("ModelDoc2.ShowConfiguration2")
+        self._configuration = configuration
+        self._app.shown_configurations.append((self._path, configuration))
+        return True
+
+    @property
+    def GetActiveConfiguration(self):
+        self._call("ModelDoc2.GetActiveConfiguration")
+        children = []
+        for path, configuration, array_data in self._script.get("components", ()):
+            children.append(FakeComponent(self._app, path, configuration, array_data))
+        return FakeConfiguration(self._app, FakeComponent(self._app, self._path, self._configuration, identity_array_data, children), self._configuration)
+
+    def GetComponents(self, top_level_only):
+        self._call("AssemblyDoc.GetComponents")
+        return tuple([FakeComponent(self._app, path, configuration, array_data, assembly = self)
+                      for path, configuration, array_data in self._script.get("components", ())])
+
+    def ResolveAllLightWeightComponents(self, warn_user):
+        self._call("AssemblyDoc.ResolveAllLightWeightComponents")
+        self._lightweight = False
+        return 0
+
+    @property
+    def GetFirstView(self):
+        self._call("ModelDoc2.GetFirstView")
+        # The first view of a drawing is its sheet, which doesn't reference any model
+        view = None
+        for referenced_model_name in reversed(self._script.get("views", ())):
+            view = FakeView(self._app, referenced_model_name, view)
+        return FakeView(self._app, "", view)
+
+    @property
+    def GetType(self):
+        self._call("ModelDoc2.GetType")
+        return self._document_type
+
+    def GetPartBox(self, precise):
+        self._call("PartDoc.GetPartBox")
+        return self._app.box
+
+    def GetBox(self, options):
+        self._call("AssemblyDoc.GetBox")
+        return self._app.box
+
+    def _isLightweight(self, path):
+        return self._lightweight and ntpath.normpath(path).lower() not in self._resolved_paths
+
+    def _getComponentTriangleCount(self, path):
+        script = self._app._getScript(path)
+        if self._isLightweight(path) and not script.get("tessellated", True):
+            return 0
+        return script.get("triangles", self._app.default_triangles)
+
+    def _getTriangleCount(self):
+        if self._document_type == swDocASSEMBLY:
+            return sum([self._getComponentTriangleCount(path) for path, _, _ in self._script.get("components", ())])
+        return self._script.get("triangles", self._app.default_triangles)
+
+    def SaveAs(self, file_path):
+        self._call("ModelDoc2.SaveAs")
+        self._app.saved_with_updates.append(self.FeatureManager.EnableFeatureTree or self.ActiveView.EnableGraphicsUpdate)
+        if self._app.fail_save_as:
+            return False
+        if os.path.splitext(file_path)[1].lower() == ".stl":
+            writeSyntheticStl(file_path, self._getTriangleCount())
+        elif os.path.splitext(file_path)[1].lower() == ".3mf" and not self._app.broken_3mf:
+            writeSynthetic3mf(file_path, self._getTriangleCount())
+        else:
+            with open(file_path, "wb"):
+                pass
+        self._app.saved_files.append(file_path)
+        return True
+
+class FakeSldWorksApplication():
+    """
+    Fake of ISldWorks
+    """
+
+    extensions = {".SLDPRT": swDocPART,
+                  ".SLDASM": swDocASSEMBLY,
+                  ".SLDDRW": swDocDRAWING,
+                  }
+
+    def __init__(self, revision = "26.0.0", latency = None, default_latency = 0.0, default_triangles = 10000, com_connector = None):
+        self.com_connector = com_connector
+        self.crashed = False
+        self.latency = dict(latency or {})
+        self.default_latency = default_latency
+        self.default_triangles = default_triangles
+        self.revision = revision
+        self.calls = collections.Counter()
+        self.fail_save_as = False
+        self.broken_3mf = False # 3MF files are written empty, like some versions do for certain models
+        self.no_suppression_state = False # GetSuppression2 fails, like on versions, which don't know it
+        self.box = (-0.05, -0.05, -0.05, 0.05, 0.05, 0.05) # in m, like the synthetic STLs
+        self.exited = False
+        self.saved_files = []
+        self.saved_with_updates = [] # Whether the feature tree or the graphics were updated during each SaveAs
+        self.shown_configurations = [] # (path, configuration) of each ShowConfiguration2
+
+        self.CommandInProgress = False
+        self.UserControl = True
+        self.Visible = True
+        self.Frame = FakeFrame(self)
+
+        self.preferences = {"toggle": collections.defaultdict(bool),
+                            "integer": collections.defaultdict(int),
+                            "double": collections.defaultdict(float),
+                            }
+        self._scripts = {}
+        self._open_documents = []
+        self._active_document = None
+
+    def _call(self, name):
+        if self.com_connector and not self.com_connector.isInApartment():
+            raise OSError("CoInitialize has not been called.")
+        if self.crashed:
+            raise OSError("The RPC server is unavailable.")
+        self.calls[name] += 1
+        delay = self.latency.get(name, self.default_latency)
+        if delay:
+            time.sleep(delay)
+
+    # Scripting
+
+    def _getScript(self, path):
+        return self._scripts.get(ntpath.normpath(path).lower(), {})
+
+    def addPart(self, path, triangles = None, tessellated = True, configuration = "Default"):
+        self._scripts[ntpath.normpath(path).lower()] = {"triangles": triangles or self.default_triangles,
+                                                        "tessellated": tessellated,
+                                                        "configuration": configuration,
+                                                        }
+
+    def addAssembly(self, path, components):
+        self._scripts[ntpath.normpath(path).lower()] = {"components": list(components)}
+
+    def addDrawing(self, path, referenced_paths):
+        self._scripts[ntpath.normpath(path).lower()] = {"views": list(referenced_paths)}
+
+    def _getDocument(self, path):
+        for document in self._open_documents:
+            if ntpath.normpath(document._path).lower() == ntpath.normpath(path).lower():
+                return document
+        document_type = self.extensions.get(ntpath.splitext(path)[1].upper(), swDocPART)
+        document = FakeModelDoc(self, path, document_type, self._getScript(path))
+        self._open_documents.append(document)
+        return document
+
+    # ISldWorks
+
+    @property
+    def RevisionNumber(self):
+        self._call("RevisionNumber")
+        return self.revision
+
+    @property
+    def GetProcessID(self):
+        self._call("GetProcessID")
+        return id(self)
+
+    @property
+    def ActiveDoc(self):
+        self._call("ActiveDoc")
+        return self._active_document
+
+    @property
+    def GetFirstDocument(self):
+        self._call("GetFirstDocument")
+        if self._open_documents:
+            return self._open_documents[0]
+        return None
+
+    def GetOpenDocumentByName(self, name):
+        self._call("GetOpenDocumentByName")
+        for document in self._open_documents:
+            if ntpath.normpath(name).lower() in (ntpath.normpath(document._path).lower(), ntpath.basename(document._path).lower()):
+                return document
+        return None
+
+    def GetOpenDocSpec(self, file_name):
+        self._call("GetOpenDocSpec")
+        return FakeDocumentSpecification(file_name)
+
+    def OpenDoc7(self, specification):
+        self._call("OpenDoc7")
+        open_documents = list(self._open_documents)
+        document = self._getDocument(specification.FileName)
+        if document not in open_documents:
+            document._lightweight = specification.LightWeight and document._document_type == swDocASSEMBLY
+        self._active_document = document
+        return document
+
+    def ActivateDoc3(self, title, use_user_preferences, option, errors):
+        self._call("ActivateDoc3")
+        for document in self._open_documents:
+            if ntpath.basename(document._path) == title:
+                self._active_document = document
+                return document
+        return None
+
+    def CloseDoc(self, title):
+        self._call("CloseDoc")
+        for document in list(self._open_documents):
+            if ntpath.basename(document._path) == title:
+                self._open_documents.remove(document)
+                if self._active_document is document:
+                    self._active_document = self._open_documents[-1] if self._open_documents else None
+
+    @property
+    def GetDocumentCount(self):
+        self._call("GetDocumentCount")
+        return len(self._open_documents)
+
+    def GetDocumentDependencies2(self, file_name, traverse_flag, search_flag, add_read_only_info):
+        self._call("GetDocumentDependencies2")
+        dependencies = []
+        for path, _, _ in self._getScript(file_name).get("components", ()):
+            dependencies.extend([ntpath.basename(path), path])
+        for path in self._getScript(file_name).get("views", ()):
+            dependencies.extend([ntpath.basename(path), path])
+        return tuple(dependencies) or None
+
+    def ExitApp(self):
+        self._call("ExitApp")
+        self.exited = True
+
+    def GetUserPreferenceToggle(self, enum):
+        self._call("GetUserPreferenceToggle")
+        return self.preferences["toggle"][enum]
+
+    def SetUserPreferenceToggle(self, enum, value):
+        self._call("SetUserPreferenceToggle")
+        self.preferences["toggle"][enum] = bool(value)
+        return True
+
+    def GetUserPreferenceIntegerValue(self, enum):
+        self._call("GetUserPreferenceIntegerValue")
+        return self.preferences["integer"][enum]
+
+    def SetUserPreferenceIntegerValue(self, enum, value):
+        self._call("SetUserPreferenceIntegerValue")
+        self.preferences["integer"][enum] = int(value)
+        return True
+
+    def GetUserPreferenceDoubleValue(self, enum):
+        self._call("GetUserPreferenceDoubleValue")
+        return self.preferences["double"][enum]
+
+    def SetUserPreferenceDoubleValue(self, enum, value):
+        self._call("SetUserPreferenceDoubleValue")
+        self.preferences["double"][enum] = float(value)
+        return True
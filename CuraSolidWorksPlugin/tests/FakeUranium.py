@@ -0,0 +1,537 @@
+'''
+Created on 18.10.2018
+
+@author: Thomas Pietrowski
+
+Stand-ins for Uranium, Cura, PyQt5 and CadIntegrationUtils
+
+- Implements the members used by SolidWorksReader, so the reader can be driven by the tests without Cura.
+- importReader() registers the modules and imports the plugin as a package, like Cura does.
+- createReader() returns a new reader with its own preferences and storage directory.
+  SolidWorks is started through ComConnector, which creates a FakeSldWorksApplication per start:
+    apps = FakeApps()
+    apps.addPart("C:\\part.SLDPRT", triangles = 10000) # Scripted for all apps
+    reader = createReader(directory, apps, registry_keys = {...})
+- MeshData keeps its arrays read-only and copies writeable ones, like Uranium does.
+- Shown messages are collected in Message.shown.
+'''
+
+import enum
+import functools
+import logging
+import os
+import re
+import sys
+import types
+
+import numpy
+
+tests_directory = os.path.split(os.path.abspath(__file__))[0]
+plugin_directory = os.path.split(tests_directory)[0]
+sys.path.insert(0, tests_directory)
+import FakeSolidWorks # @UnresolvedImport
+
+# Signals
+
+class Signal():
+    def __init__(self, *args, **kwargs):
+        self._callbacks = []
+
+    def connect(self, callback):
+        self._callbacks.append(callback)
+
+    def disconnect(self, callback):
+        self._callbacks.remove(callback)
+
+    def emit(self, *args, **kwargs):
+        for callback in list(self._callbacks):
+            callback(*args, **kwargs)
+
+class pyqtSignal():
+    # Each instance gets a Signal of its own, like bound signals of Qt
+    def __init__(self, *types):
+        self._attribute = None
+
+    def __set_name__(self, owner, name):
+        self._attribute = "_signal_{}".format(name)
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return instance.__dict__.setdefault(self._attribute, Signal())
+
+def pyqtProperty(*args, **kwargs):
+    return property
+
+def pyqtSlot(*args, **kwargs):
+    return lambda function: function
+
+class QObject():
+    def __init__(self, parent = None):
+        self._parent = parent
+
+class QUrl():
+    @staticmethod
+    def fromLocalFile(path):
+        return path
+
+class QQmlComponent():
+    def __init__(self, *args):
+        pass
+
+class QQmlContext():
+    def __init__(self, *args):
+        pass
+
+# Uranium
+
+@functools.total_ordering
+class Version():
+    def __init__(self, version):
+        self._parts = tuple([int(part) for part in re.findall(r"\d+", str(version))])
+
+    def __eq__(self, other):
+        return self._parts == other._parts
+
+    def __lt__(self, other):
+        return self._parts < other._parts
+
+class Preferences():
+    def __init__(self):
+        self._values = {}
+
+    def addPreference(self, key, default_value):
+        self._values.setdefault(key, default_value)
+
+    def getValue(self, key):
+        return self._values.get(key)
+
+    def setValue(self, key, value):
+        self._values[key] = value
+
+class MeshFileHandler():
+    def getReaderForFile(self, file_name):
+        return None
+
+class Application():
+    _instance = None
+
+    def __init__(self):
+        self._preferences = Preferences()
+        self._mesh_file_handler = MeshFileHandler()
+        self.applicationShuttingDown = Signal()
+
+    @classmethod
+    def getInstance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def getVersion(self):
+        return "4.0.0"
+
+    def getPreferences(self):
+        return self._preferences
+
+    def getMeshFileHandler(self):
+        return self._mesh_file_handler
+
+class i18nCatalog():
+    def __init__(self, name):
+        self._name = name
+
+    def i18n(self, text, *args):
+        return text
+
+    def i18nc(self, context, text, *args):
+        return text
+
+class Logger():
+    _logger = logging.getLogger("UM")
+
+    @classmethod
+    def log(cls, log_type, message, *args):
+        cls._logger.debug(message, *args)
+
+    @classmethod
+    def logException(cls, log_type, message, *args):
+        cls._logger.debug(message, *args, exc_info = True)
+
+class Message():
+    shown = []
+
+    def __init__(self, text = "", lifetime = 30, *args, **kwargs):
+        self.text = text
+        self.title = None
+
+    def setTitle(self, title):
+        self.title = title
+
+    def show(self):
+        Message.shown.append(self)
+
+class Matrix():
+    def __init__(self, data = None):
+        self._data = numpy.identity(4, dtype = numpy.float64) if data is None else numpy.array(data, dtype = numpy.float64)
+
+    def getData(self):
+        return self._data
+
+def immutableNDArray(data):
+    # NumPyUtil.immutableNDArray: Read-only arrays are taken over, writeable ones copied
+    if data is None or not data.flags.writeable:
+        return data
+    data = numpy.array(data)
+    data.flags.writeable = False
+    return data
+
+_reuse = object()
+
+class MeshData():
+    def __init__(self, vertices = None, normals = None, indices = None, file_name = None, **kwargs):
+        self._vertices = immutableNDArray(vertices)
+        self._normals = immutableNDArray(normals)
+        self._indices = immutableNDArray(indices)
+        self._file_name = file_name
+
+    def set(self, vertices = _reuse, normals = _reuse, indices = _reuse, file_name = _reuse, **kwargs):
+        return MeshData(vertices = self._vertices if vertices is _reuse else vertices,
+                        normals = self._normals if normals is _reuse else normals,
+                        indices = self._indices if indices is _reuse else indices,
+                        file_name = self._file_name if file_name is _reuse else file_name,
+                        )
+
+    def getVertices(self):
+        return self._vertices
+
+    def getNormals(self):
+        return self._normals
+
+    def getIndices(self):
+        return self._indices
+
+    def hasIndices(self):
+        return self._indices is not None
+
+    def getVertexCount(self):
+        return 0 if self._vertices is None else len(self._vertices)
+
+    def getFaceCount(self):
+        return len(self._indices) if self._indices is not None else self.getVertexCount() // 3
+
+    def getFileName(self):
+        return self._file_name
+
+class MeshReader():
+    class PreReadResult(enum.Enum):
+        accepted = 1
+        cancelled = 2
+        failed = 3
+
+    def __init__(self):
+        self._supported_extensions = []
+
+    def preRead(self, file_name, *args, **kwargs):
+        return MeshReader.PreReadResult.accepted
+
+class MimeType():
+    def __init__(self, name, comment, suffixes):
+        self.name = name
+        self.comment = comment
+        self.suffixes = suffixes
+
+class MimeTypeDatabase():
+    mime_types = []
+
+    @classmethod
+    def addMimeType(cls, mime_type):
+        cls.mime_types.append(mime_type)
+
+class PluginRegistry():
+    _instance = None
+
+    @classmethod
+    def getInstance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def getPluginPath(self, plugin_id):
+        return plugin_directory
+
+class Resources():
+    storage_path = None
+
+    @classmethod
+    def getCacheStoragePath(cls):
+        return os.path.join(cls.storage_path, "cache")
+
+    @classmethod
+    def getDataStoragePath(cls):
+        return os.path.join(cls.storage_path, "data")
+
+class Platform():
+    @staticmethod
+    def isWindows():
+        return False
+
+class Extension():
+    def addMenuItem(self, name, function):
+        pass
+
+class GroupDecorator():
+    pass
+
+# Cura
+
+class CuraSceneNode():
+    def __init__(self, parent = None):
+        self._parent = None
+        self._children = []
+        self._decorators = []
+        self._mesh_data = None
+        self._name = ""
+        self._selectable = False
+        self._transformation = numpy.identity(4, dtype = numpy.float64)
+        if parent is not None:
+            parent.addChild(self)
+
+    def setMeshData(self, mesh_data):
+        self._mesh_data = mesh_data
+
+    def getMeshData(self):
+        return self._mesh_data
+
+    def setName(self, name):
+        self._name = name
+
+    def getName(self):
+        return self._name
+
+    def setSelectable(self, selectable):
+        self._selectable = selectable
+
+    def isSelectable(self):
+        return self._selectable
+
+    def addDecorator(self, decorator):
+        self._decorators.append(decorator)
+
+    def getDecorators(self):
+        return list(self._decorators)
+
+    def addChild(self, scene_node):
+        scene_node._parent = self
+        self._children.append(scene_node)
+
+    def getChildren(self):
+        return self._children
+
+    def hasChildren(self):
+        return bool(self._children)
+
+    def getParent(self):
+        return self._parent
+
+    def setTransformation(self, transformation):
+        self._transformation = numpy.array(transformation.getData(), dtype = numpy.float64)
+
+    def getLocalTransformation(self):
+        return Matrix(self._transformation.copy())
+
+    def getWorldTransformation(self):
+        if self._parent is None:
+            return self.getLocalTransformation()
+        return Matrix(self._parent.getWorldTransformation().getData().dot(self._transformation))
+
+# CadIntegrationUtils
+
+class FakeApps():
+    """
+    Starts a FakeSldWorksApplication for each call of ComConnector.CreateClassObject()
+
+    - The major revision is taken from the service name: "SldWorks.Application.26" starts revision 26.
+    - Documents are scripted once for all apps.
+    - The next failing_starts starts fail, like SolidWorks, which doesn't start.
+    - Starts wait for start_gate to be set, if it's an Event. So tests can look at what happens meanwhile.
+    """
+
+    def __init__(self, default_revision = 26, default_triangles = 1000):
+        self.default_revision = default_revision
+        self.default_triangles = default_triangles
+        self.com_connector = FakeSolidWorks.FakeComConnector()
+        self.created = [] # Apps in the order they were started
+        self.failing_starts = 0
+        self.start_gate = None
+        self._script_app = FakeSolidWorks.FakeSldWorksApplication(default_triangles = default_triangles)
+
+    def addPart(self, *args, **kwargs):
+        self._script_app.addPart(*args, **kwargs)
+
+    def addAssembly(self, *args, **kwargs):
+        self._script_app.addAssembly(*args, **kwargs)
+
+    def addDrawing(self, *args, **kwargs):
+        self._script_app.addDrawing(*args, **kwargs)
+
+    def createApp(self, app_name):
+        if not self.com_connector.isInApartment():
+            raise OSError("CoInitialize has not been called.")
+        if self.start_gate is not None:
+            self.start_gate.wait()
+        if self.failing_starts:
+            self.failing_starts -= 1
+            raise OSError("Server execution failed")
+        revision = app_name.rsplit(".", 1)[-1]
+        revision = int(revision) if revision.isdigit() else self.default_revision
+        app = FakeSolidWorks.FakeSldWorksApplication(revision = "{}.0.0".format(revision),
+                                                     default_triangles = self.default_triangles,
+                                                     com_connector = self.com_connector,
+                                                     )
+        app._scripts = self._script_app._scripts
+        self.created.append(app)
+        return app
+
+class ComConnector():
+    # Set by createReader()
+    apps = None
+
+    @classmethod
+    def CoInit(cls):
+        cls.apps.com_connector.CoInit()
+
+    @classmethod
+    def UnCoInit(cls):
+        cls.apps.com_connector.UnCoInit()
+
+    @classmethod
+    def CreateClassObject(cls, app_name):
+        return cls.apps.createApp(app_name)
+
+    @classmethod
+    def GetComObject(cls, value):
+        return value
+
+    @classmethod
+    def getByVarInt(cls):
+        return None
+
+class CommonCOMReader(MeshReader):
+    def __init__(self, app_friendly_name, app_name):
+        super().__init__()
+        self._app_friendly_name = app_friendly_name
+        self._default_app_name = app_name
+
+    @property
+    def _app_names(self):
+        return [self._default_app_name, ]
+
+    def startApp(self, options):
+        options["app_instance"] = ComConnector.CreateClassObject(options["app_name"])
+        options["app_was_active"] = False
+        return options
+
+    def postCloseApp(self, options):
+        pass
+
+    def nodePostProcessing(self, options, scene_nodes):
+        return scene_nodes
+
+def convertDosPathIntoLongPath(path):
+    return path
+
+# winreg, which is only available on Windows. The tests look up SolidWorks in a MemoryRegistryBackend instead.
+
+def _raiseFileNotFoundError(*args):
+    raise FileNotFoundError("The system cannot find the file specified")
+
+# Modules
+
+def _addModule(name, **members):
+    module = sys.modules.get(name)
+    if module is None:
+        module = types.ModuleType(name)
+        sys.modules[name] = module
+    module.__dict__.update(members)
+    if "." in name:
+        parent_name, child_name = name.rsplit(".", 1)
+        setattr(_addModule(parent_name), child_name, module)
+    return module
+
+def importReader():
+    # Returns the module SolidWorksReader of the plugin package
+    if "CuraSolidWorksPlugin.SolidWorksReader" in sys.modules.keys():
+        return sys.modules["CuraSolidWorksPlugin.SolidWorksReader"]
+
+    _addModule("PyQt5.QtCore", pyqtProperty = pyqtProperty, pyqtSignal = pyqtSignal, pyqtSlot = pyqtSlot, QObject = QObject, QUrl = QUrl)
+    _addModule("PyQt5.QtQml", QQmlComponent = QQmlComponent, QQmlContext = QQmlContext)
+    _addModule("UM.Application", Application = Application)
+    _addModule("UM.Extension", Extension = Extension)
+    _addModule("UM.i18n", i18nCatalog = i18nCatalog)
+    _addModule("UM.Logger", Logger = Logger)
+    _addModule("UM.Math.Matrix", Matrix = Matrix)
+    _addModule("UM.Mesh.MeshData", MeshData = MeshData)
+    _addModule("UM.Mesh.MeshReader", MeshReader = MeshReader)
+    _addModule("UM.Message", Message = Message)
+    _addModule("UM.MimeTypeDatabase", MimeTypeDatabase = MimeTypeDatabase, MimeType = MimeType)
+    _addModule("UM.Platform", Platform = Platform)
+    _addModule("UM.PluginRegistry", PluginRegistry = PluginRegistry)
+    _addModule("UM.Preferences", Preferences = Preferences)
+    _addModule("UM.Resources", Resources = Resources)
+    _addModule("UM.Scene.GroupDecorator", GroupDecorator = GroupDecorator)
+    _addModule("UM.Signal", Signal = Signal)
+    _addModule("UM.Version", Version = Version)
+    _addModule("cura.Scene.CuraSceneNode", CuraSceneNode = CuraSceneNode)
+    if "winreg" not in sys.modules.keys():
+        try:
+            import winreg # @UnresolvedImport @UnusedImport
+        except ImportError:
+            _addModule("winreg",
+                       HKEY_CLASSES_ROOT = 0,
+                       KEY_READ = 0,
+                       OpenKey = _raiseFileNotFoundError,
+                       CloseKey = lambda key: None,
+                       QueryValue = _raiseFileNotFoundError,
+                       )
+
+    # The plugin is imported as a package, so its relative imports work
+    sys.path.insert(0, os.path.split(plugin_directory)[0])
+    __import__("CuraSolidWorksPlugin")
+    _addModule("CuraSolidWorksPlugin.CadIntegrationUtils.CommonComReader", CommonCOMReader = CommonCOMReader)
+    _addModule("CuraSolidWorksPlugin.CadIntegrationUtils.ComFactory", ComConnector = ComConnector)
+    _addModule("CuraSolidWorksPlugin.CadIntegrationUtils.SystemUtils", convertDosPathIntoLongPath = convertDosPathIntoLongPath)
+    __import__("CuraSolidWorksPlugin.SolidWorksReader")
+    return sys.modules["CuraSolidWorksPlugin.SolidWorksReader"]
+
+def createReader(storage_path, apps, registry_keys = None, preferences = None):
+    """
+    Creates a SolidWorksReader, which starts the apps of the given FakeApps
+
+    - registry_keys are looked up instead of the registry. See SolidWorksRegistry.MemoryRegistryBackend
+    - preferences are set after the plugin added its defaults: {"export_quality": 30, ...}
+    """
+
+    module = importReader()
+    registry_module = sys.modules["CuraSolidWorksPlugin.SolidWorksRegistry"]
+    Application._instance = None
+    Resources.storage_path = storage_path
+    ComConnector.apps = apps
+    del Message.shown[:]
+
+    reader = module.SolidWorksReader()
+    reader._registry = registry_module.SolidWorksRegistry(registry_module.MemoryRegistryBackend(registry_keys or {}),
+                                                          reader._default_app_name,
+                                                          )
+    for name, value in (preferences or {}).items():
+        Application.getInstance().getPreferences().setValue("cura_solidworks/{}".format(name), value)
+    return reader
+
+def getRegistryKeys(versions, current_version = None, executable = None):
+    # Registry of SolidWorks installations, which are started by executable
+    keys = {}
+    for version in versions:
+        keys["SldWorks.Application.{}\\CLSID".format(version)] = "{{{}}}".format(version)
+        keys["CLSID\\{{{}}}\\LocalServer32".format(version)] = "\"{}\" /automation".format(executable or "C:\\SOLIDWORKS\\SLDWORKS.exe")
+    if current_version is not None:
+        keys["SldWorks.Application\\CurVer"] = "SldWorks.Application.{}".format(current_version)
+    return keys
@@ -0,0 +1,197 @@
+'''
+Created on 18.10.2018
+
+@author: Thomas Pietrowski
+
+Benchmarks the conversion phases against FakeSolidWorks
+
+- Parts, assemblies, instanced assemblies and drawings are converted at several mesh sizes.
+- Files are opened, exported and closed by SolidWorksDocumentExporter, which is used by SolidWorksReader as well.
+  Its phases are taken from the trace of the conversion.
+- The exported STLs are read and post-processed by the functions of SolidWorksReader.nodePostProcessing():
+  auto-rotation, welding and decimation.
+- Results are compared to the stored baseline of the platform. Use --update to store a new baseline.
+
+Usage: python3 benchmark_solidworks.py [--update] [--latency SECONDS] [--repeat N] [--sizes 10000,100000]
+'''
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.split(__file__)[0], ".."))
+import FakeSolidWorks # @UnresolvedImport
+from SolidWorksDocumentExporter import SolidWorksDocumentExporter # @UnresolvedImport
+from SolidWorksMeshUtils import calculateVertexNormals, decimateMesh, getWriteableArray, rotateAboutXInPlace, weldVertices # @UnresolvedImport
+from SolidWorksStlReader import readBinaryStl # @UnresolvedImport
+from SolidWorksTrace import SolidWorksTrace # @UnresolvedImport
+
+default_sizes = (10000, 100000, 1000000)
+kinds = ("part", "assembly", "instanced", "drawing")
+baseline_path = os.path.join(os.path.split(__file__)[0], "benchmark_baselines_{}.json".format(sys.platform))
+
+# Phases of the trace, which are reported. The others are COM calls within them.
+exporter_phases = ("openForeignFile", "exportFileAs", "closeForeignFile", "GetRootComponent3/GetChildren", "SaveAs")
+
+class PhaseTimer():
+    def __init__(self):
+        self.phases = {}
+
+    def measure(self, phase, function, *args, **kwargs):
+        start_time = time.perf_counter()
+        result = function(*args, **kwargs)
+        self.phases[phase] = self.phases.get(phase, 0.0) + time.perf_counter() - start_time
+        return result
+
+def _scriptCase(app, kind, triangles):
+    part_path = "C:\\Benchmark\\part.SLDPRT"
+    if kind == "part":
+        app.addPart(part_path, triangles)
+        return part_path
+    if kind in ("assembly", "instanced"):
+        # Four instances of two parts
+        app.addPart("C:\\Benchmark\\part_a.SLDPRT", triangles // 4)
+        app.addPart("C:\\Benchmark\\part_b.SLDPRT", triangles // 4)
+        components = []
+        for index, path in enumerate(["C:\\Benchmark\\part_a.SLDPRT", "C:\\Benchmark\\part_b.SLDPRT"] * 2):
+            array_data = list(FakeSolidWorks.identity_array_data)
+            array_data[9] = 0.1 * index
+            components.append((path, "Default", array_data))
+        assembly_path = "C:\\Benchmark\\assembly.SLDASM"
+        app.addAssembly(assembly_path, components)
+        return assembly_path
+    if kind == "drawing":
+        # Two models, which are exported one after another
+        app.addPart("C:\\Benchmark\\part_a.SLDPRT", triangles // 2)
+        app.addPart("C:\\Benchmark\\part_b.SLDPRT", triangles // 2)
+        drawing_path = "C:\\Benchmark\\drawing.SLDDRW"
+        app.addDrawing(drawing_path, ["C:\\Benchmark\\part_a.SLDPRT", "C:\\Benchmark\\part_b.SLDPRT"])
+        return drawing_path
+    raise ValueError(kind)
+
+def _getExportedFiles(options):
+    if options.get("instanced_assembly", False):
+        return list(options["instance_exports"].values())
+    if "drawing_exports" in options.keys():
+        return [export["tempFile"] for export in options["drawing_exports"]]
+    return [options["tempFile"]]
+
+def _postProcess(timer, vertices, triangle_budget):
+    # Same order as SolidWorksReader.nodePostProcessing()
+    vertices = timer.measure("autoRotation", rotateAboutXInPlace, getWriteableArray(vertices))
+    vertices, indices = timer.measure("welding", weldVertices, vertices, 0.001)
+    timer.measure("welding", calculateVertexNormals, vertices, indices)
+    vertices, indices = timer.measure("decimation", decimateMesh, vertices, indices, triangle_budget = max(min(len(indices) // 4, triangle_budget), 1))
+    timer.measure("decimation", calculateVertexNormals, vertices, indices)
+
+def runCase(kind, triangles, latency):
+    connector = FakeSolidWorks.FakeComConnector()
+    app = FakeSolidWorks.FakeSldWorksApplication(default_latency = latency, com_connector = connector)
+    file_path = _scriptCase(app, kind, triangles)
+    exporter = SolidWorksDocumentExporter(connector)
+    timer = PhaseTimer()
+    options = {"foreignFile": file_path,
+               "foreignFormat": os.path.splitext(file_path)[1],
+               "tempFileKeep": False,
+               "trace": SolidWorksTrace(file_path),
+               "app_export_quality": 30, # Fine (3D-printing)
+               "app_auto_rotate": True,
+               "app_triangle_budget": 0,
+               "app_open_strategy": "resolved",
+               "app_instanced_assemblies": kind == "instanced",
+               "app_cache_enabled": False,
+               }
+
+    # Like a session of SolidWorksReader, which converts a single file
+    connector.CoInit()
+    try:
+        start_time = time.perf_counter()
+        session_options = {"app_instance": app, "app_was_active": False}
+        timer.measure("exportSettings", exporter.onSessionStarted, session_options)
+        exporter.joinSession(session_options, options)
+        options = exporter.exportForeignFile(options, ["stl"])
+        timer.measure("exportSettings", exporter.onSessionClosing, session_options)
+    finally:
+        connector.UnCoInit()
+
+    durations = options["trace"].getDurations()
+    for phase in exporter_phases:
+        if phase in durations.keys():
+            timer.phases[phase] = durations[phase]
+    for temp_file in _getExportedFiles(options):
+        vertices, _ = timer.measure("readBinaryStl", readBinaryStl, temp_file)
+        os.remove(temp_file)
+        _postProcess(timer, vertices, triangles)
+    timer.phases["total"] = time.perf_counter() - start_time
+    return timer.phases, dict(app.calls)
+
+def runBenchmarks(sizes, latency, repeat):
+    results = {}
+    for kind in kinds:
+        for triangles in sizes:
+            case = "{}-{}".format(kind, triangles)
+            best = None
+            for _ in range(repeat):
+                phases, calls = runCase(kind, triangles, latency)
+                if best is None:
+                    best = phases
+                else:
+                    best = {phase: min(best[phase], duration) for phase, duration in phases.items()}
+            results[case] = {"phases": best,
+                             "com_calls": sum(calls.values()),
+                             }
+    return results
+
+def compareWithBaseline(results, baseline, tolerance, minimum_difference):
+    regressions = []
+    for case, result in results.items():
+        if case not in baseline.keys():
+            continue
+        for phase, duration in result["phases"].items():
+            reference = baseline[case]["phases"].get(phase)
+            if reference is None:
+                continue
+            if duration > reference * tolerance and duration - reference > minimum_difference:
+                regressions.append("{} / {}: {:.4f}s (baseline {:.4f}s)".format(case, phase, duration, reference))
+        if result["com_calls"] > baseline[case]["com_calls"]:
+            regressions.append("{}: {} COM calls (baseline {})".format(case, result["com_calls"], baseline[case]["com_calls"]))
+    return regressions
+
+def main(arguments = None):
+    parser = argparse.ArgumentParser(description = "Benchmarks the conversion phases against a fake SolidWorks")
+    parser.add_argument("--update", action = "store_true", help = "Store the results as new baseline")
+    parser.add_argument("--latency", type = float, default = 0.0, help = "Latency per COM call in seconds")
+    parser.add_argument("--repeat", type = int, default = 3, help = "Runs per case. The fastest run is kept.")
+    parser.add_argument("--sizes", default = ",".join([str(size) for size in default_sizes]), help = "Triangle counts")
+    parser.add_argument("--tolerance", type = float, default = 1.5, help = "Allowed slowdown factor against the baseline")
+    parser.add_argument("--baseline", default = baseline_path)
+    arguments = parser.parse_args(arguments)
+
+    sizes = [int(size) for size in arguments.sizes.split(",")]
+    results = runBenchmarks(sizes, arguments.latency, arguments.repeat)
+    for case, result in results.items():
+        print("{:<20} {:>8.4f}s {:>5} COM calls".format(case, result["phases"]["total"], result["com_calls"]))
+        for phase, duration in sorted(result["phases"].items()):
+            if phase != "total":
+                print("    {:<18} {:>8.4f}s".format(phase, duration))
+
+    if arguments.update:
+        with open(arguments.baseline, "w") as baseline_file:
+            json.dump(results, baseline_file, indent = 2, sort_keys = True)
+        print("Stored baseline in <{}>".format(arguments.baseline))
+        return 0
+
+    if not os.path.isfile(arguments.baseline):
+        print("No baseline found at <{}>. Run with --update first.".format(arguments.baseline))
+        return 0
+    with open(arguments.baseline, "r") as baseline_file:
+        baseline = json.load(baseline_file)
+    regressions = compareWithBaseline(results, baseline, arguments.tolerance, 0.005)
+    for regression in regressions:
+        print("REGRESSION: {}".format(regression))
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+'''
+Created on 18.10.2018
+
+@author: Thomas Pietrowski
+'''
+import os
+import sys
+import tempfile
+import zipfile
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.split(__file__)[0], ".."))
+import SolidWorks3mfReader # @UnresolvedImport
+
+relationships = """<?xml version="1.0" encoding="UTF-8"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Target="/3D/model.model" Id="rel0" Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>
+</Relationships>
+"""
+
+model = """<?xml version="1.0" encoding="UTF-8"?>
+<model unit="centimeter" xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">
+<resources>
+<object id="1" name="Part" type="model">
+<mesh>
+<vertices>
+<vertex x="0" y="0" z="0"/><vertex x="1" y="0" z="0"/><vertex x="0" y="1" z="0"/><vertex x="0" y="0" z="1"/>
+</vertices>
+<triangles>
+<triangle v1="0" v2="2" v3="1"/><triangle v1="0" v2="1" v3="3"/><triangle v1="0" v2="3" v3="2"/><triangle v1="1" v2="2" v3="3"/>
+</triangles>
+</mesh>
+</object>
+<object id="2" name="Assembly" type="model">
+<components>
+<component objectid="1"/>
+<component objectid="1" transform="0 1 0 -1 0 0 0 0 1 5 0 0"/>
+</components>
+</object>
+</resources>
+<build>
+<item objectid="2" transform="1 0 0 0 1 0 0 0 1 0 0 2"/>
+</build>
+</model>
+"""
+
+def _write3mf(directory):
+    file_path = os.path.join(directory, "test.3mf")
+    with zipfile.ZipFile(file_path, "w") as archive:
+        archive.writestr("_rels/.rels", relationships)
+        archive.writestr("3D/model.model", model)
+    return file_path
+
+def test_parse_transform_uses_row_vectors():
+    transformation = SolidWorks3mfReader.parseTransform("0 1 0 -1 0 0 0 0 1 5 0 0")
+    # (1, 0, 0) * M = (0, 1, 0), moved by (5, 0, 0)
+    numpy.testing.assert_allclose(transformation.dot([1, 0, 0, 1]), [5, 1, 0, 1])
+
+def test_components_are_resolved_into_shared_meshes():
+    with tempfile.TemporaryDirectory() as directory:
+        meshes, items = SolidWorks3mfReader.read3mf(_write3mf(directory))
+    assert list(meshes.keys()) == ["1"]
+    vertices, indices = meshes["1"]
+    assert vertices.shape == (4, 3)
+    assert indices.shape == (4, 3)
+    numpy.testing.assert_allclose(vertices[1], [10, 0, 0]) # cm -> mm
+
+    assert len(items) == 2
+    assert all([object_id == "1" and name == "Assembly" for object_id, name, _ in items])
+    translations = sorted([tuple(transformation[:3, 3]) for _, _, transformation in items])
+    assert translations == [(0, 0, 20), (50, 0, 20)]
@@ -0,0 +1,197 @@
+'''
+Created on 18.10.2018
+
+@author: Thomas Pietrowski
+'''
+import math
+import os
+import sys
+import tempfile
+import tracemalloc
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.split(__file__)[0], ".."))
+import SolidWorksMeshUtils # @UnresolvedImport
+from SolidWorksStlReader import readBinaryStl, stl_header_size, stl_triangle_dtype # @UnresolvedImport
+
+sys.path.insert(0, os.path.split(__file__)[0])
+from FakeSolidWorks import getSphereFaces, identity_array_data # @UnresolvedImport
+from FakeUranium import FakeApps, createReader # @UnresolvedImport
+
+# An ellipsoid off the origin in SolidWorks' coordinates, so rotations change its extents and position
+ellipsoid_faces = getSphereFaces(200) * numpy.array([0.1, 0.2, 0.3]) + numpy.array([100.0, 200.0, 300.0])
+
+def _quaternionMatrix(angle):
+    # Quaternion.fromAngleAxis(angle, Vector.Unit_X).toMatrix() of Uranium
+    x, y, z, w = math.sin(angle / 2), 0.0, 0.0, math.cos(angle / 2)
+    return numpy.array([[1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w), 0],
+                        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w), 0],
+                        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y), 0],
+                        [0, 0, 0, 1],
+                        ], dtype = numpy.float64)
+
+def _rotateWithMatrix(data, w = 1.0):
+    # Previous implementation: The node's transformation (rotation without translation) applied by MeshData.getTransformed.
+    # Vertices are padded with w = 1, normals with w = 0. The inverse transpose of a rotation is the rotation itself.
+    transformation = _quaternionMatrix(math.radians(90))
+    padded = numpy.pad(data.astype(numpy.float64), ((0, 0), (0, 1)), "constant", constant_values = (0.0, w))
+    return padded.dot(transformation.T)[:, 0:3].astype(data.dtype)
+
+def _immutableNDArray(data):
+    # NumPyUtil.immutableNDArray of Uranium, which MeshData runs its arrays through
+    if not data.flags.writeable:
+        return data
+    data = numpy.array(data)
+    data.flags.writeable = False
+    return data
+
+def test_in_place_rotation_matches_matrix_rotation():
+    vertices = numpy.random.RandomState(0).uniform(-100, 100, (3000, 3)).astype(numpy.float32)
+    expected = _rotateWithMatrix(vertices)
+
+    result = SolidWorksMeshUtils.rotateAboutXInPlace(vertices)
+    assert result is vertices
+    numpy.testing.assert_allclose(result, expected, atol = 1e-4)
+
+def test_in_place_rotation_across_chunks():
+    chunk_size = SolidWorksMeshUtils.chunk_size
+    SolidWorksMeshUtils.chunk_size = 7
+    try:
+        normals = numpy.random.RandomState(1).uniform(-1, 1, (50, 3)).astype(numpy.float32)
+        expected = _rotateWithMatrix(normals, w = 0.0)
+        numpy.testing.assert_allclose(SolidWorksMeshUtils.rotateAboutXInPlace(normals), expected, atol = 1e-6)
+    finally:
+        SolidWorksMeshUtils.chunk_size = chunk_size
+
+def test_read_only_arrays_are_made_writeable():
+    vertices = numpy.zeros((4, 3), dtype = numpy.float32)
+    vertices.flags.writeable = False
+    assert SolidWorksMeshUtils.getWriteableArray(vertices) is vertices
+    assert vertices.flags.writeable
+
+def test_rotated_arrays_are_taken_over_without_copy():
+    # Like MeshData holds them: read-only
+    vertices = numpy.random.RandomState(2).uniform(-100, 100, (300000, 3)).astype(numpy.float32)
+    vertices.flags.writeable = False
+
+    tracemalloc.start()
+    try:
+        rotated = SolidWorksMeshUtils.getWriteableArray(vertices)
+        rotated = SolidWorksMeshUtils.getReadOnlyArray(SolidWorksMeshUtils.rotateAboutXInPlace(rotated))
+        taken_over = _immutableNDArray(rotated)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert taken_over is vertices
+    assert not taken_over.flags.writeable
+    # Only a backup of one column is needed
+    assert peak < vertices.nbytes / 2
+
+def _writeStl(file_path, faces):
+    data = numpy.zeros(len(faces), dtype = stl_triangle_dtype)
+    data["vertices"] = faces
+    with open(file_path, "wb") as stl_file:
+        stl_file.write(b"\0" * stl_header_size)
+        stl_file.write(numpy.array([len(data)], dtype = "<u4").tobytes())
+        data.tofile(stl_file)
+    return file_path
+
+def _getWorldBox(scene_node):
+    vertices = scene_node.getMeshData().getVertices().astype(numpy.float64)
+    world_vertices = numpy.pad(vertices, ((0, 0), (0, 1)), "constant", constant_values = 1.0).dot(scene_node.getWorldTransformation().getData().T)
+    return world_vertices[:, :3].min(axis = 0), world_vertices[:, :3].max(axis = 0)
+
+def _getBox(vertices):
+    vertices = vertices.reshape(-1, 3)
+    return vertices.min(axis = 0), vertices.max(axis = 0)
+
+def _assertBoxesEqual(box, expected_box):
+    numpy.testing.assert_allclose(box[0], expected_box[0], atol = 1e-3)
+    numpy.testing.assert_allclose(box[1], expected_box[1], atol = 1e-3)
+
+def _readStl(reader, stl_file, auto_rotate):
+    options = {"foreignFile": "C:\\Models\\part.SLDPRT",
+               "tempType": "stl",
+               "tempFile": stl_file,
+               "tempFileKeep": True,
+               "app_auto_rotate": auto_rotate,
+               }
+    scene_nodes = reader.readExportedFile(options)
+    return reader.nodePostProcessing(options, scene_nodes)
+
+def test_rotated_node_matches_previous_rotation():
+    with tempfile.TemporaryDirectory() as directory:
+        reader = createReader(directory, FakeApps())
+        stl_file = _writeStl(os.path.join(directory, "part.STL"), ellipsoid_faces)
+        mapped_vertices, _ = readBinaryStl(stl_file)
+
+        scene_node, = _readStl(reader, stl_file, True)
+        # The mesh is the one the previous implementation created by MeshData.getTransformed()
+        numpy.testing.assert_allclose(scene_node.getMeshData().getVertices(), _rotateWithMatrix(mapped_vertices), atol = 1e-4)
+        # Previously the node was rotated as well, which turned it a second time. Now the rotation is done once by the mesh.
+        numpy.testing.assert_array_equal(scene_node.getLocalTransformation().getData(), numpy.identity(4))
+        # Rotating back ends up in SolidWorks' coordinates, in the same place as in SolidWorks
+        _assertBoxesEqual(_getWorldBox(scene_node), _getBox(ellipsoid_faces))
+
+        # Without auto-rotation the node is placed like by Cura's STL reader
+        scene_node, = _readStl(reader, stl_file, False)
+        numpy.testing.assert_array_equal(scene_node.getMeshData().getVertices(), mapped_vertices)
+        numpy.testing.assert_array_equal(scene_node.getLocalTransformation().getData(), numpy.identity(4))
+        _assertBoxesEqual(_getWorldBox(scene_node), _getBox(mapped_vertices))
+
+def test_instances_are_rotated_by_their_transformation_only():
+    moved_data = identity_array_data[:9] + (0.0, 0.5, 0.0) + identity_array_data[12:] # 500 mm along y
+    with tempfile.TemporaryDirectory() as directory:
+        reader = createReader(directory, FakeApps())
+        stl_file = _writeStl(os.path.join(directory, "bolt.STL"), ellipsoid_faces)
+        mapped_vertices, _ = readBinaryStl(stl_file)
+        instance_key = ("C:\\Models\\bolt.SLDPRT", "Default")
+
+        for auto_rotate in (True, False):
+            options = {"foreignFile": "C:\\Models\\frame.SLDASM",
+                       "tempFileKeep": True,
+                       "app_auto_rotate": auto_rotate,
+                       "instanced_assembly": True,
+                       "instance_exports": {instance_key: stl_file},
+                       "instances": [(instance_key, identity_array_data), (instance_key, moved_data)],
+                       }
+            group_node, = reader.nodePostProcessing(options, reader.readInstancedAssembly(options))
+            first_node, moved_node = group_node.getChildren()
+
+            # The shared mesh is neither rotated by the post-processing nor by the transformation a second time
+            assert first_node.getMeshData() is moved_node.getMeshData()
+            numpy.testing.assert_array_equal(first_node.getMeshData().getVertices(), mapped_vertices)
+            numpy.testing.assert_array_equal(group_node.getLocalTransformation().getData(), numpy.identity(4))
+
+            # Each instance ends up where the same part would be placed on its own
+            single_node, = _readStl(reader, stl_file, auto_rotate)
+            single_box = _getWorldBox(single_node)
+            _assertBoxesEqual(_getWorldBox(first_node), single_box)
+            # SolidWorks' y-axis becomes the negative z-axis, when the assembly is mapped like Cura's STL reader does
+            offset = numpy.array([0.0, 500.0, 0.0] if auto_rotate else [0.0, 0.0, -500.0])
+            _assertBoxesEqual(_getWorldBox(moved_node), (single_box[0] + offset, single_box[1] + offset))
+
+def test_batch_converter_pipeline_matches_reader():
+    with tempfile.TemporaryDirectory() as directory:
+        reader = createReader(directory, FakeApps())
+        stl_file = _writeStl(os.path.join(directory, "part.STL"), ellipsoid_faces)
+
+        for auto_rotate in (True, False):
+            options = {"foreignFile": "C:\\Models\\part.SLDPRT",
+                       "tempType": "stl",
+                       "tempFile": stl_file,
+                       "tempFileKeep": True,
+                       "app_auto_rotate": auto_rotate,
+                       "app_weld_vertices": True,
+                       "app_weld_epsilon": 0.001,
+                       "app_triangle_budget": 500,
+                       }
+            scene_node, = reader.nodePostProcessing(options, reader.readExportedFile(options))
+            stl_vertices, _ = readBinaryStl(stl_file)
+            vertices, indices = SolidWorksMeshUtils.postProcessMesh(options, stl_vertices, None)
+
+            assert len(indices) <= 500
+            numpy.testing.assert_array_equal(scene_node.getMeshData().getVertices(), vertices)
+            numpy.testing.assert_array_equal(scene_node.getMeshData().getIndices(), indices)
@@ -0,0 +1,111 @@
+'''
+Created on 18.10.2018
+
+@author: Thomas Pietrowski
+'''
+
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.split(__file__)[0], ".."))
+import SolidWorksBatchConverter # @UnresolvedImport
+sys.path.insert(0, os.path.split(__file__)[0])
+import FakeSolidWorks # @UnresolvedImport
+from SolidWorksStlReader import getTriangleCount # @UnresolvedImport
+
+def _createFiles(directory, file_names):
+    for file_name in file_names:
+        file_path = os.path.join(directory, file_name)
+        os.makedirs(os.path.dirname(file_path), exist_ok = True)
+        with open(file_path, "wb"):
+            pass
+
+def test_directory_is_converted_with_report():
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "library")
+        output = os.path.join(directory, "meshes")
+        _createFiles(source, ["bracket.SLDPRT", os.path.join("sub", "frame.SLDASM"), "~$bracket.SLDPRT", "notes.txt"])
+
+        exit_code = SolidWorksBatchConverter.main([source, "--output", output, "--fake", "--fake-triangles", "2000"])
+
+        assert exit_code == 0
+        with open(os.path.join(output, "report.json"), "r") as report_file:
+            report = json.load(report_file)
+        assert report["converted"] == 2
+        assert report["quality_name"] == "Fine (3D-printing)"
+        part = [entry for entry in report["files"] if entry["file"].endswith("bracket.SLDPRT")][0]
+        assert part["meshes"][0]["file"] == os.path.join(output, "bracket.SLDPRT.stl")
+        assert getTriangleCount(part["meshes"][0]["file"]) == part["meshes"][0]["triangles"] > 1000
+        assert set(["openForeignFile", "SaveAs", "readExportedFile", "writeMesh"]) <= set(part["durations"].keys())
+        assert os.path.isfile(os.path.join(output, "sub", "frame.SLDASM.stl"))
+
+def test_decimation_by_max_error():
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "library")
+        _createFiles(source, ["bracket.SLDPRT"])
+        triangles = []
+        for arguments in ([], ["--decimation-max-error", "10"]):
+            output = os.path.join(directory, "meshes{}".format(len(triangles)))
+            assert SolidWorksBatchConverter.main([source, "--output", output, "--fake", "--fake-triangles", "2000"] + arguments) == 0
+            triangles.append(getTriangleCount(os.path.join(output, "bracket.SLDPRT.stl")))
+        # Decimated without a triangle budget
+        assert 0 < triangles[1] < triangles[0]
+
+def test_manifest_and_drawings():
+    with tempfile.TemporaryDirectory() as directory:
+        manifest_path = os.path.join(directory, "manifest.txt")
+        with open(manifest_path, "w") as manifest_file:
+            manifest_file.write("# Overnight\nsheet.SLDDRW\nempty.SLDDRW\n")
+        files = SolidWorksBatchConverter.collectFiles(manifest_path)
+        assert [relative_path for _, relative_path in files] == ["sheet.SLDDRW", "empty.SLDDRW"]
+
+        backend = SolidWorksBatchConverter.FakeComBackend(triangles = 1000)
+        # Unreadable 3MF files are exported into STL files again
+        backend.app_instance.broken_3mf = True
+        backend.app_instance.addDrawing(files[0][0], ["C:\\Models\\a.SLDPRT", "C:\\Models\\b.SLDASM"])
+        converter = SolidWorksBatchConverter.SolidWorksBatchConverter(backend, os.path.join(directory, "meshes"), quality = -2)
+        report = converter.run(files)
+
+        assert [entry["status"] for entry in report["files"]] == ["converted", "failed"]
+        assert [os.path.basename(mesh["file"]) for mesh in report["files"][0]["meshes"]] == ["sheet.SLDDRW_a.stl", "sheet.SLDDRW_b.stl"]
+        # Everything opened has been closed again and the export settings were restored
+        assert not backend.app_instance._open_documents
+        assert backend.app_instance.exited
+        assert backend.app_instance.saved_files
+        assert not [file_path for file_path in backend.app_instance.saved_files if os.path.exists(file_path)]
+
+def test_instanced_assemblies_and_mesh_cache():
+    with tempfile.TemporaryDirectory() as directory:
+        _createFiles(directory, ["frame.SLDASM", "bolt.SLDPRT"])
+        files = [(os.path.join(directory, "frame.SLDASM"), "frame.SLDASM"), (os.path.join(directory, "bolt.SLDPRT"), "bolt.SLDPRT")]
+        moved_data = (1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0, 0.2, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0)
+        backend = SolidWorksBatchConverter.FakeComBackend(triangles = 500)
+        # The bolt has been saved with another configuration being active than the one used by the assembly
+        backend.app_instance.addPart(files[1][0], triangles = 500, configuration = "Long")
+        backend.app_instance.addAssembly(files[0][0], [(files[1][0], "Default", FakeSolidWorks.identity_array_data),
+                                                       (files[1][0], "Default", moved_data),
+                                                       ])
+
+        converter = SolidWorksBatchConverter.SolidWorksBatchConverter(backend,
+                                                                      os.path.join(directory, "meshes"),
+                                                                      weld_epsilon = 0,
+                                                                      instanced_assemblies = True,
+                                                                      cache_directory = os.path.join(directory, "cache"),
+                                                                      )
+        report = converter.run(files)
+
+        assembly, part = report["files"]
+        assert assembly["status"] == part["status"] == "converted"
+        # The bolt has been exported once for the assembly and once on its own. Both instances are written.
+        assert backend.app_instance.calls["ModelDoc2.SaveAs"] == 2 # STL of the bolt and 3MF of the part
+        assert assembly["meshes"][0]["triangles"] == 2 * part["meshes"][0]["triangles"]
+        assert not part["cached"]
+        # The configuration of the assembly has been shown for the export only
+        assert backend.app_instance.shown_configurations == [(files[1][0], "Default"), (files[1][0], "Long")]
+
+        report = converter.run(files)
+        assert report["files"][1]["cached"]
+        assert not report["files"][0]["cached"] # Instanced imports aren't cached
+        assert backend.app_instance.calls["ModelDoc2.SaveAs"] == 3
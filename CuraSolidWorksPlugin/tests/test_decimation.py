@@ -0,0 +1,83 @@
+'''
+Created on 18.10.2018
+
+@author: Thomas Pietrowski
+'''
+import os
+import sys
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.split(__file__)[0], ".."))
+import SolidWorksMeshUtils # @UnresolvedImport
+
+def _sphere(rings = 100, radius = 10.0):
+    theta, phi = numpy.meshgrid(numpy.linspace(0, numpy.pi, rings),
+                                numpy.linspace(0, 2 * numpy.pi, 2 * rings),
+                                indexing = "ij",
+                                )
+    points = numpy.stack([numpy.sin(theta) * numpy.cos(phi),
+                          numpy.sin(theta) * numpy.sin(phi),
+                          numpy.cos(theta),
+                          ], axis = -1).reshape(-1, 3) * radius
+    grid = numpy.arange(rings * 2 * rings).reshape(rings, 2 * rings)
+    a, b, c, d = grid[:-1, :-1], grid[1:, :-1], grid[1:, 1:], grid[:-1, 1:]
+    faces = numpy.concatenate([numpy.stack([a, b, c], axis = -1).reshape(-1, 3),
+                               numpy.stack([a, c, d], axis = -1).reshape(-1, 3),
+                               ])
+    return SolidWorksMeshUtils.weldVertices(points[faces.flatten()].astype(numpy.float32), 1e-4)
+
+def test_triangle_budget_is_met():
+    vertices, indices = _sphere()
+    new_vertices, new_indices = SolidWorksMeshUtils.decimateMesh(vertices, indices, triangle_budget = 2000)
+    assert 1000 < len(new_indices) <= 2000
+    assert new_indices.dtype == numpy.int32
+    assert new_indices.max() < len(new_vertices)
+    # Cluster positions stay on the surface
+    assert numpy.abs(numpy.linalg.norm(new_vertices, axis = 1) - 10).max() < 0.1
+
+def test_meshes_within_budget_are_unchanged():
+    vertices, indices = _sphere(rings = 10)
+    new_vertices, new_indices = SolidWorksMeshUtils.decimateMesh(vertices, indices, triangle_budget = len(indices))
+    assert new_vertices is vertices
+    assert new_indices is indices
+
+def test_max_error_limits_the_reduction():
+    vertices, indices = _sphere()
+    _, coarse = SolidWorksMeshUtils.decimateMesh(vertices, indices, triangle_budget = 100)
+    _, bounded = SolidWorksMeshUtils.decimateMesh(vertices, indices, triangle_budget = 100, max_error = 0.5)
+    assert len(coarse) <= 100
+    assert len(bounded) > len(coarse)
+
+def test_max_error_without_triangle_budget():
+    vertices, indices = _sphere()
+    new_vertices, new_indices = SolidWorksMeshUtils.decimateMesh(vertices, indices, max_error = 0.5)
+    assert len(new_indices) < len(indices)
+    assert numpy.abs(numpy.linalg.norm(new_vertices, axis = 1) - 10).max() < 0.5
+
+def _noisyPlane(size = 40, spacing = 0.1, noise = 0.05):
+    # Nearly parallel faces, whose planes intersect far away from the surface
+    x, y = numpy.meshgrid(numpy.arange(size) * spacing, numpy.arange(size) * spacing, indexing = "ij")
+    z = numpy.random.RandomState(3).uniform(-noise, noise, x.shape)
+    points = numpy.stack([x, y, z], axis = -1).reshape(-1, 3)
+    grid = numpy.arange(size * size).reshape(size, size)
+    a, b, c, d = grid[:-1, :-1], grid[1:, :-1], grid[1:, 1:], grid[:-1, 1:]
+    faces = numpy.concatenate([numpy.stack([a, b, c], axis = -1).reshape(-1, 3),
+                               numpy.stack([a, c, d], axis = -1).reshape(-1, 3),
+                               ])
+    return points.astype(numpy.float32), faces.astype(numpy.int32)
+
+def test_cluster_positions_stay_within_their_cells():
+    vertices, indices = _noisyPlane()
+    max_error = 0.15
+    new_vertices, _ = SolidWorksMeshUtils.decimateMesh(vertices, indices, max_error = max_error)
+
+    # Without a triangle budget the grid starts at the minimum of the vertices and its cells are max_error wide
+    origin = vertices.min(axis = 0).astype(numpy.float64)
+    cells = numpy.unique(numpy.floor((vertices - origin) / max_error), axis = 0)
+    lower = origin + cells * max_error
+    upper = lower + max_error
+    points = new_vertices.astype(numpy.float64)[:, numpy.newaxis, :]
+    outside = numpy.maximum(lower - points, 0) + numpy.maximum(points - upper, 0)
+    # Each cluster lies within one of the cells occupied by the original vertices
+    assert numpy.linalg.norm(outside, axis = 2).min(axis = 1).max() < 1e-4 * max_error
@@ -0,0 +1,196 @@
+'''
+Created on 18.10.2018
+
+@author: Thomas Pietrowski
+'''
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.split(__file__)[0], ".."))
+from SolidWorksBatchConverter import FakeComBackend, SolidWorksBatchConverter # @UnresolvedImport
+from SolidWorksSession import SolidWorksSession # @UnresolvedImport
+from SolidWorksStlReader import getTriangleCount # @UnresolvedImport
+
+sys.path.insert(0, os.path.split(__file__)[0])
+from FakeSolidWorks import getSphereFaces, identity_array_data # @UnresolvedImport
+
+part_a = "C:\\Models\\a.SLDPRT"
+part_b = "C:\\Models\\b.SLDPRT"
+part_c = "C:\\Models\\c.SLDPRT"
+assembly = "C:\\Models\\assembly.SLDASM"
+drawing = "C:\\Models\\sheet.SLDDRW"
+
+def _createSession(triangles = 1000):
+    # The converter implements the same hooks of the session as SolidWorksReader
+    backend = FakeComBackend(triangles = triangles)
+    converter = SolidWorksBatchConverter(backend, None)
+    session = SolidWorksSession(converter, [backend.name], com_connector = backend.com_connector)
+    return backend.app_instance, converter, session
+
+def _openPreparedFile(session, converter, file_path, **options):
+    job_options = converter.getJobOptions(file_path, os.path.basename(file_path))
+    job_options.update(options)
+    session.run(converter.exporter.openPreparedFile, job_options)
+
+def _exportForeignFile(session_options, exporter, options, file_formats):
+    exporter.joinSession(session_options, options)
+    return exporter.exportForeignFile(options, file_formats)
+
+def test_models_of_drawings_are_exported_one_by_one():
+    app, converter, session = _createSession()
+    app.addPart(part_a, triangles = 500)
+    app.addPart(part_b, triangles = 2000)
+    app.addDrawing(drawing, [part_a, part_b, part_a])
+
+    options = converter.getJobOptions(drawing, "sheet.SLDDRW")
+    options = session.run(_exportForeignFile, converter.exporter, options, ["stl"])
+
+    exports = options["drawing_exports"]
+    assert [export["foreignFile"] for export in exports] == [part_a, part_b]
+    assert getTriangleCount(exports[0]["tempFile"]) < getTriangleCount(exports[1]["tempFile"])
+    # The drawing is opened once and everything is closed again
+    assert app.calls["OpenDoc7"] == 3
+    assert not app._open_documents
+    for export in exports:
+        os.remove(export["tempFile"])
+
+    # A drawing with a single model is exported like the model itself
+    app.addDrawing(drawing, [part_b])
+    options = converter.getJobOptions(drawing, "sheet.SLDDRW")
+    options = session.run(_exportForeignFile, converter.exporter, options, ["stl"])
+    assert options["foreignFile"] == part_b
+    assert options["cache_source_file"] == drawing
+    assert os.path.isfile(options["tempFile"])
+    os.remove(options["tempFile"])
+
+    # Drawings without models are flagged for the user
+    app.addDrawing(drawing, [])
+    options = converter.getJobOptions(drawing, "sheet.SLDDRW")
+    options = session.run(_exportForeignFile, converter.exporter, options, ["stl"])
+    assert options["sw_drawing_without_models"]
+    assert "tempFile" not in options.keys()
+    assert not app._open_documents
+    session.shutdown(5)
+
+def test_prepared_file_is_exported_without_opening_it_again():
+    app, converter, session = _createSession()
+    app.addPart(part_a)
+
+    _openPreparedFile(session, converter, part_a)
+    assert app.calls["OpenDoc7"] == 1
+    assert len(app._open_documents) == 1
+
+    options = converter.getJobOptions(part_a, "a.SLDPRT")
+    options = session.run(_exportForeignFile, converter.exporter, options, ["stl"])
+    assert os.path.isfile(options["tempFile"])
+    os.remove(options["tempFile"])
+    # Opened once, but closed like any other file opened by the plugin
+    assert app.calls["OpenDoc7"] == 1
+    assert not app._open_documents
+    assert not session.options["prepared_files"]
+    session.shutdown(5)
+
+def test_discarded_and_left_over_prepared_files_are_closed():
+    app, converter, session = _createSession()
+    app.addPart(part_a)
+    app.addPart(part_b)
+    # Opened by the user before the session started
+    user_document = app._getDocument(drawing)
+
+    # The user cancelled the import
+    _openPreparedFile(session, converter, part_a)
+    session.run(converter.exporter.closePreparedFile, part_a)
+    assert app._open_documents == [user_document]
+
+    # Documents opened by the user are neither prepared nor closed
+    _openPreparedFile(session, converter, drawing)
+    session.run(converter.exporter.closePreparedFile, drawing)
+    assert app._open_documents == [user_document]
+
+    # Prepared files, which haven't been imported, are closed when the session ends
+    _openPreparedFile(session, converter, part_b)
+    assert len(app._open_documents) == 2
+    session.shutdown(5)
+    assert app._open_documents == [user_document]
+    # SolidWorks is kept running for the user
+    assert not app.exited
+
+def _addLightweightAssembly(app):
+    app.addPart(part_a, triangles = 500)
+    app.addPart(part_b, triangles = 500, tessellated = False)
+    app.addPart(part_c, triangles = 500)
+    app.addAssembly(assembly, [(part_a, "Default", identity_array_data),
+                               (part_b, "Default", identity_array_data),
+                               (part_c, "Default", identity_array_data),
+                               ])
+
+def test_lightweight_components_without_tessellation_are_resolved():
+    app, converter, session = _createSession()
+    _addLightweightAssembly(app)
+
+    options = converter.getJobOptions(assembly, "assembly.SLDASM")
+    options["app_open_strategy"] = "lightweight"
+    options = session.run(_exportForeignFile, converter.exporter, options, ["stl"])
+
+    # Only the part without tessellation data is resolved before the export
+    assert options["sw_open_strategy"] == "lightweight"
+    assert options["sw_component_count"] == 3
+    assert options["sw_resolved_components"] == 1
+    assert not options.get("sw_open_fallback", False)
+    assert app.calls["ModelDoc2.SaveAs"] == 1
+    assert app.calls["AssemblyDoc.ResolveAllLightWeightComponents"] == 0
+    assert getTriangleCount(options["tempFile"]) == len(getSphereFaces(1500))
+    os.remove(options["tempFile"])
+
+    # Updates of the feature tree and the graphics are suppressed during the export and restored afterwards
+    assert app.saved_with_updates == [False]
+    model = options["sw_model"]
+    assert model.FeatureManager.EnableFeatureTree
+    assert model.ActiveView.EnableGraphicsUpdate
+    session.shutdown(5)
+
+def test_incomplete_exports_of_lightweight_assemblies_are_repeated():
+    app, converter, session = _createSession()
+    app.addPart(part_a, triangles = 8)
+    app.addPart(part_b, triangles = 500, tessellated = False)
+    app.addAssembly(assembly, [(part_a, "Default", identity_array_data)] + [(part_b, "Default", identity_array_data)] * 4)
+    # The components can't be checked before the export
+    app.no_suppression_state = True
+
+    options = converter.getJobOptions(assembly, "assembly.SLDASM")
+    options["app_open_strategy"] = "lightweight"
+    options = session.run(_exportForeignFile, converter.exporter, options, ["stl"])
+
+    # Not empty, but with too few triangles for five parts. Everything is resolved and exported again.
+    assert options["sw_component_count"] == 5
+    assert options["sw_open_strategy"] == "resolved"
+    assert options["sw_open_fallback"]
+    assert app.calls["ModelDoc2.SaveAs"] == 2
+    assert app.calls["AssemblyDoc.ResolveAllLightWeightComponents"] == 1
+    assert getTriangleCount(options["tempFile"]) == len(getSphereFaces(2008))
+    os.remove(options["tempFile"])
+    assert not app._open_documents
+    session.shutdown(5)
+
+def test_prepared_lightweight_assembly_is_resolved_like_when_opened_by_the_export():
+    app, converter, session = _createSession()
+    _addLightweightAssembly(app)
+
+    # Opened in advance with the options of the later import
+    _openPreparedFile(session, converter, assembly, app_open_strategy = "lightweight")
+    assert app.calls["OpenDoc7"] == 1
+    assert session.options["prepared_files"] == {os.path.normpath(assembly): "lightweight"}
+
+    options = converter.getJobOptions(assembly, "assembly.SLDASM")
+    options["app_open_strategy"] = "lightweight"
+    options = session.run(_exportForeignFile, converter.exporter, options, ["stl"])
+
+    # Not opened again, but the part without tessellation data is resolved before the export
+    assert app.calls["OpenDoc7"] == 1
+    assert options["sw_open_strategy"] == "lightweight"
+    assert options["sw_resolved_components"] == 1
+    assert getTriangleCount(options["tempFile"]) == len(getSphereFaces(1500))
+    os.remove(options["tempFile"])
+    assert not app._open_documents
+    assert not session.options["prepared_files"]
+    session.shutdown(5)
@@ -0,0 +1,64 @@
+'''
+Created on 18.10.2018
+
+@author: Thomas Pietrowski
+'''
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.split(__file__)[0], ".."))
+sys.path.insert(0, os.path.split(__file__)[0])
+import FakeSolidWorks # @UnresolvedImport
+from SolidWorksDocumentIndex import SolidWorksDocumentIndex # @UnresolvedImport
+
+def _openDocuments(app, count):
+    for index in range(count):
+        app.OpenDoc7(app.GetOpenDocSpec(os.path.join("Parts", "part_{}.SLDPRT".format(index))))
+
+def test_documents_are_walked_once():
+    app = FakeSolidWorks.FakeSldWorksApplication()
+    _openDocuments(app, 50)
+    document_index = SolidWorksDocumentIndex(app)
+    for index in range(50):
+        assert document_index.getTitle(os.path.join("Parts", "part_{}.SLDPRT".format(index))) == "part_{}.SLDPRT".format(index)
+    assert app.calls["ModelDoc2.GetNext"] == 50
+    assert app.calls["ModelDoc2.GetPathName"] == 50
+
+def test_own_changes_are_tracked_without_walking():
+    app = FakeSolidWorks.FakeSldWorksApplication()
+    _openDocuments(app, 5)
+    document_index = SolidWorksDocumentIndex(app)
+    document_index.getPaths()
+
+    new_path = os.path.join("Parts", "new.SLDPRT")
+    document_index.add(new_path, app.OpenDoc7(app.GetOpenDocSpec(new_path)))
+    assert document_index.getDocument(new_path) is not None
+    app.CloseDoc("new.SLDPRT")
+    document_index.remove(new_path)
+    assert document_index.getDocument(new_path) is None
+    assert app.calls["GetFirstDocument"] == 1
+
+def test_changes_by_the_user_rebuild_the_index():
+    app = FakeSolidWorks.FakeSldWorksApplication()
+    _openDocuments(app, 2)
+    document_index = SolidWorksDocumentIndex(app)
+    assert len(document_index.getPaths()) == 2
+    _openDocuments(app, 3)
+    assert len(document_index.getPaths()) == 3
+    assert app.calls["GetFirstDocument"] == 2
+
+def test_documents_swapped_by_the_user_are_noticed():
+    app = FakeSolidWorks.FakeSldWorksApplication()
+    _openDocuments(app, 3)
+    document_index = SolidWorksDocumentIndex(app)
+    closed_path = os.path.join("Parts", "part_1.SLDPRT")
+    assert document_index.getDocument(closed_path) is not None
+
+    # Same count of documents as before
+    app.CloseDoc("part_1.SLDPRT")
+    new_path = os.path.join("Parts", "other.SLDPRT")
+    app.OpenDoc7(app.GetOpenDocSpec(new_path))
+
+    assert document_index.getTitle(closed_path) is None
+    assert document_index.getTitle(new_path) == "other.SLDPRT"
+    assert app.calls["GetFirstDocument"] == 2
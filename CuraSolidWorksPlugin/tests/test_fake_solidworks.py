@@ -0,0 +1,46 @@
+'''
+Created on 18.10.2018
+
+@author: Thomas Pietrowski
+'''
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.split(__file__)[0], ".."))
+sys.path.insert(0, os.path.split(__file__)[0])
+import FakeSolidWorks # @UnresolvedImport
+from SolidWorksPreferenceState import SolidWorksPreferenceState # @UnresolvedImport
+from SolidWorksStlReader import getTriangleCount, isBinaryStl # @UnresolvedImport
+
+def test_save_as_writes_binary_stl():
+    app = FakeSolidWorks.FakeSldWorksApplication()
+    app.addPart("C:\\test.SLDPRT", triangles = 5000)
+    document = app.OpenDoc7(app.GetOpenDocSpec("C:\\test.SLDPRT"))
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, "test.stl")
+        assert document.SaveAs(file_path)
+        assert isBinaryStl(file_path)
+        assert 4000 < getTriangleCount(file_path) <= 5000
+
+def test_documents_are_listed_and_closed():
+    app = FakeSolidWorks.FakeSldWorksApplication()
+    app.OpenDoc7(app.GetOpenDocSpec("C:\\a.SLDPRT"))
+    app.OpenDoc7(app.GetOpenDocSpec("C:\\b.SLDASM"))
+    titles = []
+    document = app.GetFirstDocument
+    while document:
+        titles.append(document.GetTitle)
+        document = document.GetNext
+    assert titles == ["a.SLDPRT", "b.SLDASM"]
+    app.CloseDoc("a.SLDPRT")
+    assert app.GetDocumentCount == 1
+    assert app.calls["OpenDoc7"] == 2
+
+def test_preferences_work_with_preference_state():
+    app = FakeSolidWorks.FakeSldWorksApplication()
+    state = SolidWorksPreferenceState(app, {"deviation": ("double", 2), "binary": ("toggle", 69)})
+    assert state.apply({"deviation": 0.1, "binary": True}) == 2
+    assert app.GetUserPreferenceDoubleValue(2) == 0.1
+    state.restore()
+    assert app.GetUserPreferenceToggle(69) is False
@@ -0,0 +1,103 @@
+'''
+Created on 18.10.2018
+
+@author: Thomas Pietrowski
+'''
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.split(__file__)[0], ".."))
+from SolidWorksFolderWatcher import SolidWorksFolderWatcher # @UnresolvedImport
+
+class FakeClock():
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def _save(file_path, content):
+    with open(file_path, "wb") as file:
+        file.write(content)
+
+def test_saves_are_debounced():
+    with tempfile.TemporaryDirectory() as directory:
+        _save(os.path.join(directory, "existing.SLDPRT"), b"old")
+        clock = FakeClock()
+        watcher = SolidWorksFolderWatcher([directory], None, [".SLDPRT", ".SLDASM"], debounce = 10, time_function = clock)
+        assert watcher.poll() == []
+
+        part_path = os.path.join(directory, "part.sldprt")
+        _save(part_path, b"1")
+        _save(os.path.join(directory, "~$part.sldprt"), b"lock")
+        _save(os.path.join(directory, "notes.txt"), b"text")
+        assert watcher.poll() == []
+        clock.now = 8
+        _save(part_path, b"12") # Saved again within the debounce time
+        assert watcher.poll() == []
+        clock.now = 15
+        assert watcher.poll() == []
+        clock.now = 18
+        assert watcher.poll() == [part_path]
+        clock.now = 40
+        assert watcher.poll() == []
+
+def test_bounded_queue_and_workers():
+    with tempfile.TemporaryDirectory() as directory:
+        clock = FakeClock()
+        handled = []
+        release = threading.Event()
+
+        def convert(file_path):
+            release.wait(5)
+            if file_path.endswith("broken.SLDPRT"):
+                raise RuntimeError("Conversion failed")
+            handled.append(file_path)
+
+        watcher = SolidWorksFolderWatcher([directory], convert, [".SLDPRT"], debounce = 1, max_queued = 2,
+                                          convert_existing = True, time_function = clock)
+        for name in ("a.SLDPRT", "b.SLDPRT", "c.SLDPRT", "broken.SLDPRT"):
+            _save(os.path.join(directory, name), b"data")
+        watcher.poll()
+        clock.now = 2
+        assert len(watcher.poll()) == 2 # The others wait for space in the queue
+
+        watcher.start()
+        release.set()
+        clock.now = 3
+        deadline = time.monotonic() + 10
+        while watcher.handled + watcher.failed < 4 and time.monotonic() < deadline:
+            watcher.poll()
+            time.sleep(0.01)
+        watcher.stop(timeout = 5)
+
+        assert sorted([os.path.basename(file_path) for file_path in handled]) == ["a.SLDPRT", "b.SLDPRT", "c.SLDPRT"]
+        assert watcher.failed == 1
+
+def test_stop_does_not_wait_for_busy_workers():
+    with tempfile.TemporaryDirectory() as directory:
+        clock = FakeClock()
+        release = threading.Event()
+        watcher = SolidWorksFolderWatcher([directory], lambda file_path: release.wait(5), [".SLDPRT"], debounce = 1, max_queued = 1,
+                                          convert_existing = True, time_function = clock)
+        for name in ("a.SLDPRT", "b.SLDPRT", "c.SLDPRT"):
+            _save(os.path.join(directory, name), b"data")
+        watcher.start()
+        watcher.poll()
+        clock.now = 2
+        deadline = time.monotonic() + 5
+        while len(watcher._queued) < 2 and time.monotonic() < deadline:
+            watcher.poll() # One file is being converted, the next one fills the queue
+            time.sleep(0.01)
+        assert watcher._queue.full()
+
+        start_time = time.monotonic()
+        watcher.stop(timeout = 0, discard_queued = True)
+        assert time.monotonic() - start_time < 1
+        assert watcher._queue.empty()
+        assert watcher.poll() == [] # Nothing is queued after stopping
+        release.set()
@@ -0,0 +1,108 @@
+'''
+Created on 18.10.2018
+
+@author: Thomas Pietrowski
+'''
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.split(__file__)[0], ".."))
+from SolidWorksMeshCache import SolidWorksMeshCache # @UnresolvedImport
+
+def _writeFile(filepath, content):
+    with open(filepath, "wb") as file_object:
+        file_object.write(content)
+    return filepath
+
+def test_lookup_hits_after_store():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = SolidWorksMeshCache(os.path.join(directory, "cache"), 1024 * 1024)
+        source = _writeFile(os.path.join(directory, "part.SLDPRT"), b"part")
+        mesh = _writeFile(os.path.join(directory, "part.stl"), b"mesh")
+
+        assert cache.lookup(source, 30, 26, True) is None
+        cache.store(source, mesh, "stl", 30, 26, True)
+
+        entry = cache.lookup(source, 30, 26, True)
+        assert entry["type"] == "stl"
+        with open(entry["file"], "rb") as file_object:
+            assert file_object.read() == b"mesh"
+
+        # Any other setting is a miss
+        assert cache.lookup(source, 20, 26, True) is None
+        assert cache.lookup(source, 30, 25, True) is None
+        assert cache.lookup(source, 30, 26, False) is None
+
+def test_unknown_revision_accepts_the_revision_stored_last():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = SolidWorksMeshCache(os.path.join(directory, "cache"), 1024 * 1024)
+        source = _writeFile(os.path.join(directory, "part.SLDPRT"), b"part")
+        mesh = _writeFile(os.path.join(directory, "part.stl"), b"mesh")
+
+        # The default installation is only known after starting it
+        assert cache.lookup(source, 30, None, True) is None
+        cache.store(source, mesh, "stl", 30, 26, True)
+        assert cache.lookup(source, 30, None, True) is not None
+
+        # Another revision replaces the entry
+        cache.store(source, mesh, "stl", 30, 27, True)
+        assert cache.lookup(source, 30, 26, True) is None
+        assert cache.lookup(source, 30, 27, True) is not None
+        assert len(os.listdir(os.path.join(directory, "cache"))) == 2 # Mesh and index
+
+def test_stored_mesh_is_linked_instead_of_copied():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = SolidWorksMeshCache(os.path.join(directory, "cache"), 1024 * 1024)
+        source = _writeFile(os.path.join(directory, "part.SLDPRT"), b"part")
+        mesh = _writeFile(os.path.join(directory, "part.stl"), b"mesh")
+
+        cache.store(source, mesh, "stl", 30, 26, True)
+        entry = cache.lookup(source, 30, 26, True)
+        assert os.path.samefile(entry["file"], mesh)
+
+        # The export is removed after reading it. The cached mesh stays.
+        os.remove(mesh)
+        with open(entry["file"], "rb") as file_object:
+            assert file_object.read() == b"mesh"
+
+def test_changed_dependency_invalidates_entry():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = SolidWorksMeshCache(os.path.join(directory, "cache"), 1024 * 1024)
+        source = _writeFile(os.path.join(directory, "assembly.SLDASM"), b"assembly")
+        part = _writeFile(os.path.join(directory, "part.SLDPRT"), b"part")
+        mesh = _writeFile(os.path.join(directory, "assembly.stl"), b"mesh")
+
+        cache.store(source, mesh, "stl", 10, 26, True, dependencies = [part, ])
+        assert cache.lookup(source, 10, 26, True) is not None
+
+        _writeFile(part, b"modified part")
+        assert cache.lookup(source, 10, 26, True) is None
+
+def test_least_recently_used_entries_get_evicted():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = SolidWorksMeshCache(os.path.join(directory, "cache"), 10)
+        sources = [_writeFile(os.path.join(directory, "{}.SLDPRT".format(i)), str(i).encode()) for i in range(3)]
+        mesh = _writeFile(os.path.join(directory, "mesh.stl"), b"12345")
+
+        cache.store(sources[0], mesh, "stl", 10, 26, True)
+        cache.store(sources[1], mesh, "stl", 10, 26, True)
+        cache.lookup(sources[0], 10, 26, True) # Touching the first entry
+        cache.store(sources[2], mesh, "stl", 10, 26, True)
+
+        assert cache.getSize() <= 10
+        assert cache.lookup(sources[0], 10, 26, True) is not None
+        assert cache.lookup(sources[1], 10, 26, True) is None
+        assert cache.lookup(sources[2], 10, 26, True) is not None
+
+        # Only the hashes of cached files are kept
+        cache.store(sources[1], mesh, "stl", 10, 26, True)
+        assert sorted(cache._loadIndex()["hashes"].keys()) == sorted([os.path.normpath(sources[1]), os.path.normpath(sources[2])])
+
+def test_index_is_persistent():
+    with tempfile.TemporaryDirectory() as directory:
+        source = _writeFile(os.path.join(directory, "part.SLDPRT"), b"part")
+        mesh = _writeFile(os.path.join(directory, "part.stl"), b"mesh")
+        SolidWorksMeshCache(os.path.join(directory, "cache"), 1024).store(source, mesh, "stl", 30, 26, True)
+
+        assert SolidWorksMeshCache(os.path.join(directory, "cache"), 1024).lookup(source, 30, 26, True) is not None
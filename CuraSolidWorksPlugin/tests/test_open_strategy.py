@@ -0,0 +1,56 @@
+'''
+Created on 18.10.2018
+
+@author: Thomas Pietrowski
+'''
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.split(__file__)[0])
+sys.path.insert(0, os.path.join(os.path.split(__file__)[0], ".."))
+import FakeSolidWorks # @UnresolvedImport
+import SolidWorksOpenStrategy # @UnresolvedImport
+from SolidWorksOpenStrategy import chooseOpenStrategy, getExportTriangleCount, isExportEmpty, isExportIncomplete # @UnresolvedImport
+
+def test_strategy_by_size_of_the_assembly():
+    assert chooseOpenStrategy("resolved", component_count = 5000) == "resolved"
+    assert chooseOpenStrategy("lightweight", component_count = 3) == "lightweight"
+    assert chooseOpenStrategy("auto", component_count = 3, file_size = 1024) == "resolved"
+    assert chooseOpenStrategy("auto", component_count = 5000, file_size = 1024) == "lightweight"
+    assert chooseOpenStrategy("auto", component_count = None, file_size = 200 * 1024 * 1024) == "lightweight"
+    assert chooseOpenStrategy("auto") == "resolved"
+
+def test_empty_exports_are_detected():
+    with tempfile.TemporaryDirectory() as directory:
+        stl_path = os.path.join(directory, "export.stl")
+        assert isExportEmpty(stl_path, "stl")
+        FakeSolidWorks.writeSyntheticStl(stl_path, 100)
+        assert not isExportEmpty(stl_path, "stl")
+        with open(stl_path, "wb") as stl_file:
+            stl_file.write(b"\0" * 80 + b"\0\0\0\0")
+        assert isExportEmpty(stl_path, "stl")
+
+def test_incomplete_exports_are_detected():
+    with tempfile.TemporaryDirectory() as directory:
+        stl_path = os.path.join(directory, "export.stl")
+        triangles = FakeSolidWorks.writeSyntheticStl(stl_path, 100)
+        assert getExportTriangleCount(stl_path, "stl") == triangles
+        assert not isExportIncomplete(stl_path, "stl", 10)
+        # Too few triangles for a mesh of each component
+        assert isExportIncomplete(stl_path, "stl", triangles)
+        assert isExportIncomplete(os.path.join(directory, "missing.stl"), "stl", 1)
+
+        threemf_path = os.path.join(directory, "export.3mf")
+        triangles = FakeSolidWorks.writeSynthetic3mf(threemf_path, 100)
+        assert getExportTriangleCount(threemf_path, "3mf") == triangles
+        # Tags, which are split between two chunks, are counted once
+        chunk_size = SolidWorksOpenStrategy.scan_chunk_size
+        SolidWorksOpenStrategy.scan_chunk_size = 7
+        try:
+            assert getExportTriangleCount(threemf_path, "3mf") == triangles
+        finally:
+            SolidWorksOpenStrategy.scan_chunk_size = chunk_size
+        assert not isExportIncomplete(threemf_path, "3mf", 10)
+        assert isExportIncomplete(threemf_path, "3mf", triangles)
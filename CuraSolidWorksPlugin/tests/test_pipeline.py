@@ -0,0 +1,92 @@
+'''
+Created on 18.10.2018
+
+@author: Thomas Pietrowski
+'''
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.split(__file__)[0], ".."))
+from SolidWorksPipeline import SolidWorksImportPipeline # @UnresolvedImport
+
+def test_results_keep_order_and_errors():
+    def export(job):
+        if job == 2:
+            raise RuntimeError("export failed")
+        return job * 10
+
+    def read(exported):
+        if exported == 30:
+            raise ValueError("read failed")
+        time.sleep(0.01 * (5 - exported / 10))
+        return exported + 1
+
+    results = SolidWorksImportPipeline(export, read, max_pending = 1, workers = 3).run([0, 1, 2, 3, 4])
+
+    assert [result for result, _ in results] == [1, 11, None, None, 41]
+    assert isinstance(results[2][1], RuntimeError)
+    assert isinstance(results[3][1], ValueError)
+
+def test_export_overlaps_reading():
+    def export(job):
+        time.sleep(0.05)
+        return job
+
+    def read(exported):
+        time.sleep(0.05)
+        return exported
+
+    start_time = time.perf_counter()
+    SolidWorksImportPipeline(export, read, max_pending = 2, workers = 2).run(list(range(6)))
+    duration = time.perf_counter() - start_time
+
+    # Sequentially 0.6s, pipelined 0.35s
+    assert duration < 0.5
+
+def test_pending_exports_are_bounded():
+    lock = threading.Lock()
+    state = {"exported": 0, "read": 0, "maximum": 0}
+
+    def export(job):
+        with lock:
+            state["exported"] += 1
+            state["maximum"] = max(state["maximum"], state["exported"] - state["read"])
+        return job
+
+    def read(exported):
+        time.sleep(0.02)
+        with lock:
+            state["read"] += 1
+        return exported
+
+    SolidWorksImportPipeline(export, read, max_pending = 2, workers = 1).run(list(range(10)))
+
+    # Queued exports + the one being read + the one just exported by the waiting producer
+    assert state["maximum"] <= 2 + 1 + 1
+    assert state["read"] == 10
+
+def test_several_exporters():
+    lock = threading.Lock()
+    state = {"running": 0, "maximum": 0}
+
+    def export(job):
+        with lock:
+            state["running"] += 1
+            state["maximum"] = max(state["maximum"], state["running"])
+        time.sleep(0.02)
+        with lock:
+            state["running"] -= 1
+        return job
+
+    results = SolidWorksImportPipeline(export, lambda exported: exported, max_pending = 4, workers = 2, exporters = 3).run(list(range(12)))
+
+    assert [result for result, _ in results] == list(range(12))
+    assert state["maximum"] == 3
+
+def test_at_least_one_reader():
+    results = SolidWorksImportPipeline(lambda job: job, lambda exported: exported, max_pending = 1, workers = 0).run(list(range(4)))
+
+    assert [result for result, _ in results] == list(range(4))
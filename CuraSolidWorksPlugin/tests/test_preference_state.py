@@ -0,0 +1,72 @@
+'''
+Created on 18.10.2018
+
+@author: Thomas Pietrowski
+'''
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.split(__file__)[0], ".."))
+from SolidWorksPreferenceState import SolidWorksPreferenceState # @UnresolvedImport
+
+class App():
+    def __init__(self):
+        self.toggles = {69: False}
+        self.doubles = {2: 0.5}
+        self.calls = []
+
+    def GetUserPreferenceToggle(self, enum):
+        self.calls.append(("GetUserPreferenceToggle", enum))
+        return self.toggles[enum]
+
+    def SetUserPreferenceToggle(self, enum, value):
+        self.calls.append(("SetUserPreferenceToggle", enum))
+        self.toggles[enum] = value
+
+    def GetUserPreferenceDoubleValue(self, enum):
+        self.calls.append(("GetUserPreferenceDoubleValue", enum))
+        return self.doubles[enum]
+
+    def SetUserPreferenceDoubleValue(self, enum, value):
+        self.calls.append(("SetUserPreferenceDoubleValue", enum))
+        self.doubles[enum] = value
+
+preferences = {"swSTLBinaryFormat": ("toggle", 69),
+               "swSTLDeviation": ("double", 2),
+               }
+
+def test_only_differing_values_are_set():
+    app = App()
+    state = SolidWorksPreferenceState(app, preferences)
+    app.calls = []
+
+    assert state.apply({"swSTLBinaryFormat": True, "swSTLDeviation": 0.5}) == 1
+    assert state.apply({"swSTLBinaryFormat": True, "swSTLDeviation": 0.5}) == 0
+    assert app.calls == [("SetUserPreferenceToggle", 69)]
+
+    assert state.restore() == 1
+    assert app.toggles[69] is False
+
+def test_journal_restores_after_crash():
+    with tempfile.TemporaryDirectory() as directory:
+        journal_path = os.path.join(directory, "journal.json")
+        app = App()
+        state = SolidWorksPreferenceState(app, preferences, journal_path)
+        state.apply({"swSTLBinaryFormat": True, "swSTLDeviation": 0.1})
+        assert os.path.isfile(journal_path)
+
+        # Cura crashed here. The next session restores the values from the journal.
+        assert SolidWorksPreferenceState.restoreJournal(app, journal_path)
+        assert app.toggles[69] is False
+        assert app.doubles[2] == 0.5
+        assert not os.path.isfile(journal_path)
+        assert not SolidWorksPreferenceState.restoreJournal(app, journal_path)
+
+def test_restore_removes_journal():
+    with tempfile.TemporaryDirectory() as directory:
+        journal_path = os.path.join(directory, "journal.json")
+        state = SolidWorksPreferenceState(App(), preferences, journal_path)
+        state.apply({"swSTLDeviation": 0.1})
+        state.restore()
+        assert not os.path.isfile(journal_path)
@@ -0,0 +1,394 @@
+'''
+Created on 18.10.2018
+
+@author: Thomas Pietrowski
+'''
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy
+
+sys.path.insert(0, os.path.split(__file__)[0])
+from FakeSolidWorks import getSphereFaces, identity_array_data # @UnresolvedImport
+from FakeUranium import CuraSceneNode, FakeApps, MeshData, MeshReader, Message, createReader, getRegistryKeys # @UnresolvedImport
+
+def _writeFile(filepath, content):
+    with open(filepath, "wb") as file_object:
+        file_object.write(content)
+    return filepath
+
+def _createReader(directory, apps, versions = (26, ), wait = True, **preferences):
+    # Installations are taken from the registry without starting them, unless the checks are enabled
+    preferences.setdefault("checks_at_initialization", False)
+    preferences.setdefault("show_export_settings_always", False)
+    executable = os.path.join(directory, "SLDWORKS.exe")
+    if not os.path.isfile(executable):
+        _writeFile(executable, b"SolidWorks")
+    reader = createReader(directory, apps, getRegistryKeys(versions, versions[0], executable), preferences)
+    reader.startInstallationChecks()
+    if wait:
+        assert reader.waitForInstallationChecks(10)
+    return reader
+
+def test_batch_is_converted_on_one_session():
+    with tempfile.TemporaryDirectory() as directory:
+        apps = FakeApps()
+        file_paths = []
+        for name, triangles in (("a.SLDPRT", 100), ("b.SLDPRT", 200), ("c.SLDPRT", 300)):
+            file_paths.append(_writeFile(os.path.join(directory, name), name.encode()))
+            apps.addPart(file_paths[-1], triangles = triangles)
+        reader = _createReader(directory, apps, cache_enabled = False)
+        try:
+            results = reader.readBatch(file_paths)
+
+            assert [file_path for file_path, _, _ in results] == file_paths
+            assert [error for _, _, error in results] == [None, None, None]
+            assert all([scene_nodes for _, scene_nodes, _ in results])
+
+            # SolidWorks has been started once and converted all files
+            assert len(apps.created) == 1
+            app = apps.created[0]
+            assert app.calls["OpenDoc7"] == 3
+            assert len(app.saved_files) == 3
+            # The export settings are applied by the first file only
+            changed_preferences = sum([app.calls[name] for name in ("SetUserPreferenceToggle", "SetUserPreferenceIntegerValue", "SetUserPreferenceDoubleValue")])
+            assert changed_preferences <= len(reader.export_preferences)
+            # Everything is closed again, but SolidWorks keeps running for the next import
+            assert not app._open_documents
+            assert not app.exited
+            assert reader._session.isAppRunning()
+
+            # The next batch reuses the running instance
+            reader.readBatch(file_paths[:1])
+            assert len(apps.created) == 1
+            assert not app._open_documents
+        finally:
+            reader._onApplicationShuttingDown()
+        assert app.exited
+
+def test_installation_checks_are_stored_and_reused():
+    with tempfile.TemporaryDirectory() as directory:
+        apps = FakeApps()
+        reader = _createReader(directory, apps, checks_at_initialization = True)
+        # SolidWorks has been started once for checking it
+        assert reader.operational_versions == [26]
+        assert reader.technical_infos_per_version[26]["Functions available"]
+        assert len(apps.created) == 1
+        assert apps.created[0].exited
+        stored_checks = reader.getStoredInstallationChecks()
+        assert stored_checks["26"]["result"]
+
+        # The next start of Cura reuses the results, as long as the installation is unchanged
+        reader = _createReader(directory, apps,
+                               checks_at_initialization = True,
+                               installation_checks = json.dumps(stored_checks),
+                               )
+        assert reader.operational_versions == [26]
+        assert reader.technical_infos_per_version[26] == stored_checks["26"]["info"]
+        assert len(apps.created) == 1
+
+        # Updating SolidWorks changes its executable, so it's checked again
+        _writeFile(os.path.join(directory, "SLDWORKS.exe"), b"SolidWorks SP1")
+        reader = _createReader(directory, apps,
+                               checks_at_initialization = True,
+                               installation_checks = json.dumps(stored_checks),
+                               )
+        assert reader.operational_versions == [26]
+        assert len(apps.created) == 2
+        assert reader.getStoredInstallationChecks()["26"]["fingerprint"] != stored_checks["26"]["fingerprint"]
+
+def test_installation_checks_run_in_the_background():
+    with tempfile.TemporaryDirectory() as directory:
+        apps = FakeApps()
+        apps.start_gate = threading.Event()
+        updates = []
+        reader = _createReader(directory, apps, wait = False, checks_at_initialization = True)
+        reader.installationChecksFinished.connect(updates.append)
+        try:
+            # Cura keeps loading, while SolidWorks is started for the check
+            assert reader.isInstallationCheckPending()
+            assert not reader.waitForInstallationChecks(0.1)
+            assert reader.operational_versions == []
+            assert not reader.isOperational()
+        finally:
+            apps.start_gate.set()
+        assert reader.waitForInstallationChecks(10)
+        assert reader.operational_versions == [26]
+        assert updates == [reader]
+
+def test_checking_again_keeps_the_results_until_finished():
+    with tempfile.TemporaryDirectory() as directory:
+        apps = FakeApps()
+        reader = _createReader(directory, apps, checks_at_initialization = True)
+        operational_versions = reader.operational_versions
+        technical_infos = reader.technical_infos_per_version
+        assert len(apps.created) == 1
+
+        # "Check again" in the dialog ignores the stored results and starts SolidWorks again
+        apps.start_gate = threading.Event()
+        reader.startInstallationChecks(use_stored_checks = False)
+        try:
+            assert reader.isInstallationCheckPending()
+            # Meanwhile the previous results are still in place and not changed in-place
+            assert reader.operational_versions == [26]
+            assert reader.operational_versions is operational_versions
+            assert reader.isOperational()
+        finally:
+            apps.start_gate.set()
+        assert reader.waitForInstallationChecks(10)
+        assert len(apps.created) == 2
+        assert reader.operational_versions == [26]
+        assert reader.operational_versions is not operational_versions
+        # The previous results haven't been touched by the new checks
+        assert operational_versions == [26]
+        assert technical_infos[26]["Functions available"]
+
+def _waitFor(condition, timeout = 10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+def _createPrestartReader(directory, apps, **preferences):
+    # SolidWorks is started in advance, no matter how busy the system running the tests is
+    return _createReader(directory, apps,
+                         prestart = True,
+                         prestart_min_free_memory = 0,
+                         prestart_max_cpu_load = 100,
+                         cache_enabled = False,
+                         **preferences)
+
+def test_prestarted_session_is_used_by_the_first_import():
+    with tempfile.TemporaryDirectory() as directory:
+        apps = FakeApps()
+        part = _writeFile(os.path.join(directory, "a.SLDPRT"), b"a")
+        apps.addPart(part, triangles = 100)
+        reader = _createPrestartReader(directory, apps)
+        try:
+            _waitFor(lambda: reader._session is not None and reader._session.isAppRunning())
+            session = reader._session
+            assert reader._prestart_timer is not None
+            assert len(apps.created) == 1
+
+            assert reader.read(part)
+            # The import took over the running instance, so it's not closed by the prestart timeout
+            assert reader._session is session
+            assert reader._prestart_timer is None
+            assert len(apps.created) == 1
+            assert apps.created[0].calls["OpenDoc7"] == 1
+
+            # Starting in advance again doesn't start a second instance
+            reader.prestartSession()
+            _waitFor(lambda: not session.sessions[0].pending_jobs)
+            assert reader._session is session
+            assert len(apps.created) == 1
+        finally:
+            reader._onApplicationShuttingDown()
+
+def test_prestarted_session_is_closed_after_the_timeout():
+    with tempfile.TemporaryDirectory() as directory:
+        apps = FakeApps()
+        reader = _createPrestartReader(directory, apps, prestart_timeout = 0.2)
+        try:
+            _waitFor(lambda: apps.created and apps.created[0].exited)
+            assert reader._session is None
+            assert reader._prestart_timer is None
+        finally:
+            reader._onApplicationShuttingDown()
+
+def test_failed_prestart_falls_back_to_starting_with_the_import():
+    with tempfile.TemporaryDirectory() as directory:
+        apps = FakeApps()
+        # The versioned and the default service
+        apps.failing_starts = 2
+        part = _writeFile(os.path.join(directory, "a.SLDPRT"), b"a")
+        apps.addPart(part, triangles = 100)
+        reader = _createPrestartReader(directory, apps)
+        try:
+            _waitFor(lambda: reader._session is not None and reader._session.sessions[0].last_start_failure is not None)
+            assert not reader._session.isAppRunning()
+            assert not apps.created
+
+            # The import starts SolidWorks itself without showing an error
+            assert reader.read(part)
+            assert len(apps.created) == 1
+            assert reader._prestart_timer is None
+            assert not Message.shown
+        finally:
+            reader._onApplicationShuttingDown()
+        assert apps.created[0].exited
+
+def test_each_model_of_a_drawing_becomes_a_node():
+    with tempfile.TemporaryDirectory() as directory:
+        apps = FakeApps()
+        part_a = _writeFile(os.path.join(directory, "a.SLDPRT"), b"a")
+        part_b = _writeFile(os.path.join(directory, "b.SLDPRT"), b"b")
+        drawing = _writeFile(os.path.join(directory, "sheet.SLDDRW"), b"sheet")
+        empty_drawing = _writeFile(os.path.join(directory, "empty.SLDDRW"), b"empty")
+        apps.addPart(part_a, triangles = 100)
+        apps.addPart(part_b, triangles = 2000)
+        # The sheet view comes first and references no model. Part a is shown by two views.
+        apps.addDrawing(drawing, [part_a, part_b, part_a])
+        apps.addDrawing(empty_drawing, [])
+        reader = _createReader(directory, apps, cache_enabled = False)
+        try:
+            scene_nodes = reader.read(drawing)
+
+            assert [scene_node.getName() for scene_node in scene_nodes] == ["a.SLDPRT", "b.SLDPRT"]
+            node_a, node_b = scene_nodes
+            assert node_a.getMeshData().getFaceCount() < node_b.getMeshData().getFaceCount()
+            assert not Message.shown
+            app = apps.created[0]
+            # The drawing and both models have been opened once
+            assert app.calls["OpenDoc7"] == 3
+            assert len(app.saved_files) == 2
+            assert not app._open_documents
+
+            # Only the sheet view: Nothing to read, which is told to the user
+            assert reader.read(empty_drawing) is None
+            assert len(app.saved_files) == 2
+            assert [message for message in Message.shown if "Found no models inside your drawing" in message.text]
+            assert not app._open_documents
+        finally:
+            reader._onApplicationShuttingDown()
+
+class _PendingAnswer():
+    # Answer of the wizard, which is given after the reader had the chance to prepare the file
+    def __init__(self, accepted):
+        self._accepted = accepted
+
+    def done(self):
+        return False
+
+    def result(self):
+        return self._accepted
+
+class _FakeWizard():
+    def __init__(self, accepted):
+        self.accepted = accepted
+
+    def showConfigUI(self):
+        return _PendingAnswer(self.accepted)
+
+def test_file_is_opened_while_the_wizard_is_shown():
+    with tempfile.TemporaryDirectory() as directory:
+        apps = FakeApps()
+        part = _writeFile(os.path.join(directory, "a.SLDPRT"), b"a")
+        apps.addPart(part, triangles = 100)
+        reader = _createReader(directory, apps)
+        try:
+            # Cancelling the wizard closes the file again
+            reader._ui = _FakeWizard(False)
+            assert reader.preRead(part) == MeshReader.PreReadResult.cancelled
+            _waitFor(lambda: not reader._session.sessions[0].pending_jobs)
+            app = apps.created[0]
+            assert app.calls["OpenDoc7"] == 1
+            assert app.calls["CloseDoc"] == 1
+            assert not app._open_documents
+            assert not reader._prepared_sessions
+
+            # Accepting it exports the file, which has been opened already
+            reader._ui = _FakeWizard(True)
+            assert reader.preRead(part) == MeshReader.PreReadResult.accepted
+            assert reader.read(part)
+            assert app.calls["OpenDoc7"] == 2
+            assert not app._open_documents
+        finally:
+            reader._onApplicationShuttingDown()
+
+def test_lightweight_assembly_is_opened_while_the_wizard_is_shown():
+    with tempfile.TemporaryDirectory() as directory:
+        apps = FakeApps()
+        parts = [_writeFile(os.path.join(directory, name), name.encode()) for name in ("a.SLDPRT", "b.SLDPRT")]
+        assembly = _writeFile(os.path.join(directory, "assembly.SLDASM"), b"assembly")
+        apps.addPart(parts[0], triangles = 500)
+        apps.addPart(parts[1], triangles = 500, tessellated = False)
+        apps.addAssembly(assembly, [(part, "Default", identity_array_data) for part in parts])
+        reader = _createReader(directory, apps, open_strategy = "lightweight")
+        reader._ui = _FakeWizard(True)
+        try:
+            assert reader.preRead(assembly) == MeshReader.PreReadResult.accepted
+            _waitFor(lambda: not reader._session.sessions[0].pending_jobs)
+            app = apps.created[0]
+            # Opened with the options of the import
+            assert app.calls["OpenDoc7"] == 1
+            assert list(reader._session.sessions[0].options["prepared_files"].values()) == ["lightweight"]
+
+            # The part without tessellation data is resolved before the export, like when the export opens the assembly
+            scene_node = reader.read(assembly)
+            assert app.calls["OpenDoc7"] == 1
+            assert scene_node.getMeshData().getFaceCount() == len(getSphereFaces(1000))
+            assert not app._open_documents
+        finally:
+            reader._onApplicationShuttingDown()
+
+def test_cached_file_is_not_opened_while_the_wizard_is_shown():
+    with tempfile.TemporaryDirectory() as directory:
+        apps = FakeApps()
+        part = _writeFile(os.path.join(directory, "a.SLDPRT"), b"a")
+        apps.addPart(part, triangles = 100)
+        reader = _createReader(directory, apps)
+        try:
+            assert reader.read(part)
+        finally:
+            reader._onApplicationShuttingDown()
+        assert len(apps.created) == 1
+
+        # Next start of Cura: The mesh cache is kept in the storage directory
+        reader = _createReader(directory, apps)
+        reader._ui = _FakeWizard(True)
+        try:
+            assert reader.preRead(part) == MeshReader.PreReadResult.accepted
+            assert reader.read(part)
+            # Neither a session nor SolidWorks have been needed
+            assert reader._session is None
+            assert not reader._prepared_sessions
+            assert len(apps.created) == 1
+        finally:
+            reader._onApplicationShuttingDown()
+
+def test_shared_meshes_are_post_processed_once_in_order():
+    with tempfile.TemporaryDirectory() as directory:
+        reader = createReader(directory, FakeApps())
+        shared_mesh = MeshData(vertices = getSphereFaces(2000).reshape(-1, 3).astype(numpy.float32))
+        own_mesh = MeshData(vertices = getSphereFaces(500).reshape(-1, 3).astype(numpy.float32))
+        group_node = CuraSceneNode()
+        for mesh_data in (shared_mesh, shared_mesh, own_mesh):
+            scene_node = CuraSceneNode(parent = group_node)
+            scene_node.setMeshData(mesh_data)
+
+        # Records each stage with the mesh it got and the one it returned
+        calls = []
+        for stage in ("rotateMeshData", "weldMeshData", "decimateMeshData"):
+            def recordStage(mesh_data, *args, stage = stage, function = getattr(reader, stage)):
+                result = function(mesh_data, *args)
+                calls.append((stage, mesh_data, result))
+                return result
+            setattr(reader, stage, recordStage)
+
+        options = {"tempType": "stl",
+                   "app_auto_rotate": True,
+                   "app_weld_vertices": True,
+                   "app_weld_epsilon": 0.001,
+                   "app_triangle_budget": 200,
+                   }
+        reader.nodePostProcessing(options, [group_node, ])
+
+        first_node, second_node, third_node = group_node.getChildren()
+        assert first_node.getMeshData() is second_node.getMeshData()
+        for original_mesh, scene_node in ((shared_mesh, first_node), (own_mesh, third_node)):
+            # Each stage got the result of the previous one, once per unique mesh
+            stages = []
+            mesh_data = original_mesh
+            for stage, stage_input, stage_result in calls:
+                if stage_input is mesh_data:
+                    stages.append(stage)
+                    mesh_data = stage_result
+            assert stages == ["rotateMeshData", "weldMeshData", "decimateMeshData"]
+            assert scene_node.getMeshData() is mesh_data
+            assert mesh_data.getFaceCount() <= 200
+        assert len(calls) == 6
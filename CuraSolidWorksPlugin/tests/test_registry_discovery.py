@@ -0,0 +1,58 @@
+'''
+Created on 18.10.2018
+
+@author: Thomas Pietrowski
+'''
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.split(__file__)[0], ".."))
+from SolidWorksRegistry import MemoryRegistryBackend, SolidWorksRegistry # @UnresolvedImport
+
+def _getRegistry(extra_keys = 0):
+    keys = {"SldWorks.Application\\CurVer": "SldWorks.Application.26",
+            "SldWorks.Application.25\\shell\\open\\command": "C:\\SOLIDWORKS 2017\\SLDWORKS.exe \"%1\"",
+            "SldWorks.Application.26\\CLSID": "{3E2A0A73-1EBB-4D92-B3FD-3B47E76D0F6B}",
+            "CLSID\\{3E2A0A73-1EBB-4D92-B3FD-3B47E76D0F6B}\\LocalServer32": "C:\\SOLIDWORKS 2018\\SLDWORKS.exe",
+            "SldWorks.Application.Old\\CLSID": "{00000000-0000-0000-0000-000000000000}",
+            }
+    # Corporate images have tens of thousands of registered classes
+    for index in range(extra_keys):
+        keys["Some.Class.{}\\CLSID".format(index)] = "{{{}}}".format(index)
+    return MemoryRegistryBackend(keys)
+
+def test_versions_are_discovered():
+    registry = SolidWorksRegistry(_getRegistry())
+    assert registry.getVersions() == [26, 25]
+    assert registry.getCurrentVersion() == 26
+    assert registry.getServiceCommand(25) == "C:\\SOLIDWORKS 2017\\SLDWORKS.exe \"%1\""
+    assert registry.getServiceCommand(26) == "C:\\SOLIDWORKS 2018\\SLDWORKS.exe"
+    assert registry.getServiceCommand(24) is None
+
+def test_current_version_outside_of_the_probed_range_is_found():
+    backend = MemoryRegistryBackend({"SldWorks.Application\\CurVer": "SldWorks.Application.45",
+                                     "SldWorks.Application.45\\CLSID": "{45}",
+                                     })
+    assert SolidWorksRegistry(backend).getVersions() == [45]
+
+def test_old_versions_are_discovered():
+    backend = MemoryRegistryBackend({"SldWorks.Application.14\\CLSID": "{14}",
+                                     "SldWorks.Application.19\\CLSID": "{19}",
+                                     "SldWorks.Application.26\\CLSID": "{26}",
+                                     })
+    assert SolidWorksRegistry(backend).getVersions() == [26, 19, 14]
+
+def test_lookups_are_independent_of_the_registry_size_and_cached():
+    backend = _getRegistry(extra_keys = 50000)
+    registry = SolidWorksRegistry(backend)
+    registry.getVersions()
+    for version in registry.getVersions():
+        registry.isServiceRegistered(version)
+        registry.getServiceCommand(version)
+        registry.getServiceCommand(version)
+    assert backend.calls < 2 * len(SolidWorksRegistry.probed_versions)
+
+    calls = backend.calls
+    registry.clearCache()
+    registry.getVersions()
+    assert backend.calls > calls
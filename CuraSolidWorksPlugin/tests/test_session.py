@@ -0,0 +1,151 @@
+'''
+Created on 18.10.2018
+
+@author: Thomas Pietrowski
+'''
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.split(__file__)[0], ".."))
+sys.path.insert(0, os.path.split(__file__)[0])
+import FakeSolidWorks # @UnresolvedImport
+from SolidWorksSession import SolidWorksSession, SolidWorksSessionPool # @UnresolvedImport
+
+app_name = "SldWorks.Application"
+
+class FakeReader():
+    """
+    The part of SolidWorksReader, which is called by the sessions
+    """
+
+    def __init__(self, com_connector, shared = False):
+        self.com_connector = com_connector
+        # Every start ends up with the same instance, like attaching to a running SolidWorks
+        self.shared = shared
+        self.apps = []
+
+    def startApp(self, options):
+        if self.shared and self.apps:
+            app = self.apps[0]
+        else:
+            app = FakeSolidWorks.FakeSldWorksApplication(com_connector = self.com_connector)
+            self.apps.append(app)
+        app.RevisionNumber
+        options["app_instance"] = app
+        options["app_was_active"] = False
+
+    def onSessionStarted(self, options):
+        pass
+
+    def onSessionClosing(self, options):
+        pass
+
+    def closeApp(self, options):
+        pass
+
+    def postCloseApp(self, options):
+        pass
+
+    def getOpenDocuments(self, options):
+        return [options["app_instance"].GetFirstDocument] if options["app_instance"].GetDocumentCount else []
+
+def _getAppInstance(options):
+    options["app_instance"].GetDocumentCount
+    return options["app_instance"]
+
+def _waitFor(condition, timeout = 5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_jobs_run_in_a_com_apartment():
+    connector = FakeSolidWorks.FakeComConnector()
+    reader = FakeReader(connector)
+    session = SolidWorksSession(reader, [app_name], com_connector = connector)
+
+    thread_ident = session.run(lambda options: _getAppInstance(options) and threading.get_ident())
+    assert thread_ident in connector.threads
+    assert thread_ident != threading.get_ident()
+    session.shutdown(5)
+
+    assert reader.apps[0].exited
+    assert not connector.apartments # Left again
+
+    # Without entering an apartment, SolidWorks can't even be started
+    session = SolidWorksSession(FakeReader(connector), [app_name])
+    try:
+        session.run(_getAppInstance)
+        assert False
+    except RuntimeError:
+        pass
+    session.shutdown(5)
+
+def test_idle_timeout_closes_the_app():
+    connector = FakeSolidWorks.FakeComConnector()
+    reader = FakeReader(connector)
+    session = SolidWorksSession(reader, [app_name], idle_timeout = 0.05, com_connector = connector)
+
+    first_app = session.run(_getAppInstance)
+    assert _waitFor(lambda: not session.isAppRunning())
+    assert first_app.exited
+    assert session.run(_getAppInstance) is not first_app
+    session.shutdown(5)
+
+def test_app_is_recycled_after_max_jobs():
+    connector = FakeSolidWorks.FakeComConnector()
+    reader = FakeReader(connector)
+    session = SolidWorksSession(reader, [app_name], max_jobs = 2, com_connector = connector)
+
+    apps = [session.run(_getAppInstance) for _ in range(3)]
+
+    assert apps[0] is apps[1] is not apps[2]
+    assert apps[0].exited
+    assert session.jobs_done == 1
+    session.shutdown(5)
+
+def test_unresponsive_app_is_replaced():
+    connector = FakeSolidWorks.FakeComConnector()
+    reader = FakeReader(connector)
+    session = SolidWorksSession(reader, [app_name], com_connector = connector)
+    session.health_check_interval = 0
+
+    first_app = session.run(_getAppInstance)
+    first_app.crashed = True
+    second_app = session.run(_getAppInstance)
+
+    assert second_app is not first_app
+    assert len(reader.apps) == 2
+    session.shutdown(5)
+
+def test_pool_rejects_shared_instances_and_backs_off():
+    connector = FakeSolidWorks.FakeComConnector()
+    reader = FakeReader(connector, shared = True)
+    pool = SolidWorksSessionPool(reader, [app_name], size = 2, com_connector = connector)
+    first_session, second_session = pool.sessions
+
+    shared_app = first_session.run(_getAppInstance)
+    try:
+        second_session.run(_getAppInstance)
+        assert False
+    except RuntimeError:
+        pass
+    # The instance of the first session is left running
+    assert not shared_app.exited
+    assert first_session.isAppRunning()
+    assert not second_session.isAppRunning()
+    assert second_session.last_start_failure is not None
+
+    # The failed session is skipped, even though the other one is busy
+    release = threading.Event()
+    first_session.submit(lambda options: release.wait(5))
+    assert pool.getNextSession() is first_session
+    second_session.last_start_failure -= pool.start_failure_backoff + 1
+    assert pool.getNextSession() is second_session
+
+    release.set()
+    pool.shutdown(5)
+    assert shared_app.exited
+    assert not connector.apartments
@@ -0,0 +1,50 @@
+'''
+Created on 18.10.2018
+
+@author: Thomas Pietrowski
+'''
+import os
+import sys
+import tempfile
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.split(__file__)[0], ".."))
+import SolidWorksStlReader # @UnresolvedImport
+
+test_cube = os.path.join(os.path.split(__file__)[0], "file_type_examples", "test_cube.stl")
+
+def _writeBinaryStl(file_path, faces):
+    triangles = numpy.zeros(len(faces), dtype = SolidWorksStlReader.stl_triangle_dtype)
+    triangles["vertices"] = faces
+    with open(file_path, "wb") as stl_file:
+        stl_file.write(b"\0" * SolidWorksStlReader.stl_header_size)
+        stl_file.write(numpy.array([len(faces)], dtype = "<u4").tobytes())
+        stl_file.write(triangles.tobytes())
+
+def test_reads_vertices_in_cura_coordinates():
+    faces = numpy.random.RandomState(0).uniform(-10, 10, (100, 3, 3)).astype(numpy.float32)
+    chunk_triangles = SolidWorksStlReader.chunk_triangles
+    SolidWorksStlReader.chunk_triangles = 7
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, "part.stl")
+            _writeBinaryStl(file_path, faces)
+            assert SolidWorksStlReader.isBinaryStl(file_path)
+            vertices, normals = SolidWorksStlReader.readBinaryStl(file_path)
+    finally:
+        SolidWorksStlReader.chunk_triangles = chunk_triangles
+
+    points = faces.reshape(-1, 3)
+    assert vertices.shape == (300, 3)
+    numpy.testing.assert_array_equal(vertices[:, 0], points[:, 0])
+    numpy.testing.assert_array_equal(vertices[:, 1], points[:, 2])
+    numpy.testing.assert_array_equal(vertices[:, 2], -points[:, 1])
+    numpy.testing.assert_allclose(numpy.linalg.norm(normals, axis = 1), 1, atol = 1e-5)
+
+def test_example_file():
+    assert SolidWorksStlReader.isBinaryStl(test_cube)
+    vertices, normals = SolidWorksStlReader.readBinaryStl(test_cube)
+    assert len(vertices) == SolidWorksStlReader.getTriangleCount(test_cube) * 3 > 0
+    # Taken over by MeshData without another copy
+    assert not vertices.flags.writeable and not normals.flags.writeable
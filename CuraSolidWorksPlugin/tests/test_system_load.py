@@ -0,0 +1,25 @@
+'''
+Created on 18.10.2018
+
+@author: Thomas Pietrowski
+'''
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.split(__file__)[0], ".."))
+import SolidWorksSystemLoad # @UnresolvedImport
+
+def test_cpu_load_from_system_times():
+    # idle, kernel (including idle), user
+    assert SolidWorksSystemLoad.calculateCpuLoad((100, 200, 300), (175, 300, 400)) == 0.625
+    assert SolidWorksSystemLoad.calculateCpuLoad((100, 200, 300), (300, 400, 300)) == 0.0
+    assert SolidWorksSystemLoad.calculateCpuLoad((100, 200, 300), (100, 200, 300)) == 0.0
+
+def test_unknown_load_on_other_systems():
+    if sys.platform == "win32":
+        assert SolidWorksSystemLoad.getAvailableMemory() > 0
+        assert 0.0 <= SolidWorksSystemLoad.getCpuLoad(0.05) <= 1.0
+    else:
+        assert SolidWorksSystemLoad.getAvailableMemory() is None
+        assert SolidWorksSystemLoad.getCpuLoad(0.05) is None
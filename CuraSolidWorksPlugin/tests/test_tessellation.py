@@ -0,0 +1,29 @@
+'''
+Created on 18.10.2018
+
+@author: Thomas Pietrowski
+'''
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.split(__file__)[0], ".."))
+import SolidWorksTessellation # @UnresolvedImport
+
+def test_deviation_follows_the_size():
+    small = SolidWorksTessellation.getAdaptiveTolerances((0, 0, 0), (10, 10, 10))
+    medium = SolidWorksTessellation.getAdaptiveTolerances((0, 0, 0), (100, 100, 100))
+    large = SolidWorksTessellation.getAdaptiveTolerances((-500, -500, -500), (500, 500, 500))
+    assert small[0] == SolidWorksTessellation.deviation_minimum
+    assert small[0] < medium[0] < large[0]
+    assert large[0] == SolidWorksTessellation.deviation_maximum
+
+def test_triangle_budget_coarsens_the_tessellation():
+    unlimited = SolidWorksTessellation.getAdaptiveTolerances((0, 0, 0), (300, 300, 300))
+    limited = SolidWorksTessellation.getAdaptiveTolerances((0, 0, 0), (300, 300, 300), triangle_budget = 1000)
+    assert limited[0] > unlimited[0]
+    assert limited[1] > unlimited[1]
+    assert limited[1] <= SolidWorksTessellation.angle_tolerance_maximum
+
+def test_empty_box():
+    assert SolidWorksTessellation.getAdaptiveTolerances((1, 1, 1), (1, 1, 1)) == (SolidWorksTessellation.deviation_minimum,
+                                                                                  SolidWorksTessellation.angle_tolerance_default)
@@ -0,0 +1,40 @@
+'''
+Created on 18.10.2018
+
+@author: Thomas Pietrowski
+'''
+import json
+import os
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.split(__file__)[0], ".."))
+import SolidWorksTrace # @UnresolvedImport
+
+def test_spans_are_exported_as_trace_events():
+    options = {"trace": SolidWorksTrace.SolidWorksTrace("C:\\Parts\\test.SLDPRT")}
+    with SolidWorksTrace.traceSpan(options, "read"):
+        with SolidWorksTrace.traceSpan(options, "SaveAs", "com"):
+            pass
+    worker = threading.Thread(target = lambda: options["trace"].addSpan("startApp", "phase", 0, 1), name = "SolidWorksSession")
+    worker.start()
+    worker.join()
+
+    with tempfile.TemporaryDirectory() as directory:
+        with open(options["trace"].export(directory), "r") as trace_file:
+            trace = json.load(trace_file)
+    spans = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+    assert sorted([span["name"] for span in spans]) == ["SaveAs", "read", "startApp"]
+    read_span = [span for span in spans if span["name"] == "read"][0]
+    com_span = [span for span in spans if span["name"] == "SaveAs"][0]
+    assert com_span["cat"] == "com"
+    assert read_span["ts"] <= com_span["ts"] and com_span["dur"] <= read_span["dur"]
+    thread_names = [event["args"]["name"] for event in trace["traceEvents"] if event["ph"] == "M"]
+    assert "SolidWorksSession" in thread_names
+
+def test_disabled_tracing_records_nothing():
+    options = {}
+    with SolidWorksTrace.traceSpan(options, "read"):
+        pass
+    assert "trace" not in options
@@ -0,0 +1,49 @@
+'''
+Created on 18.10.2018
+
+@author: Thomas Pietrowski
+'''
+import os
+import sys
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.split(__file__)[0], ".."))
+import SolidWorksMeshUtils # @UnresolvedImport
+
+def _cube():
+    corners = numpy.array([[x, y, z] for x in (0, 1) for y in (0, 1) for z in (0, 1)], dtype = numpy.float32)
+    faces = [(0, 1, 3), (0, 3, 2), (4, 6, 7), (4, 7, 5),
+             (0, 4, 5), (0, 5, 1), (2, 3, 7), (2, 7, 6),
+             (0, 2, 6), (0, 6, 4), (1, 5, 7), (1, 7, 3),
+             ]
+    return corners[numpy.array(faces).flatten()]
+
+def test_cube_is_welded_into_eight_vertices():
+    soup = _cube()
+    vertices, indices = SolidWorksMeshUtils.weldVertices(soup, 1e-4)
+    assert len(vertices) == 8
+    assert indices.shape == (12, 3)
+    assert indices.dtype == numpy.int32
+    numpy.testing.assert_array_equal(vertices[indices].reshape(-1, 3), soup)
+
+def test_vertices_within_epsilon_are_merged():
+    soup = _cube()
+    soup[1] += 1e-6
+    vertices, indices = SolidWorksMeshUtils.weldVertices(soup, 1e-4)
+    assert len(vertices) == 8
+    vertices, indices = SolidWorksMeshUtils.weldVertices(soup, 0)
+    assert len(vertices) == 9
+
+def test_collapsed_faces_are_dropped():
+    soup = numpy.array([[0, 0, 0], [1, 0, 0], [0, 1, 0],
+                        [0, 0, 0], [1e-6, 0, 0], [0, 0, 1],
+                        ], dtype = numpy.float32)
+    vertices, indices = SolidWorksMeshUtils.weldVertices(soup, 1e-3)
+    assert len(indices) == 1
+
+def test_vertex_normals_point_outwards():
+    vertices, indices = SolidWorksMeshUtils.weldVertices(_cube(), 1e-4)
+    normals = SolidWorksMeshUtils.calculateVertexNormals(vertices, indices)
+    numpy.testing.assert_allclose(numpy.linalg.norm(normals, axis = 1), 1, atol = 1e-6)
+    assert (numpy.sum(normals * (vertices - 0.5), axis = 1) > 0).all()